@@ -10,7 +10,7 @@ from src.core.core import reset_model
 from src.core.fixed_task import SumSpeedPowFixedAllocationPriority, generate_fixed_tasks
 from src.extra.io import parse_args, results_filename
 from src.extra.model import ModelDistribution
-from src.greedy.greedy import greedy_algorithm
+from src.greedy.greedy import greedy_grid
 from src.greedy.resource_allocation_policy import policies as resource_allocation_policies
 from src.greedy.server_selection_policy import policies as server_selection_policies
 from src.greedy.task_prioritisation import policies as task_priorities
@@ -74,14 +74,10 @@ def model_sizing(model_dist: ModelDistribution, repeat_num: int, sizings: List[T
                 reset_model(fixed_tasks, servers)
 
             # Loop over all of the greedy policies permutations
-            for task_priority in task_priorities:
-                for server_selection_policy in server_selection_policies:
-                    for resource_allocation_policy in resource_allocation_policies:
-                        greedy_result = greedy_algorithm(tasks, servers, task_priority, server_selection_policy,
-                                                         resource_allocation_policy)
-                        algorithm_results[greedy_result.algorithm] = greedy_result.store()
-                        greedy_result.pretty_print()
-                        reset_model(tasks, servers)
+            for greedy_result in greedy_grid(tasks, servers, task_priorities, server_selection_policies,
+                                             resource_allocation_policies):
+                algorithm_results[greedy_result.algorithm] = greedy_result.store()
+                greedy_result.pretty_print()
 
             repeat_results.append(algorithm_results)
         sizing_results[f'{task_num} {server_num}'] = repeat_results
@@ -9,7 +9,7 @@ import pprint
 
 from src.auctions.critical_value_auction import critical_value_auction
 from src.auctions.decentralised_iterative_auction import optimal_decentralised_iterative_auction
-from src.auctions.vcg_auction import vcg_auction, fixed_vcg_auction
+from src.auctions.vcg_auction import vcg_auction, fixed_knapsack_vcg_auction
 from src.core.core import reset_model, set_server_heuristics
 from src.core.fixed_task import SumSpeedPowFixedAllocationPriority, generate_fixed_tasks
 from src.extra.io import parse_args, results_filename
@@ -60,14 +60,14 @@ def auction_evaluation(model_dist: ModelDistribution, repeat_num: int, repeats:
         if run_fixed:
             # Find the fixed VCG auction
             fixed_tasks = generate_fixed_tasks(tasks, SumSpeedPowFixedAllocationPriority(), False)
-            fixed_vcg_result = fixed_vcg_auction(fixed_tasks, servers, time_limit=None)
+            fixed_vcg_result = fixed_knapsack_vcg_auction(fixed_tasks, servers)
             algorithm_results[fixed_vcg_result.algorithm] = fixed_vcg_result.store()
             fixed_vcg_result.pretty_print()
             reset_model(fixed_tasks, servers)
 
             # Find the fixed VCG auction with resource knowledge
             foreknowledge_fixed_tasks = generate_fixed_tasks(tasks, SumSpeedPowFixedAllocationPriority(), True)
-            fixed_vcg_result = fixed_vcg_auction(foreknowledge_fixed_tasks, servers, time_limit=None)
+            fixed_vcg_result = fixed_knapsack_vcg_auction(foreknowledge_fixed_tasks, servers)
             algorithm_results[fixed_vcg_result.algorithm] = fixed_vcg_result.store()
             fixed_vcg_result.pretty_print()
             reset_model(foreknowledge_fixed_tasks, servers)
@@ -1,10 +1,16 @@
 """Evolve greedy policies; task prioritisation, server selection and resource allocation"""
 
+from __future__ import annotations
+
+import os
 import pprint
+from typing import TYPE_CHECKING
 
+import numpy as np
 from cma import CMAEvolutionStrategy
 
 from src.core.core import reset_model
+from src.core.process_pool import shared_process_pool, shared_state
 from src.extra.io import parse_args
 from src.extra.model import ModelDistribution
 from src.greedy.greedy import greedy_algorithm
@@ -12,14 +18,54 @@ from src.greedy.resource_allocation_policy import EvolutionStrategy as ResourceA
 from src.greedy.server_selection_policy import EvolutionStrategy as ServerSelectionEvoStrategy, ProductResources
 from src.greedy.task_prioritisation import EvolutionStrategy as TaskPriorityEvoStrategy, Value
 
+if TYPE_CHECKING:
+    from typing import Dict, List, Optional, Sequence, Tuple
+
+    from src.core.server import Server
+    from src.core.task import Task
+
+
+def evolved_policies(parameters: Sequence[float], name: int = 0) -> Tuple[TaskPriorityEvoStrategy,
+                                                                          ServerSelectionEvoStrategy,
+                                                                          ResourceAllocationEvoStrategy]:
+    """
+    The greedy policies of the evolution strategy parameters
+
+    :param parameters: The 11 policy parameters, 5 task priority, 3 server selection and 3 resource allocation
+    :param name: The name of the policies
+    :return: Tuple of the task priority, server selection policy and resource allocation policy
+    """
+    return TaskPriorityEvoStrategy(name, *parameters[:5]), ServerSelectionEvoStrategy(name, *parameters[5:8]), \
+        ResourceAllocationEvoStrategy(name, *parameters[8:11])
+
+
+def greedy_fitness(parameters: Tuple[float, ...]) -> float:
+    """
+    The fitness of the policy parameters as the mean social welfare of the greedy algorithm over the worker models
 
-def evolve_greedy_policies(model_dist: ModelDistribution, iterations: int = 30, population_size: int = 5):
+    :param parameters: The policy parameters
+    :return: The mean social welfare
     """
-    Evolves the greedy policy to find the best policies
+    social_welfares = []
+    models: List[Tuple[List[Task], List[Server]]] = shared_state()
+    for tasks, servers in models:
+        social_welfares.append(greedy_algorithm(tasks, servers, *evolved_policies(parameters)).social_welfare)
+        reset_model(tasks, servers)
+    return float(np.mean(social_welfares))
+
+
+def evolve_greedy_policies(model_dist: ModelDistribution, iterations: int = 30, population_size: int = 5,
+                           num_models: int = 5, workers: Optional[int] = None):
+    """
+    Evolves the greedy policy to find the best policies, each generation is evaluated over a pool of worker processes
+        with the fitness as the mean social welfare over the same models such that the fitness of the policy
+        parameters are cached
 
     :param model_dist: Model distribution
     :param iterations: Number of evolutions
     :param population_size: The population size
+    :param num_models: The number of models to evaluate the fitness over
+    :param workers: The number of worker processes, defaults to the number of cpus
     """
     print(f'Evolves the greedy policies for {model_dist.name} model with '
           f'{model_dist.num_tasks} tasks and {model_dist.num_servers} servers')
@@ -29,28 +75,29 @@ def evolve_greedy_policies(model_dist: ModelDistribution, iterations: int = 30,
     print(f'Lower bound is {lower_bound}')
     reset_model(eval_tasks, eval_servers)
 
-    evolution_strategy = CMAEvolutionStrategy(11 * [1], 0.2, {'population size': population_size})
-    for iteration in range(iterations):
-        suggestions = evolution_strategy.ask()
-        tasks, servers = model_dist.generate()
+    models = [model_dist.generate() for _ in range(num_models)]
+    fitness_cache: Dict[Tuple[float, ...], float] = {}
+
+    # Cma minimises the objective so the negative mean social welfare is used
+    evolution_strategy = CMAEvolutionStrategy(11 * [1], 0.2, {'popsize': population_size})
+    with shared_process_pool(models, min(workers or os.cpu_count() or 1, population_size)) as executor:
+        for iteration in range(iterations):
+            suggestions = evolution_strategy.ask()
+            parameters = [tuple(float(var) for var in suggestion) for suggestion in suggestions]
 
-        solutions = []
-        for i, suggestion in enumerate(suggestions):
-            solutions.append(greedy_algorithm(tasks, servers, TaskPriorityEvoStrategy(i, *suggestion[:5]),
-                                              ServerSelectionEvoStrategy(i, *suggestion[5:8]),
-                                              ResourceAllocationEvoStrategy(i, *suggestion[8:11])).social_welfare)
-            reset_model(tasks, servers)
+            uncached_parameters = list(dict.fromkeys(params for params in parameters if params not in fitness_cache))
+            fitness_cache.update(zip(uncached_parameters, executor.map(greedy_fitness, uncached_parameters)))
 
-        evolution_strategy.tell(suggestions, solutions)
-        evolution_strategy.disp()
+            evolution_strategy.tell(suggestions, [-fitness_cache[params] for params in parameters])
+            evolution_strategy.disp()
 
-        if iteration % 2 == 0:
-            evaluation = greedy_algorithm(eval_tasks, eval_servers, TaskPriorityEvoStrategy(0, *suggestions[0][:5]),
-                                          ServerSelectionEvoStrategy(0, *suggestions[0][5:8]),
-                                          ResourceAllocationEvoStrategy(0, *suggestions[0][8:11]))
-            print(f'Iter: {iteration} - {evaluation.social_welfare}')
+            if iteration % 2 == 0:
+                evaluation = greedy_algorithm(eval_tasks, eval_servers, *evolved_policies(parameters[0]))
+                reset_model(eval_tasks, eval_servers)
+                print(f'Iter: {iteration} - {evaluation.social_welfare}, '
+                      f'best mean social welfare: {max(fitness_cache[params] for params in parameters)}')
 
-    pprint.pprint(evolution_strategy.result())
+    pprint.pprint(evolution_strategy.result)
 
 
 if __name__ == '__main__':
@@ -11,7 +11,7 @@ from src.core.core import reset_model, set_server_heuristics
 from src.core.fixed_task import SumSpeedPowFixedAllocationPriority, generate_fixed_tasks
 from src.extra.io import parse_args, results_filename
 from src.extra.model import ModelDistribution
-from src.greedy.greedy import greedy_algorithm
+from src.greedy.greedy import greedy_grid
 from src.greedy.resource_allocation_policy import policies as resource_allocation_policies
 from src.greedy.server_selection_policy import policies as server_selection_policies
 from src.greedy.task_prioritisation import policies as task_priorities, Value
@@ -79,14 +79,10 @@ def greedy_evaluation(model_dist: ModelDistribution, repeat_num: int, repeats: i
             reset_model(tasks, servers)
 
         # Loop over all of the greedy policies permutations
-        for task_priority in task_priorities:
-            for server_selection_policy in server_selection_policies:
-                for resource_allocation_policy in resource_allocation_policies:
-                    greedy_result = greedy_algorithm(tasks, servers, task_priority, server_selection_policy,
-                                                     resource_allocation_policy)
-                    algorithm_results[greedy_result.algorithm] = greedy_result.store()
-                    greedy_result.pretty_print()
-                    reset_model(tasks, servers)
+        for greedy_result in greedy_grid(tasks, servers, task_priorities, server_selection_policies,
+                                         resource_allocation_policies):
+            algorithm_results[greedy_result.algorithm] = greedy_result.store()
+            greedy_result.pretty_print()
 
         # Add the results to the data
         model_results.append(algorithm_results)
@@ -123,14 +119,10 @@ def lower_bound_testing(model_dist: ModelDistribution, repeat_num: int, repeats:
         pp.pprint(algorithm_results)
 
         # Loop over all of the greedy policies permutations
-        for task_priority in lb_task_priorities:
-            for server_selection_policy in server_selection_policies:
-                for resource_allocation_policy in resource_allocation_policies:
-                    greedy_result = greedy_algorithm(tasks, servers, task_priority, server_selection_policy,
-                                                     resource_allocation_policy)
-                    algorithm_results[greedy_result.algorithm] = greedy_result.store()
-                    greedy_result.pretty_print()
-                    reset_model(tasks, servers)
+        for greedy_result in greedy_grid(tasks, servers, lb_task_priorities, server_selection_policies,
+                                         resource_allocation_policies):
+            algorithm_results[greedy_result.algorithm] = greedy_result.store()
+            greedy_result.pretty_print()
 
         # Add the results to the data
         model_results.append(algorithm_results)
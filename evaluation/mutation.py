@@ -3,6 +3,10 @@ Evaluating the effect of task mutation on the results of the DIA and greedy algo
 
 This is done in two parts; one investigating worsening of any task attributes and the second to investigate increasing
 the value of a task for the case of military tactical networks.
+
+The auction with each mutation is warm started from the equilibrium of the auction without mutation, with only the
+mutated task and the unallocated tasks (that may be able to use the resources freed by the mutation) bidding. The
+equilibrium is restored after each mutation using an allocation transaction.
 """
 
 from __future__ import annotations
@@ -16,6 +20,7 @@ from typing import TYPE_CHECKING, Iterable
 from src.auctions.decentralised_iterative_auction import optimal_decentralised_iterative_auction
 from src.core.core import reset_model, set_server_heuristics
 from src.core.task import Task
+from src.core.transaction import Transaction
 from src.extra.io import parse_args, results_filename
 from src.extra.model import ModelDistribution
 
@@ -37,6 +42,19 @@ def list_item_replacement(lists: List[T], old_item: T, new_item: T):
     lists.append(new_item)
 
 
+def rebid_tasks(tasks: List[Task], mutant_task: Task) -> List[Task]:
+    """
+    The tasks to bid in the auction warm started from the equilibrium, the mutant task is deallocated if allocated
+
+    :param tasks: List of tasks
+    :param mutant_task: The mutant task
+    :return: List of the mutant task and the unallocated tasks
+    """
+    if mutant_task.running_server is not None:
+        mutant_task.deallocate()
+    return [mutant_task] + [task for task in tasks if task.running_server is None and task is not mutant_task]
+
+
 # noinspection DuplicatedCode
 def full_task_mutation(model_dist: ModelDistribution, repeat_num: int, repeats: int = 25, time_limit: int = 2,
                        price_change: int = 3, initial_price: int = 25,
@@ -78,35 +96,38 @@ def full_task_mutation(model_dist: ModelDistribution, repeat_num: int, repeats:
         task_prices = {task: task.price for task in tasks}
         allocated_tasks = {task: task.running_server is not None for task in tasks}
         to_mutate_tasks = [task for task, allocated in allocated_tasks.items()]  # if allocated todo future testing
-        reset_model(tasks, servers)
-
-        # Loop each time mutating a task or server and find the auction results and compare to the unmutated result
-        for model_mutation in range(min(model_mutations, len(to_mutate_tasks))):
-            # Choice a random task and mutate it
-            task: Task = to_mutate_tasks.pop(rnd.randint(0, len(to_mutate_tasks) - 1))
-            mutant_task = task.mutate(mutate_percent)
-
-            # Replace the task with the mutant task in the task list
-            list_item_replacement(tasks, task, mutant_task)
-            assert mutant_task in tasks
-            assert task not in tasks
-
-            # Find the result with the mutated task
-            mutant_result = optimal_decentralised_iterative_auction(tasks, servers, time_limit)
-            mutation_results[f'mutation {model_mutation}'] = mutant_result.store(**{
-                'task price': task_prices[task], 'task allocated': allocated_tasks[task],
-                'mutant price': mutant_task.price, 'mutant task allocated': mutant_task.running_server is not None,
-                'mutant task name': task.name, 'mutant task deadline': mutant_task.deadline,
-                'mutant task value': mutant_task.value, 'mutant task storage': mutant_task.required_storage,
-                'mutant task computation': mutant_task.required_computation,
-                'mutant task results data': mutant_task.required_results_data,
-            })
-            pp.pprint(mutation_results[f'mutation {model_mutation}'])
-
-            # Replace the mutant task with the task in the task list
-            list_item_replacement(tasks, mutant_task, task)
-            assert mutant_task not in tasks
-            assert task in tasks
+        with Transaction(rollback=True) as equilibrium:
+            # Loop each time mutating a task or server and find the auction results and compare to the unmutated result
+            for model_mutation in range(min(model_mutations, len(to_mutate_tasks))):
+                # Choice a random task and mutate it
+                task: Task = to_mutate_tasks.pop(rnd.randint(0, len(to_mutate_tasks) - 1))
+                mutant_task = task.mutate(mutate_percent)
+
+                # Replace the task with the mutant task in the task list
+                if task.running_server is not None:
+                    task.deallocate()
+                list_item_replacement(tasks, task, mutant_task)
+                assert mutant_task in tasks
+                assert task not in tasks
+
+                # Find the result with the mutated task
+                mutant_result = optimal_decentralised_iterative_auction(tasks, servers, time_limit,
+                                                                        queued_tasks=rebid_tasks(tasks, mutant_task))
+                mutation_results[f'mutation {model_mutation}'] = mutant_result.store(**{
+                    'task price': task_prices[task], 'task allocated': allocated_tasks[task],
+                    'mutant price': mutant_task.price, 'mutant task allocated': mutant_task.running_server is not None,
+                    'mutant task name': task.name, 'mutant task deadline': mutant_task.deadline,
+                    'mutant task value': mutant_task.value, 'mutant task storage': mutant_task.required_storage,
+                    'mutant task computation': mutant_task.required_computation,
+                    'mutant task results data': mutant_task.required_results_data,
+                })
+                pp.pprint(mutation_results[f'mutation {model_mutation}'])
+
+                # Replace the mutant task with the task in the task list
+                list_item_replacement(tasks, mutant_task, task)
+                assert mutant_task not in tasks
+                assert task in tasks
+                equilibrium.restore()
 
         # Append the results to the data list
         model_results.append(mutation_results)
@@ -155,40 +176,42 @@ def mutation_grid_search(model_dist: ModelDistribution, repeat_num: int, percent
                    ((int(task.required_results_data * positive_percent) + 1) - task.required_results_data) * \
                    ((task.deadline + 1) - int(task.deadline * negative_percent))
     print(f'Number of permutations: {permutations}, original solve time: {no_mutation_dia.solve_time}, '
-          f'estimated time: {round(permutations * no_mutation_dia.solve_time / 60, 1)} minutes')
-    reset_model(tasks, servers)
-    mutation_pos = 0
-    # Loop over all of the permutations that the task requirement resources have up to the mutate percentage
-    for required_storage in range(task.required_storage, int(task.required_storage * positive_percent) + 1):
-        for required_computation in range(task.required_computation,
-                                          int(task.required_computation * positive_percent) + 1):
-            for required_results_data in range(task.required_results_data,
-                                               int(task.required_results_data * positive_percent) + 1):
-                for deadline in range(int(task.deadline * negative_percent), task.deadline + 1):
-                    # Create the new mutated task and create new tasks list with the mutant task replacing the task
-                    mutant_task = Task(f'mutated {task.name}', required_storage=required_storage,
-                                       required_computation=required_computation,
-                                       required_results_data=required_results_data, deadline=deadline, value=task.value)
-                    tasks.append(mutant_task)
-
-                    # Calculate the task price with the mutated task
-                    mutated_result = optimal_decentralised_iterative_auction(tasks, servers, time_limit)
-                    mutated_result.pretty_print()
-                    mutation_results[f'Mutation {mutation_pos}'] = mutated_result.store(**{
-                        'mutated task': task.name, 'task price': mutant_task.price,
-                        'required storage': required_storage, 'required computation': required_computation,
-                        'required results data': required_results_data, 'deadline': deadline,
-                        'allocated': mutant_task.running_server is not None
-                    })
-                    mutation_pos += 1
-
-                    # Remove the mutant task and read the task to the list of tasks and reset the model
-                    tasks.remove(mutant_task)
-                    reset_model(tasks, servers)
-
-                    # Save all of the results to a file
-                    with open(filename, 'w') as file:
-                        json.dump(mutation_results, file)
+          f'estimated time: {round(permutations * no_mutation_dia.solve_time / 60, 1)} minutes (upper bound)')
+    with Transaction(rollback=True) as equilibrium:
+        mutation_pos = 0
+        # Loop over all of the permutations that the task requirement resources have up to the mutate percentage
+        for required_storage in range(task.required_storage, int(task.required_storage * positive_percent) + 1):
+            for required_computation in range(task.required_computation,
+                                              int(task.required_computation * positive_percent) + 1):
+                for required_results_data in range(task.required_results_data,
+                                                   int(task.required_results_data * positive_percent) + 1):
+                    for deadline in range(int(task.deadline * negative_percent), task.deadline + 1):
+                        # Create the new mutated task and create new tasks list with the mutant task replacing the task
+                        mutant_task = Task(f'mutated {task.name}', required_storage=required_storage,
+                                           required_computation=required_computation,
+                                           required_results_data=required_results_data, deadline=deadline,
+                                           value=task.value)
+                        tasks.append(mutant_task)
+
+                        # Calculate the task price with the mutated task
+                        mutated_result = optimal_decentralised_iterative_auction(tasks, servers, time_limit,
+                                                                                 queued_tasks=[mutant_task])
+                        mutated_result.pretty_print()
+                        mutation_results[f'Mutation {mutation_pos}'] = mutated_result.store(**{
+                            'mutated task': task.name, 'task price': mutant_task.price,
+                            'required storage': required_storage, 'required computation': required_computation,
+                            'required results data': required_results_data, 'deadline': deadline,
+                            'allocated': mutant_task.running_server is not None
+                        })
+                        mutation_pos += 1
+
+                        # Remove the mutant task and restore the equilibrium
+                        tasks.remove(mutant_task)
+                        equilibrium.restore()
+
+                        # Save all of the results to a file
+                        with open(filename, 'w') as file:
+                            json.dump(mutation_results, file)
     print('Finished running')
 
 
@@ -230,28 +253,28 @@ def value_only_mutation(model_dist: ModelDistribution, repeat_num: int, repeats:
 
         # Save the task prices and server revenues
         to_mutate_tasks = tasks[:]
-        reset_model(tasks, servers)
-
-        # Loop each time mutating a task or server and find the auction results and compare to the unmutated result
-        for model_mutation in range(min(model_mutations, len(to_mutate_tasks))):
-            # Choice a random task and mutate it
-            task: Task = to_mutate_tasks.pop(rnd.randint(0, len(to_mutate_tasks) - 1))
-            task_value = task.value
-
-            task_mutation_results = {}
-            for value in value_mutations:
-                task.value = task_value - value
-
-                # Find the result with the mutated task
-                mutant_result = optimal_decentralised_iterative_auction(tasks, servers, time_limit)
-                task_mutation_results[f'value {value}'] = mutant_result.store(**{
-                    'price': task.price, 'allocated': task.running_server is not None, 'value': task.value
-                })
-                pp.pprint(task_mutation_results[f'value {value}'])
-                reset_model(tasks, servers)
+        with Transaction(rollback=True) as equilibrium:
+            # Loop each time mutating a task or server and find the auction results and compare to the unmutated result
+            for model_mutation in range(min(model_mutations, len(to_mutate_tasks))):
+                # Choice a random task and mutate it
+                task: Task = to_mutate_tasks.pop(rnd.randint(0, len(to_mutate_tasks) - 1))
+                task_value = task.value
+
+                task_mutation_results = {}
+                for value in value_mutations:
+                    task.value = task_value - value
+
+                    # Find the result with the mutated task
+                    mutant_result = optimal_decentralised_iterative_auction(tasks, servers, time_limit,
+                                                                            queued_tasks=rebid_tasks(tasks, task))
+                    task_mutation_results[f'value {value}'] = mutant_result.store(**{
+                        'price': task.price, 'allocated': task.running_server is not None, 'value': task.value
+                    })
+                    pp.pprint(task_mutation_results[f'value {value}'])
+                    equilibrium.restore()
 
-            task.value = task_value
-            mutation_results[f'task {task.name}'] = task_mutation_results
+                task.value = task_value
+                mutation_results[f'task {task.name}'] = task_mutation_results
 
         # Append the results to the data list
         model_results.append(mutation_results)
@@ -12,7 +12,7 @@ from src.core.core import reset_model
 from src.core.fixed_task import SumSpeedPowFixedAllocationPriority, generate_fixed_tasks
 from src.extra.io import parse_args, results_filename
 from src.extra.model import ModelDistribution
-from src.greedy.greedy import greedy_algorithm
+from src.greedy.greedy import greedy_grid
 from src.greedy.resource_allocation_policy import policies as resource_allocation_policies
 from src.greedy.server_selection_policy import policies as server_selection_policies
 from src.greedy.task_prioritisation import policies as task_priorities
@@ -42,7 +42,7 @@ def server_resource_ratio(model_dist: ModelDistribution, repeat_num: int, repeat
     for repeat in range(repeats):
         print(f'\nRepeat: {repeat}')
         # Generate the tasks and servers
-        tasks, servers = model_dist.generate()
+        tasks, servers = model_dist.generate(compatibility=True)
         ratio_results = {'model': {
             'tasks': [task.save() for task in tasks], 'servers': [server.save() for server in servers]
         }}
@@ -80,14 +80,10 @@ def server_resource_ratio(model_dist: ModelDistribution, repeat_num: int, repeat
                 reset_model(fixed_tasks, servers)
 
             # Loop over all of the greedy policies permutations
-            for task_priority in task_priorities:
-                for server_selection_policy in server_selection_policies:
-                    for resource_allocation_policy in resource_allocation_policies:
-                        greedy_result = greedy_algorithm(tasks, servers, task_priority, server_selection_policy,
-                                                         resource_allocation_policy)
-                        algorithm_results[greedy_result.algorithm] = greedy_result.store(ratio=ratio)
-                        pp.pprint(algorithm_results[greedy_result.algorithm])
-                        reset_model(tasks, servers)
+            for greedy_result in greedy_grid(tasks, servers, task_priorities, server_selection_policies,
+                                             resource_allocation_policies):
+                algorithm_results[greedy_result.algorithm] = greedy_result.store(ratio=ratio)
+                pp.pprint(algorithm_results[greedy_result.algorithm])
 
             ratio_results[f'ratio {ratio}'] = algorithm_results
         model_results.append(ratio_results)
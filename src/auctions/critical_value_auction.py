@@ -6,19 +6,32 @@ Algorithm steps
 2. For all of the task's allocated by the greedy algorithm
     1. Determine the minimum point in the task value density list where the task will still be allocated
     2. Using the inverse value density function and the elimination task's value to calculate the task's critical value
+
+As the greedy algorithm only decreases the servers' available resources, a task allocated by the greedy algorithm can
+    run at every position before its rank position so replaying the greedy algorithm without the task is identical to
+    the greedy algorithm up to the task's position. The greedy allocation is checkpointed during the greedy algorithm
+    such that each replay resumes from the checkpoint before the task's position.
+
+The critical values of the tasks are independent of each other so can be found over a pool of worker processes, each
+    worker is initialised with a copy of the tasks and servers before the greedy algorithm and finds the critical
+    values for a subset of the allocated tasks.
 """
 
 from __future__ import annotations
 
+from contextlib import nullcontext
 from time import time
 from typing import TYPE_CHECKING
 
-from src.core.core import server_task_allocation, reset_model, debug
+from src.core.core import server_task_allocation, debug
+from src.core.process_pool import shared_process_pool, shared_state
+from src.core.transaction import Transaction, checkpoint, restore
 from src.extra.result import Result
-from src.greedy.greedy import allocate_tasks
+from src.greedy.greedy import allocate_task
+from src.greedy.task_prioritisation import TaskArrays
 
 if TYPE_CHECKING:
-    from typing import List, Dict, Tuple
+    from typing import List, Dict, Tuple, Optional
 
     from src.core.server import Server
     from src.core.task import Task
@@ -28,56 +41,69 @@ if TYPE_CHECKING:
     from src.greedy.task_prioritisation import TaskPriority
 
 
-def critical_value_auction(tasks: List[Task], servers: List[Server], value_density: TaskPriority,
-                           server_selection_policy: ServerSelectionPolicy,
-                           resource_allocation_policy: ResourceAllocationPolicy,
-                           debug_initial_allocation: bool = False, debug_critical_value: bool = False) -> Result:
+def greedy_checkpoints(ranked_tasks: List[Task], servers: List[Server], server_selection_policy: ServerSelectionPolicy,
+                       resource_allocation_policy: ResourceAllocationPolicy, checkpoint_interval: int = 1) -> List[int]:
     """
-    Run the Critical value auction
+    Runs the greedy algorithm, checkpointing the allocation every checkpoint interval positions, a snapshot must be open
 
-    :param tasks: List of tasks
+    :param ranked_tasks: List of tasks ranked by value density
+    :param servers: List of servers
+    :param server_selection_policy: Server selection function
+    :param resource_allocation_policy: Resource allocation function
+    :param checkpoint_interval: The number of rank positions between the checkpoints of the greedy allocation
+    :return: List of the checkpoints
+    """
+    prefix_checkpoints: List[int] = []
+    server_index = server_selection_policy.server_index(servers)
+    for task_pos, task in enumerate(ranked_tasks):
+        if task_pos % checkpoint_interval == 0:
+            prefix_checkpoints.append(checkpoint())
+        allocate_task(task, servers, server_selection_policy, resource_allocation_policy, server_index)
+    return prefix_checkpoints
+
+
+def critical_values(critical_tasks: List[Task], ranked_tasks: List[Task], valued_tasks: Dict[Task, float],
+                    servers: List[Server], value_density: TaskPriority, server_selection_policy: ServerSelectionPolicy,
+                    resource_allocation_policy: ResourceAllocationPolicy, prefix_checkpoints: List[int],
+                    checkpoint_interval: int = 1, debug_critical_value: bool = False) -> Dict[Task, float]:
+    """
+    Finds the critical value of the tasks allocated by the greedy algorithm by resuming the greedy algorithm from the
+        checkpoint before each task without the task, the allocation is left at the first checkpoint restored
+
+    :param critical_tasks: List of tasks allocated by the greedy algorithm
+    :param ranked_tasks: List of tasks ranked by value density
+    :param valued_tasks: Dictionary of the tasks value density
     :param servers: List of servers
     :param value_density: Value density function
     :param server_selection_policy: Server selection function
     :param resource_allocation_policy: Resource allocation function
-    :param debug_initial_allocation: If to debug the initial allocation
+    :param prefix_checkpoints: The checkpoints of the greedy algorithm
+    :param checkpoint_interval: The number of rank positions between the checkpoints of the greedy allocation
     :param debug_critical_value: If to debug the critical value
-    :return: The results from the auction
+    :return: Dictionary of the critical task prices
     """
-    start_time = time()
-
-    valued_tasks: Dict[Task, float] = {task: value_density.evaluate(task) for task in tasks}
-    ranked_tasks: List[Task] = sorted(valued_tasks, key=lambda j: valued_tasks[j], reverse=True)
-
-    # Runs the greedy algorithm
-    allocate_tasks(ranked_tasks, servers, server_selection_policy, resource_allocation_policy)
-    allocation_data: Dict[Task, Tuple[int, int, int, Server]] = {
-        task: (task.loading_speed, task.compute_speed, task.sending_speed, task.running_server)
-        for task in ranked_tasks if task.running_server
-    }
-
-    if debug_initial_allocation:
-        max_name_len = max(len(task.name) for task in tasks)
-        print(f"{'Task':<{max_name_len}} | s | w | r | server")
-        for task, (s, w, r, server) in allocation_data.items():
-            print(f'{task:<{max_name_len}}|{s:3f}|{w:3f}|{r:3f}|{server.name}')
-
-    reset_model(tasks, servers)
-
-    # Loop through each task allocated and find the critical value for the task
-    for critical_task in allocation_data.keys():
-        # Remove the task from the ranked tasks and save the original position
-        critical_pos = ranked_tasks.index(critical_task)
-        ranked_tasks.remove(critical_task)
-
-        # Loop though the tasks in order checking if the task can be allocated at any point
-        for task_pos, task in enumerate(ranked_tasks):
+    ranked_positions: Dict[Task, int] = {task: pos for pos, task in enumerate(ranked_tasks)}
+
+    # Loop through each task allocated in reverse rank order and find the critical value for the task, the reverse order
+    #   is required as restoring a checkpoint undoes the changes after the checkpoint including the later checkpoints
+    critical_prices: Dict[Task, float] = {}
+    for critical_task in sorted(critical_tasks, key=lambda j: ranked_positions[j], reverse=True):
+        critical_pos = ranked_positions[critical_task]
+
+        # Restore the allocation to the checkpoint before the critical task and allocate the tasks up to the critical
+        #   task, these tasks are allocated the same as the greedy algorithm as the critical task can be allocated
+        checkpoint_pos = critical_pos - critical_pos % checkpoint_interval
+        restore(prefix_checkpoints[checkpoint_pos // checkpoint_interval])
+        server_index = server_selection_policy.server_index(servers)
+        for task in ranked_tasks[checkpoint_pos:critical_pos]:
+            allocate_task(task, servers, server_selection_policy, resource_allocation_policy, server_index)
+
+        # Loop though the tasks after the critical task in order checking if the task can be allocated at any point
+        for task_pos in range(critical_pos + 1, len(ranked_tasks)):
             # If any of the servers can allocate the critical task then allocate the current task to a server
             if any(server.can_run(critical_task) for server in servers):
-                server = server_selection_policy.select(task, servers)
-                if server:  # There may not be a server that can allocate the task
-                    s, w, r = resource_allocation_policy.allocate(task, server)
-                    server_task_allocation(server, task, s, w, r)
+                allocate_task(ranked_tasks[task_pos], servers, server_selection_policy, resource_allocation_policy,
+                              server_index)
             else:
                 # If critical task isn't able to be allocated therefore the last task's density is found
                 #   and the inverse of the value density is calculated with the last task's density.
@@ -88,13 +114,99 @@ def critical_value_auction(tasks: List[Task], servers: List[Server], value_densi
 
         debug(f'{critical_task.name} Task critical value: {critical_task.price:.3f}', debug_critical_value)
 
-        # Read the task back into the ranked task in its original position and reset the model but not forgetting the
-        #   new critical task's price
-        ranked_tasks.insert(critical_pos, critical_task)
-        reset_model(tasks, servers, forget_prices=False)
+        # Save the critical task's price as restoring the allocation will also restore the price
+        critical_prices[critical_task] = critical_task.price
+    return critical_prices
+
+
+def _critical_value_worker(critical_indexes: List[int]) -> List[Tuple[int, float]]:
+    """
+    Finds the critical values of the tasks on the worker process copy of the auction
+
+    :param critical_indexes: List of the task indexes allocated by the greedy algorithm
+    :return: List of the task indexes and critical values
+    """
+    tasks, servers, ranked_indexes, task_densities, value_density, server_selection_policy, \
+        resource_allocation_policy, checkpoint_interval = shared_state()
+    ranked_tasks = [tasks[index] for index in ranked_indexes]
+
+    with Transaction(rollback=True):
+        prefix_checkpoints = greedy_checkpoints(ranked_tasks, servers, server_selection_policy,
+                                                resource_allocation_policy, checkpoint_interval)
+        critical_prices = critical_values([tasks[index] for index in critical_indexes], ranked_tasks,
+                                          dict(zip(tasks, task_densities)), servers, value_density,
+                                          server_selection_policy, resource_allocation_policy, prefix_checkpoints,
+                                          checkpoint_interval)
+    return [(index, critical_prices[tasks[index]]) for index in critical_indexes]
+
+
+def critical_value_auction(tasks: List[Task], servers: List[Server], value_density: TaskPriority,
+                           server_selection_policy: ServerSelectionPolicy,
+                           resource_allocation_policy: ResourceAllocationPolicy, checkpoint_interval: int = 1,
+                           workers: Optional[int] = None, debug_initial_allocation: bool = False,
+                           debug_critical_value: bool = False) -> Result:
+    """
+    Run the Critical value auction
+
+    :param tasks: List of tasks
+    :param servers: List of servers
+    :param value_density: Value density function
+    :param server_selection_policy: Server selection function
+    :param resource_allocation_policy: Resource allocation function
+    :param checkpoint_interval: The number of rank positions between the checkpoints of the greedy allocation
+    :param workers: The number of worker processes to find the critical values, if None or 1 then the critical values
+        are found serially
+    :param debug_initial_allocation: If to debug the initial allocation
+    :param debug_critical_value: If to debug the critical value
+    :return: The results from the auction
+    """
+    start_time = time()
+
+    task_densities = value_density.evaluate_batch(TaskArrays(tasks))
+    valued_tasks: Dict[Task, float] = dict(zip(tasks, task_densities.tolist()))
+    ranked_indexes: List[int] = value_density.rank_indexes(task_densities).tolist()
+    ranked_tasks: List[Task] = [tasks[index] for index in ranked_indexes]
+
+    # The worker processes are created with a copy of the auction before the greedy algorithm. The transaction of the
+    #   allocation before the greedy algorithm is such that the allocation is restored for each critical task, the
+    #   allocation before the greedy algorithm is restored at the end of the transaction
+    with (shared_process_pool((tasks, servers, ranked_indexes, task_densities.tolist(), value_density,
+                               server_selection_policy, resource_allocation_policy, checkpoint_interval), workers)
+          if workers and 1 < workers else nullcontext()) as executor, Transaction(rollback=True):
+        # Runs the greedy algorithm
+        prefix_checkpoints = greedy_checkpoints(ranked_tasks, servers, server_selection_policy,
+                                                resource_allocation_policy, checkpoint_interval)
+        allocation_data: Dict[Task, Tuple[int, int, int, Server]] = {
+            task: (task.loading_speed, task.compute_speed, task.sending_speed, task.running_server)
+            for task in ranked_tasks if task.running_server
+        }
+
+        if debug_initial_allocation:
+            max_name_len = max(len(task.name) for task in tasks)
+            print(f"{'Task':<{max_name_len}} | s | w | r | server")
+            for task, (s, w, r, server) in allocation_data.items():
+                print(f'{task:<{max_name_len}}|{s:3f}|{w:3f}|{r:3f}|{server.name}')
+
+        if executor is None:
+            critical_prices = critical_values(list(allocation_data.keys()), ranked_tasks, valued_tasks, servers,
+                                              value_density, server_selection_policy, resource_allocation_policy,
+                                              prefix_checkpoints, checkpoint_interval, debug_critical_value)
+        else:
+            # The allocated tasks are split between the workers with the prices found for each task index
+            task_indexes = {task: index for index, task in enumerate(tasks)}
+            critical_indexes = [task_indexes[task] for task in allocation_data.keys()]
+            workers = min(workers, max(len(critical_indexes), 1))
+            critical_prices = {tasks[index]: price
+                               for worker_prices in executor.map(_critical_value_worker,
+                                                                 [critical_indexes[worker::workers]
+                                                                  for worker in range(workers)])
+                               for index, price in worker_prices}
+            for task, price in critical_prices.items():
+                debug(f'{task.name} Task critical value: {price:.3f}', debug_critical_value)
 
     # Allocate the tasks and set the price to the critical value
     for task, (s, w, r, server) in allocation_data.items():
+        task.price = critical_prices[task]
         server_task_allocation(server, task, s, w, r)
 
     algorithm_name = f'Critical Value Auction {value_density.name}, ' \
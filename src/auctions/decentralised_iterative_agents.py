@@ -0,0 +1,361 @@
+"""
+Agent based simulation of the decentralised iterative auction using asyncio
+
+Each server is an agent with an inbox that processes its messages in order, tasks bid by sending quote requests to the
+    server agents with the quotes sent back to the task. Once the task has the quotes of all of the servers, the
+    minimum price server (ties broken by the server's list position) is sent an accept message if the price is less
+    than the task value. The server only accepts if its allocation hasn't changed since the quote, otherwise the task
+    is rejected and bids again, and the tasks evicted by the allocation are sent back to bid again.
+
+Messages are delivered after a simulated network latency with the timing of every message recorded. With a single
+    outstanding bid at a time the allocation is the same as the decentralised iterative solver as each bid is the same
+    as an auction round, with multiple outstanding bids the tasks bid concurrently as with a distributed auction.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import random as rnd
+from time import time
+from typing import TYPE_CHECKING
+
+from src.auctions.decentralised_iterative_auction import allocate_task, optimal_task_price, greedy_task_price, \
+    exact_task_price
+from src.core.core import debug
+from src.extra.result import Result
+
+if TYPE_CHECKING:
+    from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+    from src.auctions.decentralised_iterative_auction import PriceDensity
+    from src.core.server import Server
+    from src.core.task import Task
+    from src.greedy.resource_allocation_policy import ResourceAllocationPolicy
+
+
+class Message:
+    """Message between the task and server agents with the message timings"""
+
+    __slots__ = ('kind', 'task', 'server', 'reply_to', 'content', 'sent_time', 'delivered_time')
+
+    def __init__(self, kind: str, task: Task, server: Server, reply_to: Optional[asyncio.Queue] = None,
+                 content: Any = None):
+        """
+        Constructor
+
+        :param kind: The message kind, quote request, quote, accept, accepted, rejected or error
+        :param task: The bidding task
+        :param server: The server
+        :param reply_to: The inbox to reply to
+        :param content: The message content
+        """
+        self.kind = kind
+        self.task = task
+        self.server = server
+        self.reply_to = reply_to
+        self.content = content
+
+        self.sent_time: float = 0.0
+        self.delivered_time: float = 0.0
+
+
+class Network:
+    """Simulated network that delivers the messages after a latency and records the message timings"""
+
+    def __init__(self, latency: Union[float, Callable[[], float]] = 0.0):
+        """
+        Constructor
+
+        :param latency: The message latency in seconds or a function for the latency of each message
+        """
+        self.latency = latency
+        self.telemetry: List[Dict[str, Any]] = []
+
+    def send(self, inbox: asyncio.Queue, message: Message):
+        """
+        Sends the message to the inbox after the latency without blocking the sender
+
+        :param inbox: The receiver inbox
+        :param message: The message
+        """
+        message.sent_time = time()
+        latency = self.latency() if callable(self.latency) else self.latency
+        asyncio.get_running_loop().call_later(latency, self.deliver, inbox, message)
+
+    @staticmethod
+    def deliver(inbox: asyncio.Queue, message: Message):
+        """
+        Delivers the message to the inbox
+
+        :param inbox: The receiver inbox
+        :param message: The message
+        """
+        message.delivered_time = time()
+        inbox.put_nowait(message)
+
+    def record(self, message: Message, processed_time: float):
+        """
+        Records the message timings once the message is processed
+
+        :param message: The message
+        :param processed_time: The time that the message was processed by the receiver
+        """
+        self.telemetry.append({
+            'kind': message.kind, 'task': message.task.name, 'server': message.server.name,
+            'latency': message.delivered_time - message.sent_time, 'processing': processed_time - message.delivered_time
+        })
+
+
+class ServerAgent:
+    """Server agent that quotes task prices and allocates accepted tasks"""
+
+    def __init__(self, server: Server, task_price_solver: Callable, network: Network, threaded_quotes: bool = False,
+                 debug_allocation: bool = False):
+        """
+        Constructor
+
+        :param server: The server
+        :param task_price_solver: Task price solver
+        :param network: The network to send the replies
+        :param threaded_quotes: If to solve the quotes in a thread such that other agents run during the solve,
+            this requires the task price solver to not change the tasks or servers
+        :param debug_allocation: If to debug allocation
+        """
+        self.server = server
+        self.task_price_solver = task_price_solver
+        self.network = network
+        self.threaded_quotes = threaded_quotes
+        self.debug_allocation = debug_allocation
+
+        self.inbox: asyncio.Queue = asyncio.Queue()
+        # The allocation version is incremented for every allocation such that stale quotes are rejected
+        self.version: int = 0
+
+    async def run(self):
+        """
+        Processes the messages of the inbox until a None message is received, any error processing a message is
+            replied with an error message
+        """
+        while (message := await self.inbox.get()) is not None:
+            # Errors of the solver or the allocation are sent back to the task such that the auction doesn't hang
+            try:
+                if message.kind == 'quote request':
+                    if self.threaded_quotes:
+                        price, speeds = await asyncio.to_thread(self.task_price_solver, message.task, self.server)
+                    else:
+                        price, speeds = self.task_price_solver(message.task, self.server)
+                    reply = Message('quote', message.task, self.server, content=(price, speeds, self.version))
+                elif message.kind == 'accept':
+                    price, speeds, version = message.content
+                    if version == self.version:
+                        evicted_tasks: List[Task] = []
+                        allocate_task(message.task, price, self.server, evicted_tasks, speeds)
+                        self.version += 1
+                        debug(f'[+] {message.task.name} Task set to {self.server.name} with price {price} '
+                              f'for server revenue of {self.server.revenue}', self.debug_allocation)
+                        reply = Message('accepted', message.task, self.server, content=evicted_tasks)
+                    else:
+                        reply = Message('rejected', message.task, self.server)
+                else:
+                    raise ValueError(f'Unknown message kind: {message.kind}')
+            except Exception as error:
+                reply = Message('error', message.task, self.server, content=error)
+
+            self.network.record(message, time())
+            self.network.send(message.reply_to, reply)
+
+
+async def task_bid(task: Task, agents: List[ServerAgent], network: Network,
+                   debug_allocation: bool = False) -> Tuple[Optional[List[Task]], float]:
+    """
+    The task bids for a server by requesting a quote from every server that could run the task then accepting the
+        minimum price quote if the price is less than the task value
+
+    :param task: The bidding task
+    :param agents: List of server agents
+    :param network: The network
+    :param debug_allocation: If to debug allocation
+    :return: The tasks evicted by the allocation, None if the accept is rejected, with the bid latency
+    """
+    start_time = time()
+    inbox: asyncio.Queue = asyncio.Queue()
+    quote_agents = [agent for agent in agents if agent.server.can_run_empty(task)]
+    for agent in quote_agents:
+        network.send(agent.inbox, Message('quote request', task, agent.server, inbox))
+
+    quotes: Dict[Server, Tuple[float, Dict, int]] = {}
+    while len(quotes) < len(quote_agents):
+        message = await inbox.get()
+        network.record(message, time())
+        if message.kind == 'error':
+            raise message.content
+        quotes[message.server] = message.content
+
+    # The minimum price with ties broken by the server's list position such that the selection is deterministic
+    min_price, min_agent = -1, None
+    for agent in quote_agents:
+        price, _, _ = quotes[agent.server]
+        if min_price == -1 or price < min_price:
+            min_price, min_agent = price, agent
+
+    if 0 < min_price < task.value:
+        network.send(min_agent.inbox, Message('accept', task, min_agent.server, inbox, quotes[min_agent.server]))
+        message = await inbox.get()
+        network.record(message, time())
+        if message.kind == 'error':
+            raise message.content
+        elif message.kind == 'rejected':
+            debug(f'[*] {task.name} Task quote from {min_agent.server.name} is stale', debug_allocation)
+            return None, time() - start_time
+        return message.content, time() - start_time
+    else:
+        debug(f'[-] Removing {task.name} Task, min price is {min_price} and task value is {task.value}',
+              debug_allocation)
+        return [], time() - start_time
+
+
+async def decentralised_iterative_agents(tasks: List[Task], servers: List[Server], task_price_solver,
+                                         latency: Union[float, Callable[[], float]] = 0.0,
+                                         outstanding_bids: int = 1, threaded_quotes: bool = False,
+                                         debug_allocation: bool = False
+                                         ) -> Tuple[int, Dict[Task, int], float, Network, List[float]]:
+    """
+    Decentralised iterative auction with server agents and concurrent task bids
+
+    :param tasks: List of tasks
+    :param servers: List of servers
+    :param task_price_solver: Task price solver
+    :param latency: The message latency in seconds or a function for the latency of each message
+    :param outstanding_bids: The maximum number of concurrent task bids
+    :param threaded_quotes: If the server agents solve the quotes in a thread
+    :param debug_allocation: If to debug allocation
+    :return: A tuple with the number of rounds, the rounds of each task, the solve time, the network with the message
+        telemetry and the latency of each bid
+    """
+    assert 0 < outstanding_bids, f'Outstanding bids: {outstanding_bids}'
+    start_time = time()
+
+    network = Network(latency)
+    agents = [ServerAgent(server, task_price_solver, network, threaded_quotes, debug_allocation)
+              for server in servers]
+    agent_runners = [asyncio.create_task(agent.run()) for agent in agents]
+
+    total_rounds, task_rounds, bid_latencies = 0, {task: 0 for task in tasks}, []
+    unallocated_tasks: List[Task] = tasks[:]
+    bids: Dict[asyncio.Task, Task] = {}
+    try:
+        while unallocated_tasks or bids:
+            # Start bids for random unallocated tasks up to the maximum outstanding bids
+            while unallocated_tasks and len(bids) < outstanding_bids:
+                task = unallocated_tasks.pop(rnd.randint(0, len(unallocated_tasks) - 1))
+                bids[asyncio.create_task(task_bid(task, agents, network, debug_allocation))] = task
+
+            finished_bids, _ = await asyncio.wait(bids.keys(), return_when=asyncio.FIRST_COMPLETED)
+            for bid in finished_bids:
+                task = bids.pop(bid)
+                evicted_tasks, bid_latency = bid.result()
+                if evicted_tasks is None:
+                    unallocated_tasks.append(task)
+                else:
+                    unallocated_tasks.extend(evicted_tasks)
+
+                bid_latencies.append(bid_latency)
+                task_rounds[task] += 1
+                total_rounds += 1
+    finally:
+        # The agents are always stopped, with any outstanding bids cancelled, if a bid or an agent raises an error
+        for bid in bids:
+            bid.cancel()
+        for agent in agents:
+            agent.inbox.put_nowait(None)
+        await asyncio.gather(*bids, *agent_runners, return_exceptions=True)
+
+    assert all(0 < task.price for task in tasks if task.running_server)
+    return total_rounds, task_rounds, time() - start_time, network, bid_latencies
+
+
+def agent_results(algorithm_name: str, tasks: List[Task], servers: List[Server], task_price_solver,
+                  latency: Union[float, Callable[[], float]], outstanding_bids: int, threaded_quotes: bool,
+                  debug_allocation: bool, **kwargs) -> Result:
+    """
+    Runs the agent based decentralised iterative auction with the results including the message telemetry
+
+    :param algorithm_name: The algorithm name
+    :param tasks: List of tasks
+    :param servers: List of servers
+    :param task_price_solver: Task price solver
+    :param latency: The message latency in seconds or a function for the latency of each message
+    :param outstanding_bids: The maximum number of concurrent task bids
+    :param threaded_quotes: If the server agents solve the quotes in a thread
+    :param debug_allocation: If to debug allocation
+    :param kwargs: Additional results
+    :return: The results of the auction
+    """
+    rounds, task_rounds, solve_time, network, bid_latencies = asyncio.run(decentralised_iterative_agents(
+        tasks, servers, task_price_solver, latency, outstanding_bids, threaded_quotes, debug_allocation))
+
+    message_latencies = [message['latency'] for message in network.telemetry]
+    return Result(algorithm_name, tasks, servers, solve_time, is_auction=True,
+                  **{'server price change': {server.name: server.price_change for server in servers},
+                     'server initial price': {server.name: server.initial_price for server in servers},
+                     'rounds': rounds, 'task rounds': {task.name: rounds for task, rounds in task_rounds.items()},
+                     'outstanding bids': outstanding_bids, 'messages': len(network.telemetry),
+                     'mean message latency': sum(message_latencies) / max(len(message_latencies), 1),
+                     'mean bid latency': sum(bid_latencies) / max(len(bid_latencies), 1),
+                     'max bid latency': max(bid_latencies, default=0),
+                     'bids per second': rounds / max(solve_time, 1e-9),
+                     **kwargs})
+
+
+def optimal_agent_decentralised_iterative_auction(tasks: List[Task], servers: List[Server], time_limit: int = 5,
+                                                  latency: Union[float, Callable[[], float]] = 0.0,
+                                                  outstanding_bids: int = 1, threads: Optional[int] = None,
+                                                  exact_solver: bool = True, debug_allocation: bool = False) -> Result:
+    """
+    Runs the agent based optimal decentralised iterative auction, the server agents solve the cplex quotes in a thread
+
+    :param tasks: List of tasks
+    :param servers: List of servers
+    :param time_limit: The time limit for the dia solver
+    :param latency: The message latency in seconds or a function for the latency of each message
+    :param outstanding_bids: The maximum number of concurrent task bids
+    :param threads: The number of cplex worker threads of each quote, this is only for the cplex task price solver
+    :param exact_solver: If to use the exact task price solver otherwise the cplex task price solver
+    :param debug_allocation: If to debug allocation
+    :return: The results of the auction
+    """
+    if exact_solver:
+        assert threads is None, f'Threads ({threads}) are only for the cplex task price solver (exact_solver=False)'
+        return agent_results('Agent Optimal DIA', tasks, servers, exact_task_price, latency, outstanding_bids, False,
+                             debug_allocation)
+
+    solver = functools.partial(optimal_task_price, time_limit=time_limit, threads=threads)
+    return agent_results('Agent Optimal DIA', tasks, servers, solver, latency, outstanding_bids, True,
+                         debug_allocation)
+
+
+def greedy_agent_decentralised_iterative_auction(tasks: List[Task], servers: List[Server],
+                                                 price_density: PriceDensity,
+                                                 resource_allocation_policy: ResourceAllocationPolicy,
+                                                 latency: Union[float, Callable[[], float]] = 0.0,
+                                                 outstanding_bids: int = 1,
+                                                 debug_allocation: bool = False) -> Result:
+    """
+    Runs the agent based greedy decentralised iterative auction, as the greedy quotes are fast, the server agents
+        solve the quotes without yielding to the other agents
+
+    :param tasks: List of tasks
+    :param servers: List of servers
+    :param price_density: Price density policy
+    :param resource_allocation_policy: Resource allocation policy
+    :param latency: The message latency in seconds or a function for the latency of each message
+    :param outstanding_bids: The maximum number of concurrent task bids
+    :param debug_allocation: If to debug allocation
+    :return: The results of the auction
+    """
+    solver = functools.partial(greedy_task_price, price_density=price_density,
+                               resource_allocation_policy=resource_allocation_policy)
+    return agent_results('Agent Greedy DIA', tasks, servers, solver, latency, outstanding_bids, False,
+                         debug_allocation, **{'price density': price_density.name,
+                                              'resource allocation policy': resource_allocation_policy.name})
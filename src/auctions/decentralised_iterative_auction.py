@@ -6,19 +6,25 @@ from __future__ import annotations
 
 import functools
 import math
+import os
 import random as rnd
 from abc import ABC, abstractmethod
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from time import time
 from typing import TYPE_CHECKING, Dict
 
+import numpy as np
 from docplex.cp.model import CpoModel, SOLVE_STATUS_FEASIBLE, SOLVE_STATUS_OPTIMAL
 
-from src.core.core import reset_model, server_task_allocation, debug
+from src.core.core import server_task_allocation, debug
+from src.core.server import feasible_bandwidth_split
 from src.extra.result import Result
 from src.greedy.task_prioritisation import ResourceSum
 
 if TYPE_CHECKING:
-    from typing import List, Tuple, Iterable, TypeVar
+    from typing import List, Tuple, Iterable, TypeVar, Optional
 
     from src.greedy.resource_allocation_policy import ResourceAllocationPolicy
     from src.core.server import Server
@@ -85,17 +91,20 @@ def allocate_task(new_task, task_price, server, unallocated_tasks, task_speeds):
     :param unallocated_tasks: List of unallocated tasks
     :param task_speeds: Dictionary of task speeds
     """
-    server.reset_allocations()
-
-    # For each of the task, if the task is allocated then allocate the task or reset the task
+    # Deallocate the tasks that are evicted from the server or whose speeds are changed
+    for task, (loading, compute, sending, allocated) in task_speeds.items():
+        if task.running_server is not None:
+            if not allocated:
+                task.deallocate()
+                unallocated_tasks.append(task)
+            elif (task.loading_speed, task.compute_speed, task.sending_speed) != (loading, compute, sending):
+                task.deallocate(forget_price=False)
+
+    # Allocate the new task and the tasks whose speeds are changed
     new_task.price = task_price
     for task, (loading, compute, sending, allocated) in task_speeds.items():
-        if allocated:
-            task.reset_allocation(forget_price=False)
+        if allocated and task.running_server is None:
             server_task_allocation(server, task, loading, compute, sending)
-        else:
-            task.reset_allocation()
-            unallocated_tasks.append(task)
 
 
 def greedy_task_price(new_task: Task, server: Server, price_density: PriceDensity,
@@ -103,6 +112,12 @@ def greedy_task_price(new_task: Task, server: Server, price_density: PriceDensit
     """
     Calculates the task price using greedy algorithm
 
+    The greedy allocation is trialled on an empty copy of the server with the new task allocated first and the server's
+        tasks allocated in price density order, the server and its tasks are not changed by the trial such that the
+        quotes of different servers can be solved concurrently. The resource allocation of the tasks is cached by the
+        task requirements and the copy's available resources so tasks allocated with the same available resources
+        as a previous quote are not solved again.
+
     :param new_task: The new task
     :param server: Server
     :param price_density: Price density function
@@ -111,37 +126,36 @@ def greedy_task_price(new_task: Task, server: Server, price_density: PriceDensit
     :return: Tuple of task price and possible speeds
     """
     assert new_task.price == 0
-    current_speeds = {task: (task.loading_speed, task.compute_speed, task.sending_speed)
-                      for task in server.allocated_tasks}
-    tasks = server.allocated_tasks[:]
-    server_revenue = server.revenue
-    reset_model(server.allocated_tasks, (server,), forget_prices=False)
-
-    s, w, r = resource_allocation_policy.allocate(new_task, server)
-    server_task_allocation(server, new_task, s, w, r)
-
-    for task in sorted(tasks, key=lambda task: price_density.evaluate(task), reverse=True):
-        if server.can_run(task):
-            s, w, r = resource_allocation_policy.allocate(task, server)
-            server_task_allocation(server, task, s, w, r)
-
-    task_price = max(server_revenue - server.revenue + server.price_change, server.initial_price)
-    debug(f'Original revenue: {server_revenue}, new revenue: {server.revenue}, price change: {server.price_change}',
-          debug_revenue)
-    possible_speeds = {
-        task: (task.loading_speed, task.compute_speed, task.sending_speed, task.running_server is not None)
-        for task in tasks + [new_task]}
-
-    reset_model(current_speeds.keys(), (server,), forget_prices=False)
-    new_task.reset_allocation()
-
-    for task, (loading, compute, sending) in current_speeds.items():
-        server_task_allocation(server, task, loading, compute, sending)
+    scratch_server = server.empty_copy()
+
+    def trial_allocation(task: Task) -> Tuple[int, int, int, bool]:
+        """Allocates the task on the server copy"""
+        s, w, r = resource_allocation_policy.allocate(task, scratch_server)
+        scratch_server.available_storage -= task.required_storage
+        scratch_server.available_computation -= w
+        scratch_server.available_bandwidth -= s + r
+        scratch_server.revenue += task.price
+        return s, w, r, True
+
+    trial_speeds = {new_task: trial_allocation(new_task)}
+    for task in sorted(server.allocated_tasks, key=lambda task: price_density.evaluate(task), reverse=True):
+        if task.required_storage <= scratch_server.available_storage and \
+                feasible_bandwidth_split(task, scratch_server.available_computation,
+                                         scratch_server.available_bandwidth):
+            trial_speeds[task] = trial_allocation(task)
+
+    # The speeds in the server's task order such that the evicted tasks are unallocated in the same order
+    possible_speeds = {task: trial_speeds.get(task, (0, 0, 0, False)) for task in server.allocated_tasks + [new_task]}
+
+    task_price = max(server.revenue - scratch_server.revenue + server.price_change, server.initial_price)
+    debug(f'Original revenue: {server.revenue}, new revenue: {scratch_server.revenue}, '
+          f'price change: {server.price_change}', debug_revenue)
 
     return task_price, possible_speeds
 
 
-def optimal_task_price(new_task: Task, server: Server, time_limit: int, debug_results: bool = False):
+def optimal_task_price(new_task: Task, server: Server, time_limit: int, debug_results: bool = False,
+                       threads: Optional[int] = None):
     """
     Calculates the task price
 
@@ -149,6 +163,7 @@ def optimal_task_price(new_task: Task, server: Server, time_limit: int, debug_re
     :param server: The server
     :param time_limit: Time limit for the cplex
     :param debug_results: debug the results
+    :param threads: The number of cplex worker threads, if None then cplex uses all of the cpus
     :return: task price and task speeds
     """
     assert 0 < time_limit, f'Time limit: {time_limit}'
@@ -184,7 +199,7 @@ def optimal_task_price(new_task: Task, server: Server, time_limit: int, debug_re
     model.maximize(sum(task.price * allocated for task, allocated in allocation.items()))
 
     # Solve the model with a time limit
-    model_solution = model.solve(log_output=None, TimeLimit=time_limit)
+    model_solution = model.solve(log_output=None, TimeLimit=time_limit, Workers=threads)
 
     # If the model solution failed then return an infinite price
     if model_solution.get_solve_status() != SOLVE_STATUS_FEASIBLE and \
@@ -212,75 +227,377 @@ def optimal_task_price(new_task: Task, server: Server, time_limit: int, debug_re
     return task_price, speeds
 
 
+def pareto_speeds(task: Task, computation_capacity: int, bandwidth_capacity: int) -> List[Tuple[int, int, int]]:
+    """
+    The Pareto set of the task's speeds that meet the deadline, for each compute speed the loading and sending speeds
+        with the minimum bandwidth are found with only the speeds that use less bandwidth than all of the smaller
+        compute speeds kept. The speeds are within the task speed upper bounds and the server capacities.
+
+    For each compute speed, the loading speeds are searched outwards from the continuous minimum with the sending speed
+        set to its minimum, as the lower bound of the bandwidth is convex in the loading speed, each search direction
+        stops once the lower bound can't improve on the best bandwidth found.
+
+    :param task: The task
+    :param computation_capacity: The server computation capacity
+    :param bandwidth_capacity: The server bandwidth capacity
+    :return: List of loading, compute and sending speeds with increasing compute speed and decreasing bandwidth
+    """
+    storage, computation, results_data, deadline = \
+        task.required_storage, task.required_computation, task.required_results_data, task.deadline
+    loading_ub, sending_ub = task.loading_ub(), task.sending_ub()
+
+    speeds: List[Tuple[int, int, int]] = []
+    min_bandwidth = bandwidth_capacity + 1
+    for compute_speed in range(1, min(task.compute_ub(), computation_capacity) + 1):
+        # The remaining time for the loading and sending of the data multiplied by the compute speed
+        remaining_time = deadline * compute_speed - computation
+        if remaining_time <= 0:
+            continue
+        sending_time = remaining_time / compute_speed
+        continuous_speed = math.sqrt(storage) * (math.sqrt(storage) + math.sqrt(results_data)) / sending_time
+        start_speed = min(max(int(continuous_speed), 1), loading_ub)
+
+        best_bandwidth, best_speeds = min_bandwidth, None
+        for loading_speeds in (range(start_speed, 0, -1), range(start_speed + 1, loading_ub + 1)):
+            decreasing = loading_speeds.step < 0
+            for loading_speed in loading_speeds:
+                # The exact minimum sending speed using integer arithmetic
+                results_time = loading_speed * remaining_time - storage * compute_speed
+                if results_time <= 0 and (results_time < 0 or 0 < results_data):
+                    if decreasing:
+                        break
+                    continue
+                # As the bandwidth is an integer, the lower bound must be at least 1 less than the best bandwidth
+                elif best_bandwidth - 1 + 1e-6 < loading_speed + (
+                        loading_speed * compute_speed * results_data / results_time if 0 < results_data else 1):
+                    break
+
+                sending_speed = max(1, -(-loading_speed * compute_speed * results_data // results_time)) \
+                    if 0 < results_data else 1
+                if sending_ub < sending_speed:
+                    if decreasing:
+                        break
+                    continue
+                if loading_speed + sending_speed < best_bandwidth:
+                    best_bandwidth, best_speeds = loading_speed + sending_speed, (loading_speed, compute_speed,
+                                                                                  sending_speed)
+
+        if best_speeds is not None:
+            speeds.append(best_speeds)
+            min_bandwidth = best_bandwidth
+    return speeds
+
+
+def _add_speeds(bandwidths: np.ndarray, speeds: List[Tuple[int, int, int]],
+                bandwidth_capacity: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Adds a task to the minimum bandwidth for each total compute speed
+
+    :param bandwidths: The minimum bandwidth of the tasks for each total compute speed (bandwidth capacity + 1 if the
+        compute speed is not possible)
+    :param speeds: The Pareto speeds of the task
+    :param bandwidth_capacity: The server bandwidth capacity
+    :return: The minimum bandwidths with the task and the task speeds index used for each total compute speed
+    """
+    options = np.full((len(speeds), len(bandwidths)), bandwidth_capacity + 1, dtype=np.int64)
+    for pos, (loading_speed, compute_speed, sending_speed) in enumerate(speeds):
+        options[pos, compute_speed:] = bandwidths[:len(bandwidths) - compute_speed] + loading_speed + sending_speed
+    choices = options.argmin(axis=0)
+    return np.minimum(options[choices, np.arange(len(bandwidths))], bandwidth_capacity + 1), choices
+
+
+def exact_task_price(new_task: Task, server: Server, debug_results: bool = False):
+    """
+    Calculates the task price with an exact solver of the server revenue maximisation
+
+    The server's allocated tasks are searched with branch and bound in price order, for the tasks allocated, the minimum
+        bandwidth for each total compute speed is found through dynamic programming over each task's Pareto speeds
+        such that the tasks are feasible if the minimum bandwidth is within the bandwidth capacity. The search is
+        bounded by the fractional knapsack of the remaining tasks over each of the server resources.
+
+    :param new_task: The new task
+    :param server: The server
+    :param debug_results: debug the results
+    :return: task price and task speeds
+    """
+    assert new_task.required_storage <= server.storage_capacity
+    storage_capacity, computation_capacity, bandwidth_capacity = \
+        server.storage_capacity, server.computation_capacity, server.bandwidth_capacity
+
+    new_speeds = pareto_speeds(new_task, computation_capacity, bandwidth_capacity)
+    if not new_speeds:
+        debug(f'{new_task.name} Task can not meet its deadline on {server.name} Server', debug_results)
+        return math.inf, {}
+    bandwidths = np.full(computation_capacity + 1, bandwidth_capacity + 1, dtype=np.int64)
+    bandwidths[0] = 0
+    bandwidths, choices = _add_speeds(bandwidths, new_speeds, bandwidth_capacity)
+
+    # The allocated tasks that can run with the new task, in price order
+    task_speeds = {task: pareto_speeds(task, computation_capacity, bandwidth_capacity)
+                   for task in server.allocated_tasks}
+    candidates = sorted((task for task, speeds in task_speeds.items()
+                         if speeds and task.required_storage + new_task.required_storage <= storage_capacity),
+                        key=lambda task: task.price, reverse=True)
+    suffix_prices = np.cumsum([task.price for task in reversed(candidates)])[::-1].tolist() + [0]
+
+    # The minimum resource usage of the candidates ordered by price density for the fractional knapsack bounds
+    resource_usages = [
+        sorted(((task.price / max(usage, 1e-9), usage, pos) for pos, (task, usage) in enumerate(
+            (task, usage_fn(task)) for task in candidates)), reverse=True)
+        for usage_fn in (lambda task: task.required_storage,
+                         lambda task: task_speeds[task][0][1],
+                         lambda task: sum(task_speeds[task][-1][::2]))
+    ]
+
+    def fractional_bound(pos: int, capacities: Tuple[int, int, int]) -> float:
+        """The minimum of the fractional knapsack of the candidates from the position over each resource"""
+        bound = suffix_prices[pos]
+        for usages, capacity in zip(resource_usages, capacities):
+            value = 0
+            for density, usage, task_pos in usages:
+                if pos <= task_pos:
+                    if capacity <= usage:
+                        value += density * capacity
+                        break
+                    value += density * usage
+                    capacity -= usage
+            bound = min(bound, value)
+        return bound
+
+    best_revenue, best_allocation = -1.0, None
+    allocation: List[Tuple[Task, np.ndarray]] = [(new_task, choices)]
+
+    def search(pos: int, storage: int, minimum_bandwidths: np.ndarray, revenue: float):
+        """Branches on if the candidate at the position is allocated"""
+        nonlocal best_revenue, best_allocation
+        if best_revenue < revenue:
+            best_revenue, best_allocation = revenue, (allocation[:], minimum_bandwidths)
+        if pos == len(candidates):
+            return
+
+        # The remaining resources as the minimum compute speed and bandwidth of the allocated tasks
+        feasible = np.flatnonzero(minimum_bandwidths <= bandwidth_capacity)
+        capacities = (storage_capacity - storage, computation_capacity - int(feasible[0]),
+                      bandwidth_capacity - int(minimum_bandwidths.min()))
+        if revenue + fractional_bound(pos, capacities) <= best_revenue:
+            return
+
+        task = candidates[pos]
+        if storage + task.required_storage <= storage_capacity:
+            task_bandwidths, task_choices = _add_speeds(minimum_bandwidths, task_speeds[task], bandwidth_capacity)
+            if task_bandwidths.min() <= bandwidth_capacity:
+                allocation.append((task, task_choices))
+                search(pos + 1, storage + task.required_storage, task_bandwidths, revenue + task.price)
+                allocation.pop()
+        search(pos + 1, storage, minimum_bandwidths, revenue)
+
+    search(0, new_task.required_storage, bandwidths, 0.0)
+
+    # Backtrack the task speeds from the total compute speed with the minimum bandwidth
+    allocated_tasks, minimum_bandwidths = best_allocation
+    total_compute = int(minimum_bandwidths.argmin())
+    speeds = {task: (task.loading_speed, task.compute_speed, task.sending_speed, False)
+              for task in server.allocated_tasks}
+    for task, task_choices in reversed(allocated_tasks):
+        loading_speed, compute_speed, sending_speed = \
+            (new_speeds if task is new_task else task_speeds[task])[task_choices[total_compute]]
+        speeds[task] = (loading_speed, compute_speed, sending_speed, True)
+        total_compute -= compute_speed
+    assert total_compute == 0
+
+    task_price = max(server.revenue - best_revenue + server.price_change, server.initial_price)
+    debug(f'Sever: {server.name} - Prior revenue: {server.revenue}, new revenue: {best_revenue}, '
+          f'price change: {server.price_change} therefore task price: {task_price}', debug_results)
+
+    return task_price, speeds
+
+
+class RoundTrace:
+    """
+    Trace of the decentralised iterative auction rounds, stored by column with an entry for each round
+    """
+
+    __slots__ = ('quote_times', 'servers_quoted', 'prices', 'social_welfare', 'evictions')
+
+    def __init__(self):
+        # The time to gather the server price quotes of the round
+        self.quote_times = array('d')
+        # The number of servers that quoted a price
+        self.servers_quoted = array('i')
+        # The minimum price quoted (infinite if no feasible quote and -1 if no servers quoted, stored as None)
+        self.prices = array('d')
+        # The social welfare of the allocation at the end of the round
+        self.social_welfare = array('d')
+        # The number of tasks evicted by the round's allocation
+        self.evictions = array('i')
+
+    def append(self, quote_time: float, servers_quoted: int, price: float, social_welfare: float, evictions: int):
+        """
+        Appends a round to the trace
+
+        :param quote_time: The time to gather the price quotes
+        :param servers_quoted: The number of servers that quoted a price
+        :param price: The minimum price quoted
+        :param social_welfare: The social welfare at the end of the round
+        :param evictions: The number of tasks evicted
+        """
+        self.quote_times.append(quote_time)
+        self.servers_quoted.append(servers_quoted)
+        self.prices.append(price)
+        self.social_welfare.append(social_welfare)
+        self.evictions.append(evictions)
+
+    def __len__(self) -> int:
+        return len(self.quote_times)
+
+    def store(self) -> Dict[str, List[Optional[float]]]:
+        """
+        Returns the trace columns for storage, the price of rounds without a feasible quote is None such that the
+            trace is valid json
+
+        :return: Dictionary of the trace columns
+        """
+        return {'quote time': [round(quote_time, 6) for quote_time in self.quote_times],
+                'servers quoted': self.servers_quoted.tolist(),
+                'price': [None if price == -1 or math.isinf(price) else price for price in self.prices],
+                'social welfare': [round(social_welfare, 3) for social_welfare in self.social_welfare],
+                'evictions': self.evictions.tolist()}
+
+
 def decentralised_iterative_solver(tasks: List[Task], servers: List[Server], task_price_solver,
-                                   debug_allocation: bool = False) -> Tuple[int, Dict[Task, int], float]:
+                                   debug_allocation: bool = False, workers: Optional[int] = None,
+                                   queued_tasks: Optional[List[Task]] = None, max_rounds: Optional[int] = None,
+                                   max_time: Optional[float] = None,
+                                   trace: Optional[RoundTrace] = None) -> Tuple[int, Dict[Task, int], float, bool]:
     """
     Decentralised iterative auction solver
 
+    The servers' price quotes of each round can be gathered concurrently over a pool of worker threads, this requires
+        the task price solver to not change the tasks or servers, such that the round time is the slowest quote rather
+        than the sum of the quotes.
+
+    The auction can be warm started from a prior allocation (e.g. the equilibrium of a similar auction) with only the
+        queued tasks bidding, the other tasks keep their current allocation and price unless displaced by a bid, in
+        which case they are queued again.
+
+    The auction can be stopped before convergence by a budget of rounds or time, with the current allocation kept and
+        the tasks still queued left unallocated. The time budget is checked before each round so the auction can
+        overrun the budget by up to a round.
+
     :param tasks: List of tasks
     :param servers: List of servers
     :param task_price_solver: Task price solver
     :param debug_allocation: If to debug allocation
-    :return: A tuple with the number of rounds and the solver time length
+    :param workers: The number of worker threads to gather the server price quotes, if None or 1 then the quotes are
+        gathered serially
+    :param queued_tasks: The unallocated tasks to bid, if None then all of the tasks are bid
+    :param max_rounds: The maximum number of rounds, if None then there is no limit
+    :param max_time: The maximum time in seconds, if None then there is no limit
+    :param trace: The trace that each round is appended to, if None then the rounds are not traced
+    :return: A tuple with the number of rounds, the rounds of each task, the solver time length and if the auction
+        converged within the budgets
     """
+    assert queued_tasks is None or all(task.running_server is None for task in queued_tasks)
+    assert max_rounds is None or 0 <= max_rounds, f'Max rounds: {max_rounds}'
     start_time = time()
 
     total_rounds, task_rounds = 0, {task: 0 for task in tasks}
-    unallocated_tasks: List[Task] = tasks[:]
-    while unallocated_tasks:
-        task: Task = unallocated_tasks.pop(rnd.randint(0, len(unallocated_tasks) - 1))
-
-        min_price, min_speeds, min_server = -1, None, None
-        for server in servers:
-            if server.can_run_empty(task):
-                price, speeds = task_price_solver(task, server)
-
+    unallocated_tasks: List[Task] = (tasks if queued_tasks is None else queued_tasks)[:]
+    social_welfare = sum(task.value for task in tasks if task.running_server is not None)
+    # The executor is shut down at the end of the auction even if a price quote raises an error
+    with ThreadPoolExecutor(workers) if workers is not None and 1 < workers else nullcontext() as executor:
+        while unallocated_tasks and (max_rounds is None or total_rounds < max_rounds) and \
+                (max_time is None or time() - start_time < max_time):
+            task: Task = unallocated_tasks.pop(rnd.randint(0, len(unallocated_tasks) - 1))
+
+            quote_start = time()
+            quote_servers = [server for server in servers if server.can_run_empty(task)]
+            if executor is None:
+                quotes = [task_price_solver(task, server) for server in quote_servers]
+            else:
+                quotes = list(executor.map(functools.partial(task_price_solver, task), quote_servers))
+            quote_time = time() - quote_start
+
+            # The minimum price with ties broken by the server's list position such that the selection is deterministic
+            min_price, min_speeds, min_server = -1, None, None
+            for server, (price, speeds) in zip(quote_servers, quotes):
                 if min_price == -1 or price < min_price:
                     min_price, min_speeds, min_server = price, speeds, server
 
-        if 0 < min_price < task.value:
-            allocate_task(task, min_price, min_server, unallocated_tasks, min_speeds)
-            debug(f'[+] {task.name} Task set to {min_server.name} with price {task.price} '
-                  f'for server revenue of {min_server.revenue}',
-                  debug_allocation)
-            # previous_task_price[task] = min_price
-        else:
-            debug(f'[-] Removing {task.name} Task, min price is {min_price} and task value is {task.value}',
-                  debug_allocation)
-
-        if task in task_rounds:
-            task_rounds[task] += 1
-        else:
-            task_rounds[task] = 1
-        total_rounds += 1
+            queued = len(unallocated_tasks)
+            if 0 < min_price < task.value:
+                allocate_task(task, min_price, min_server, unallocated_tasks, min_speeds)
+                social_welfare += task.value - sum(evicted_task.value for evicted_task in unallocated_tasks[queued:])
+                debug(f'[+] {task.name} Task set to {min_server.name} with price {task.price} '
+                      f'for server revenue of {min_server.revenue}',
+                      debug_allocation)
+                # previous_task_price[task] = min_price
+            else:
+                debug(f'[-] Removing {task.name} Task, min price is {min_price} and task value is {task.value}',
+                      debug_allocation)
+
+            if task in task_rounds:
+                task_rounds[task] += 1
+            else:
+                task_rounds[task] = 1
+            total_rounds += 1
+
+            if trace is not None:
+                trace.append(quote_time, len(quote_servers), min_price, social_welfare, len(unallocated_tasks) - queued)
 
     assert all(0 < task.price for task in tasks if task.running_server)
-    return total_rounds, task_rounds, time() - start_time
+    return total_rounds, task_rounds, time() - start_time, not unallocated_tasks
 
 
 def optimal_decentralised_iterative_auction(tasks: List[Task], servers: List[Server], time_limit: int = 5,
-                                            debug_allocation: bool = False) -> Result:
+                                            debug_allocation: bool = False, workers: Optional[int] = None,
+                                            threads: Optional[int] = None, exact_solver: bool = True,
+                                            queued_tasks: Optional[List[Task]] = None, max_rounds: Optional[int] = None,
+                                            max_time: Optional[float] = None) -> Result:
     """
     Runs the optimal decentralised iterative auction
 
     :param tasks: List of tasks
     :param servers: list of servers
-    :param time_limit: The time limit for the dia solver
+    :param time_limit: The time limit for the dia cplex solver
     :param debug_allocation: If to debug allocation
+    :param workers: The number of concurrent cplex server price quotes, defaults to the number of servers within the
+        threads, this is only for the cplex task price solver as the exact quotes are gathered serially
+    :param threads: The total number of cplex solver threads, defaults to the number of cpus, this is only for the
+        cplex task price solver
+    :param exact_solver: If to use the exact task price solver otherwise the cplex task price solver
+    :param queued_tasks: The unallocated tasks to bid with the other tasks keeping their current allocation, if None
+        then all of the tasks are bid
+    :param max_rounds: The maximum number of auction rounds, if None then there is no limit
+    :param max_time: The maximum auction time in seconds, if None then there is no limit
     :return: The results of the auction
     """
-    solver = functools.partial(optimal_task_price, time_limit=time_limit)
-    rounds, task_rounds, solve_time = decentralised_iterative_solver(tasks, servers, solver, debug_allocation)
+    if exact_solver:
+        # The exact quotes hold the interpreter so are gathered serially
+        assert workers is None and threads is None, \
+            f'Workers ({workers}) and threads ({threads}) are only for the cplex task price solver (exact_solver=False)'
+        solver = exact_task_price
+    else:
+        # The concurrent price quotes share the thread budget
+        threads = threads or os.cpu_count() or 1
+        workers = max(min(workers or len(servers), len(servers), threads), 1)
+        solver = functools.partial(optimal_task_price, time_limit=time_limit, threads=max(threads // workers, 1))
+    trace = RoundTrace()
+    rounds, task_rounds, solve_time, converged = decentralised_iterative_solver(
+        tasks, servers, solver, debug_allocation, workers, queued_tasks, max_rounds, max_time, trace)
 
     return Result('Optimal DIA', tasks, servers, solve_time, is_auction=True,
                   **{'server price change': {server.name: server.price_change for server in servers},
                      'server initial price': {server.name: server.initial_price for server in servers},
-                     'rounds': rounds, 'task rounds': {task.name: rounds for task, rounds in task_rounds.items()}})
+                     'rounds': rounds, 'task rounds': {task.name: rounds for task, rounds in task_rounds.items()},
+                     'converged': converged, 'round trace': trace.store()})
 
 
 def greedy_decentralised_iterative_auction(tasks: List[Task], servers: List[Server], price_density: PriceDensity,
                                            resource_allocation_policy: ResourceAllocationPolicy,
-                                           debug_allocation: bool = False) -> Result:
+                                           debug_allocation: bool = False,
+                                           queued_tasks: Optional[List[Task]] = None, max_rounds: Optional[int] = None,
+                                           max_time: Optional[float] = None) -> Result:
     """
     Runs the greedy decentralised iterative auction
 
@@ -289,14 +606,22 @@ def greedy_decentralised_iterative_auction(tasks: List[Task], servers: List[Serv
     :param price_density: Price density policy
     :param resource_allocation_policy: Resource allocation policy
     :param debug_allocation: If to debug allocation
+    :param queued_tasks: The unallocated tasks to bid with the other tasks keeping their current allocation, if None
+        then all of the tasks are bid
+    :param max_rounds: The maximum number of auction rounds, if None then there is no limit
+    :param max_time: The maximum auction time in seconds, if None then there is no limit
     :return: The results of the auction
     """
     solver = functools.partial(greedy_task_price, price_density=price_density,
                                resource_allocation_policy=resource_allocation_policy)
-    rounds, task_rounds, solve_time = decentralised_iterative_solver(tasks, servers, solver, debug_allocation)
+    trace = RoundTrace()
+    rounds, task_rounds, solve_time, converged = decentralised_iterative_solver(
+        tasks, servers, solver, debug_allocation, queued_tasks=queued_tasks, max_rounds=max_rounds, max_time=max_time,
+        trace=trace)
 
     return Result('Greedy DIA', tasks, servers, solve_time, is_auction=True,
                   **{'server price change': {server.name: server.price_change for server in servers},
                      'server initial price': {server.name: server.initial_price for server in servers},
                      'price density': price_density.name, 'resource allocation policy': resource_allocation_policy.name,
-                     'rounds': rounds, 'task rounds': {task.name: rounds for task, rounds in task_rounds.items()}})
+                     'rounds': rounds, 'task rounds': {task.name: rounds for task, rounds in task_rounds.items()},
+                     'converged': converged, 'round trace': trace.store()})
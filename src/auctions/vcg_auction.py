@@ -5,18 +5,22 @@ Implementation of an VCG auctions
 from __future__ import annotations
 
 import functools
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from time import time
 from typing import TYPE_CHECKING, TypeVar, Callable
 
 from docplex.cp.solution import CpoSolveResult
 
-from src.core.core import reset_model, server_task_allocation, debug
+from src.core.core import server_task_allocation, debug
 from src.extra.result import Result
-from src.optimal.fixed_optimal import fixed_optimal_solver
-from src.optimal.flexible_optimal import flexible_optimal_solver
+from src.optimal.fixed_knapsack import FixedKnapsack
+from src.optimal.fixed_optimal import fixed_optimal_model
+from src.optimal.flexible_optimal import flexible_optimal_model
 
 if TYPE_CHECKING:
-    from typing import List, Dict, Tuple, Optional
+    from typing import List, Dict, Optional
 
     from src.core.server import Server
     from src.core.task import Task
@@ -40,64 +44,79 @@ def list_copy_remove(lists: List[T], item: T) -> List[T]:
     return list_copy
 
 
-def vcg_solver(tasks: List[Task], servers: List[Server], solver: Callable,
-               debug_running: bool = False) -> Optional[CpoSolveResult]:
+def vcg_solver(tasks: List[Task], servers: List[Server], solver: Callable, debug_running: bool = False,
+               workers: Optional[int] = None, threads: Optional[int] = None) -> Optional[CpoSolveResult]:
     """
-    VCG auction solver
+    VCG auction solver, the optimal solution without each allocated task (the clarke pivot) is warm started from the
+        optimal allocation without the task, always a feasible allocation, with the solves run concurrently that share
+        the thread budget between them
 
     :param tasks: List of tasks
     :param servers: List of servers
-    :param solver: Solver to find solution
+    :param solver: Solver to find the solution and the task allocation without allocating the tasks, with the arguments
+        of the tasks, servers, warm start and threads
     :param debug_running: If to debug the running algorithm
+    :param workers: The number of concurrent solves, defaults to the number of allocated tasks within the threads
+    :param threads: The total number of solver threads, defaults to the number of cpus
     :return: Total solve time
     """
-    # Price information
-    task_prices: Dict[Task, float] = {}
+    threads = threads or os.cpu_count() or 1
 
     # Find the optimal solution
     debug('Running optimal solution', debug_running)
-    optimal_results = solver(tasks, servers)
+    optimal_results = solver(tasks, servers, threads=threads)
     if optimal_results is None:
         print(f'Optimal solver failed')
         return None
-    optimal_social_welfare = sum(task.value for task in tasks if task.running_server)
+    optimal_solution, task_allocation = optimal_results
+    optimal_social_welfare = sum(task.value for task in task_allocation.keys())
     debug(f'Optimal social welfare: {optimal_social_welfare}', debug_running)
 
-    # Save the task and server information from the optimal solution
-    allocated_tasks = [task for task in tasks if task.running_server]
-    task_allocation: Dict[Task, Tuple[int, int, int, Server]] = {
-        task: (task.loading_speed, task.compute_speed, task.sending_speed, task.running_server)
-        for task in allocated_tasks
-    }
-
+    allocated_tasks = [task for task in tasks if task in task_allocation]
     debug(f"Allocated tasks: {', '.join([task.name for task in allocated_tasks])}", debug_running)
 
-    # For each allocated task, find the sum of values if the task doesnt exist
-    for task in allocated_tasks:
-        # Reset the model and remove the task from the task list
-        reset_model(tasks, servers)
-        tasks_prime = list_copy_remove(tasks, task)
+    # The concurrent solves share the thread budget
+    workers = max(min(workers or len(allocated_tasks), len(allocated_tasks), threads), 1)
+    solve_threads = max(threads // workers, 1)
 
-        # Find the optimal solution where the task doesnt exist
+    # For each allocated task, find the sum of values if the task doesnt exist, warm started from the optimal allocation
+    #   without the task. The solver doesnt allocate the tasks so the solves are independent
+    def pivot_solve(task: Task) -> Optional[float]:
+        """
+        Finds the optimal social welfare if the task doesnt exist
+
+        :param task: The task removed
+        :return: The optimal social welfare without the task
+        """
         debug(f'Solving for without task {task.name}', debug_running)
-        prime_results = solver(tasks_prime, servers)
+        warm_start = {other: allocation for other, allocation in task_allocation.items() if other is not task}
+        prime_results = solver(list_copy_remove(tasks, task), servers, warm_start=warm_start,
+                               threads=solve_threads)
         if prime_results is None:
             print(f'Failed for task: {task.name}')
             return None
-        else:
-            task_prices[task] = optimal_social_welfare - sum(task.value for task in tasks_prime if task.running_server)
-            debug(f'{task.name} Task: £{task_prices[task]:.1f}, Value: {task.value} ', debug_running)
+        _, prime_allocation = prime_results
+        return sum(prime_task.value for prime_task in prime_allocation.keys())
+
+    with ThreadPoolExecutor(workers) as executor:
+        prime_social_welfares = list(executor.map(pivot_solve, allocated_tasks))
+    if any(social_welfare is None for social_welfare in prime_social_welfares):
+        return None
 
-    # Reset the model and allocates all of the their info from the original optimal solution
-    reset_model(tasks, servers)
+    # Allocates all of the tasks from the original optimal solution with the task prices
+    task_prices: Dict[Task, float] = {}
+    for task, prime_social_welfare in zip(allocated_tasks, prime_social_welfares):
+        task_prices[task] = optimal_social_welfare - prime_social_welfare
+        debug(f'{task.name} Task: £{task_prices[task]:.1f}, Value: {task.value} ', debug_running)
     for task, (s, w, r, server) in task_allocation.items():
         server_task_allocation(server, task, s, w, r, price=task_prices[task])
 
-    return optimal_results
+    return optimal_solution
 
 
 def vcg_auction(tasks: List[Task], servers: List[Server], time_limit: Optional[int] = 5,
-                debug_results: bool = False) -> Optional[Result]:
+                debug_results: bool = False, workers: Optional[int] = None,
+                threads: Optional[int] = None) -> Optional[Result]:
     """
     VCG auction algorithm
 
@@ -105,11 +124,13 @@ def vcg_auction(tasks: List[Task], servers: List[Server], time_limit: Optional[i
     :param servers: List of servers
     :param time_limit: The time limit of the optimal solver
     :param debug_results: If to debug results
+    :param workers: The number of concurrent solves
+    :param threads: The total number of solver threads
     :return: The results of the VCG auction
     """
-    optimal_solver_fn = functools.partial(flexible_optimal_solver, time_limit=time_limit)
+    optimal_solver_fn = functools.partial(flexible_optimal_model, time_limit=time_limit)
 
-    global_model_solution = vcg_solver(tasks, servers, optimal_solver_fn, debug_results)
+    global_model_solution = vcg_solver(tasks, servers, optimal_solver_fn, debug_results, workers, threads)
     if global_model_solution:
         return Result('Flexible VCG', tasks, servers, round(global_model_solution.get_solve_time(), 2), is_auction=True,
                       **{'solve status': global_model_solution.get_solve_status(),
@@ -120,7 +141,8 @@ def vcg_auction(tasks: List[Task], servers: List[Server], time_limit: Optional[i
 
 
 def fixed_vcg_auction(fixed_tasks: List[FixedTask], servers: List[Server], time_limit: Optional[int] = 5,
-                      debug_results: bool = False) -> Optional[Result]:
+                      debug_results: bool = False, workers: Optional[int] = None,
+                      threads: Optional[int] = None) -> Optional[Result]:
     """
     Fixed VCG auction algorithm
 
@@ -128,11 +150,13 @@ def fixed_vcg_auction(fixed_tasks: List[FixedTask], servers: List[Server], time_
     :param servers: List of servers
     :param time_limit: The limit of the fixed optimal solver
     :param debug_results: If to debug results
+    :param workers: The number of concurrent solves
+    :param threads: The total number of solver threads
     :return: The results of the fixed VCG auction
     """
-    fixed_solver_fn = functools.partial(fixed_optimal_solver, time_limit=time_limit)
+    fixed_solver_fn = functools.partial(fixed_optimal_model, time_limit=time_limit)
 
-    global_model_solution = vcg_solver(fixed_tasks, servers, fixed_solver_fn, debug_results)
+    global_model_solution = vcg_solver(fixed_tasks, servers, fixed_solver_fn, debug_results, workers, threads)
     if global_model_solution:
         return Result('Fixed VCG', fixed_tasks, servers, round(global_model_solution.get_solve_time(), 2),
                       is_auction=True, **{'solve status': global_model_solution.get_solve_status(),
@@ -140,3 +164,33 @@ def fixed_vcg_auction(fixed_tasks: List[FixedTask], servers: List[Server], time_
     else:
         print(f'Fixed VCG Auction error', file=sys.stderr)
         return Result('Fixed VCG', fixed_tasks, servers, 0, limited=True)
+
+
+def fixed_knapsack_vcg_auction(fixed_tasks: List[FixedTask], servers: List[Server], time_limit: Optional[float] = None,
+                               workers: Optional[int] = None, debug_results: bool = False) -> Result:
+    """
+    Fixed VCG auction algorithm using the fixed knapsack branch and bound solver such that the solver structure is
+        built once for the optimal allocation and the optimal allocations without each allocated task
+
+    :param fixed_tasks: List of the fixed tasks
+    :param servers: List of servers
+    :param time_limit: The time limit of each solve, if None then the solves are exact
+    :param workers: The number of worker processes for the solves without each allocated task
+    :param debug_results: If to debug results
+    :return: The results of the fixed VCG auction
+    """
+    start_time = time()
+    knapsack = FixedKnapsack(fixed_tasks, servers, time_limit)
+    optimal_social_welfare, allocation = knapsack.solve()
+    optimal = knapsack.optimal
+    debug(f'Optimal social welfare: {optimal_social_welfare}', debug_results)
+
+    # For each allocated task, find the optimal social welfare if the task doesnt exist
+    prime_social_welfares = knapsack.pivots(allocation, workers)
+    task_prices = {task: optimal_social_welfare - prime_social_welfares[task] for task in allocation.keys()}
+    for task, price in task_prices.items():
+        debug(f'{task.name} Task: £{price:.1f}, Value: {task.value} ', debug_results)
+    knapsack.allocate(allocation, task_prices)
+
+    return Result('Fixed VCG', fixed_tasks, servers, time() - start_time, is_auction=True,
+                  **{'solve status': 'Optimal' if optimal and knapsack.optimal else 'Feasible'})
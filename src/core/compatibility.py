@@ -0,0 +1,126 @@
+"""
+Task by server compatibility matrix
+
+As the server capacities are static during an allocation, if a task can run on an empty server can be precomputed for
+    every task and server along with the minimum footprint of the task on the server, the minimum computation (using
+    all of the server's bandwidth) and the minimum bandwidth (using all of the server's computation). The footprints
+    are lower bounds of the resources required by the task so if a server's available resources are less than a
+    footprint then the task can't run on the server.
+
+The servers are bound to the matrix with the server checks (can_run and can_run_empty) consulting the matrix before
+    the bandwidth split check and the server column is updated when the server capacities are updated.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from src.core.server import feasible_bandwidth_splits
+
+if TYPE_CHECKING:
+    from typing import Iterable, List, Dict, Optional, Tuple
+
+    from src.core.server import Server
+    from src.core.task import Task
+
+
+class CompatibilityMatrix:
+    """
+    Compatibility matrix of tasks (rows) and servers (columns) with the minimum computation and bandwidth footprints
+    """
+
+    def __init__(self, tasks: Iterable[Task], servers: Iterable[Server]):
+        self.tasks: List[Task] = list(tasks)
+        self.servers: List[Server] = list(servers)
+        self.task_index: Dict[Task, int] = {task: index for index, task in enumerate(self.tasks)}
+        self.server_index: Dict[Server, int] = {server: index for index, server in enumerate(self.servers)}
+
+        # The task requirements as columns such that they broadcast with the server rows
+        self.required_storage = np.array([[task.required_storage] for task in self.tasks], dtype=np.int64)
+        self.required_computation = np.array([[task.required_computation] for task in self.tasks], dtype=np.int64)
+        self.required_results_data = np.array([[task.required_results_data] for task in self.tasks], dtype=np.int64)
+        self.deadline = np.array([[task.deadline] for task in self.tasks], dtype=np.int64)
+        # The bandwidth requirement (sqrt(S) + sqrt(R))^2 such that with bandwidth t then
+        #   S / s + R / r >= requirement / t
+        self.bandwidth_requirement = (np.sqrt(self.required_storage) + np.sqrt(self.required_results_data)) ** 2
+
+        self.compatible = np.zeros((len(self.tasks), len(self.servers)), dtype=bool)
+        self.min_computation = np.zeros((len(self.tasks), len(self.servers)), dtype=np.int64)
+        self.min_bandwidth = np.zeros((len(self.tasks), len(self.servers)), dtype=np.int64)
+
+        self.update(self.servers)
+        for server in self.servers:
+            server.compatibility = self
+
+    def update(self, servers: Iterable[Server]):
+        """
+        Updates the compatibility and footprint columns of the servers
+
+        :param servers: The servers with updated capacities
+        """
+        indexes = [self.server_index[server] for server in servers]
+        storage = np.array([[self.servers[index].storage_capacity for index in indexes]], dtype=np.int64)
+        computation = np.array([[self.servers[index].computation_capacity for index in indexes]], dtype=np.int64)
+        bandwidth = np.array([[self.servers[index].bandwidth_capacity for index in indexes]], dtype=np.int64)
+
+        self.compatible[:, indexes] = (self.required_storage <= storage) & (1 <= computation) & \
+            feasible_bandwidth_splits(self.required_storage, self.required_computation, self.required_results_data,
+                                      self.deadline, computation, bandwidth)
+
+        # The continuous minimum of each resource using all of the other resource, the small tolerance is to keep the
+        #   footprint a lower bound with float errors
+        with np.errstate(divide='ignore', invalid='ignore'):
+            computation_time = self.deadline - self.bandwidth_requirement / np.maximum(bandwidth, 1)
+            bandwidth_time = self.deadline - self.required_computation / np.maximum(computation, 1)
+            min_computation = np.ceil(self.required_computation / computation_time - 1e-6)
+            min_bandwidth = np.ceil(self.bandwidth_requirement / bandwidth_time - 1e-6)
+        self.min_computation[:, indexes] = np.where(self.compatible[:, indexes],
+                                                    np.clip(min_computation, 1, computation), computation + 1)
+        self.min_bandwidth[:, indexes] = np.where(self.compatible[:, indexes],
+                                                  np.clip(min_bandwidth, 2, bandwidth), bandwidth + 1)
+
+    def is_compatible(self, task: Task, server: Server) -> Optional[bool]:
+        """
+        If the task can run on the empty server
+
+        :param task: The task
+        :param server: The server
+        :return: If the task is compatible with the server or None if the task is not in the matrix
+        """
+        task_index = self.task_index.get(task)
+        if task_index is None:
+            return None
+        return bool(self.compatible[task_index, self.server_index[server]])
+
+    def footprint(self, task: Task, server: Server) -> Optional[Tuple[int, int]]:
+        """
+        The minimum computation and bandwidth of the task on the empty server
+
+        :param task: The task
+        :param server: The server
+        :return: Tuple of the minimum computation and bandwidth or None if the task is not in the matrix
+        """
+        task_index = self.task_index.get(task)
+        if task_index is None:
+            return None
+        server_index = self.server_index[server]
+        return int(self.min_computation[task_index, server_index]), int(self.min_bandwidth[task_index, server_index])
+
+    def is_possible(self, task: Task, server: Server) -> bool:
+        """
+        If the task could possibly run on the server given the server's available resources, this is a necessary
+            condition that is cheaper than the bandwidth split check
+
+        :param task: The task
+        :param server: The server
+        :return: False if the task can't run on the server, True if the task is not in the matrix or it could run
+        """
+        task_index = self.task_index.get(task)
+        if task_index is None:
+            return True
+        server_index = self.server_index[server]
+        return self.compatible[task_index, server_index] and \
+            self.min_computation[task_index, server_index] <= server.available_computation and \
+            self.min_bandwidth[task_index, server_index] <= server.available_bandwidth
@@ -2,18 +2,21 @@
 
 from __future__ import annotations
 
+import json
+import os
 import sys
 import time
 from abc import abstractmethod, ABC
-from math import ceil
-from typing import TYPE_CHECKING, List
+from itertools import count
+from math import ceil, floor, inf
+from typing import TYPE_CHECKING, List, Optional
 
 from docplex.cp.model import CpoModel, SOLVE_STATUS_FEASIBLE, SOLVE_STATUS_OPTIMAL
 
 from src.core.task import Task
 
 if TYPE_CHECKING:
-    from typing import Tuple
+    from typing import Tuple, Dict, Iterable
 
     from src.core.server import Server
 
@@ -21,6 +24,8 @@ if TYPE_CHECKING:
 class FixedTask(Task):
     """Task with a fixing resource usage speed"""
 
+    __slots__ = ('fixed_value_policy',)
+
     def __init__(self, task: Task, fixed_value_policy: FixedAllocationPriority, fixed_name: bool = True,
                  resource_foreknowledge: bool = False):
         name = f'Fixed {task.name}' if fixed_name else task.name
@@ -46,7 +51,29 @@ class FixedTask(Task):
     @staticmethod
     def minimum_fixed_prioritisation(task: Task, allocation_priority: FixedAllocationPriority) -> Tuple[int, int, int]:
         """
-        Find the optimal fixed speeds of the task
+        Find the optimal fixed speeds of the task, using the fixed speeds cache then the analytic solver if the
+            allocation priority is a sum of powers of the speeds otherwise the cplex solver
+
+        :param task: The task to use
+        :param allocation_priority: The fixed value function to value the speeds
+        :return: Fixed speeds
+        """
+        key = (task.required_storage, task.required_computation, task.required_results_data, task.deadline,
+               allocation_priority.name)
+        speeds = fixed_speeds_cache.speeds.get(key)
+        if speeds is None:
+            if allocation_priority.power is not None:
+                speeds = analytic_fixed_speeds(task, allocation_priority.power)
+            else:
+                speeds = FixedTask.cp_minimum_fixed_prioritisation(task, allocation_priority)
+            fixed_speeds_cache.speeds[key] = speeds
+        return speeds
+
+    @staticmethod
+    def cp_minimum_fixed_prioritisation(task: Task,
+                                        allocation_priority: FixedAllocationPriority) -> Tuple[int, int, int]:
+        """
+        Find the optimal fixed speeds of the task using cplex
 
         :param task: The task to use
         :param allocation_priority: The fixed value function to value the speeds
@@ -119,8 +146,16 @@ class FixedAllocationPriority(ABC):
     Fixed Value policy for the fixed task to select the speed
     """
 
-    def __init__(self, name: str):
+    def __init__(self, name: str, power: Optional[float] = None):
+        """
+        Constructor
+
+        :param name: The policy name
+        :param power: If the policy is the sum of the speeds to a power then the power such that the analytic solver
+            can be used
+        """
         self.name = name
+        self.power = power
 
     @abstractmethod
     def evaluate(self, loading_speed: int, compute_speed: int, sending_speed: int) -> float:
@@ -139,7 +174,7 @@ class SumSpeedsFixedAllocationPriority(FixedAllocationPriority):
     """Fixed sum of speeds"""
 
     def __init__(self):
-        FixedAllocationPriority.__init__(self, 'Sum speeds')
+        FixedAllocationPriority.__init__(self, 'Sum speeds', power=1)
 
     def evaluate(self, loading_speed: int, compute_speed: int, sending_speed: int) -> float:
         """Calculates the value by summing speeds"""
@@ -150,7 +185,7 @@ class SumSpeedPowFixedAllocationPriority(FixedAllocationPriority):
     """Fixed Exp Sum of speeds"""
 
     def __init__(self):
-        FixedAllocationPriority.__init__(self, 'Exp Sum Speeds')
+        FixedAllocationPriority.__init__(self, 'Exp Sum Speeds', power=3)
 
     def evaluate(self, loading_speed: int, compute_speed: int, sending_speed: int) -> float:
         """Calculate the value by summing the expo of speeds"""
@@ -159,6 +194,122 @@ class SumSpeedPowFixedAllocationPriority(FixedAllocationPriority):
 # TODO add more fixed value classes
 
 
+def analytic_fixed_speeds(task: Task, power: float) -> Tuple[int, int, int]:
+    """
+    Finds the integer speeds that minimise the sum of the speeds to the power such that the task meets its deadline.
+
+    The continuous minimum of sum x_i^p such that sum a_i / x_i <= T is K^(p + 1) / T^p with K = sum a_i^(p / (p + 1))
+        at x_i = a_i^(1 / (p + 1)) * K / T. Using this as a lower bound, the loading speeds are searched outwards from
+        the continuous solution with the compute speeds searched outwards for each loading speed and the sending speed
+        set to its minimum. As the lower bounds are convex in the loading and compute speeds, each search direction
+        stops once the lower bound is not less than the best speeds found.
+
+    :param task: The task
+    :param power: The speed power (must be positive)
+    :return: The minimum loading, compute and sending speeds
+    """
+    assert 0 < power, f'Power: {power}'
+    storage, computation, results_data, deadline = \
+        task.required_storage, task.required_computation, task.required_results_data, task.deadline
+    exponent = power / (power + 1)
+    # As the speeds are integers, the sum of speeds to the power is an integer (for integer powers) therefore a lower
+    #   bound must be at least 1 less than the best speeds to improve, a small tolerance is added for float errors
+    improvement = 1 - 1e-6 if power == int(power) else 1e-9
+    best_value, best_speeds = inf, None
+
+    def minimum_sending_speed(loading_speed: int, compute_speed: int) -> Optional[int]:
+        """The exact minimum sending speed using integer arithmetic"""
+        remaining_time = deadline * loading_speed * compute_speed - storage * compute_speed - loading_speed * computation
+        if remaining_time < 0 or (remaining_time == 0 and 0 < results_data):
+            return None
+        elif results_data == 0:
+            return 1
+        return max(1, int(-(-loading_speed * compute_speed * results_data // remaining_time)))
+
+    def search_compute_speeds(loading_speed: int, compute_speeds: Iterable[int]):
+        """Searches the compute speeds in order until the lower bound is not less than the best value"""
+        nonlocal best_value, best_speeds
+        remaining_time = deadline - storage / loading_speed
+        for compute_speed in compute_speeds:
+            sending_time = remaining_time - computation / compute_speed
+            if sending_time <= 0:
+                continue
+            elif best_value - improvement <= loading_speed ** power + compute_speed ** power + \
+                    (results_data / sending_time) ** power:
+                break
+            sending_speed = minimum_sending_speed(loading_speed, compute_speed)
+            if sending_speed is not None:
+                value = loading_speed ** power + compute_speed ** power + sending_speed ** power
+                if value < best_value:
+                    best_value, best_speeds = value, (loading_speed, compute_speed, sending_speed)
+
+    def search_loading_speeds(loading_speeds: Iterable[int]):
+        """Searches the loading speeds in order until the lower bound is not less than the best value"""
+        compute_results_sum = computation ** exponent + results_data ** exponent
+        for loading_speed in loading_speeds:
+            remaining_time = deadline - storage / loading_speed
+            if remaining_time <= 0 or \
+                    best_value - improvement <= loading_speed ** power + compute_results_sum ** (power + 1) / \
+                    remaining_time ** power:
+                break
+            # The continuous compute speed for the remaining time
+            min_compute_speed = floor(computation / remaining_time)
+            compute_speed = max(min_compute_speed + 1,
+                                round(computation ** (1 - exponent) * compute_results_sum / remaining_time))
+            search_compute_speeds(loading_speed, count(compute_speed))
+            search_compute_speeds(loading_speed, range(compute_speed - 1, max(0, min_compute_speed - 1), -1))
+
+    # The continuous loading speed for the deadline
+    requirement_sum = storage ** exponent + computation ** exponent + results_data ** exponent
+    loading_speed = max(floor(storage / deadline) + 1, round(storage ** (1 - exponent) * requirement_sum / deadline))
+    search_loading_speeds(count(loading_speed))
+    search_loading_speeds(range(loading_speed - 1, floor(storage / deadline), -1))
+
+    assert best_speeds is not None, f'No fixed speeds found for {task}'
+    return best_speeds
+
+
+class FixedSpeedsCache:
+    """
+    Memo cache of the fixed speeds for the task requirements (storage, computation, results data and deadline) and the
+        fixed allocation priority name that can be saved to a file to persist across runs
+    """
+
+    def __init__(self, filename: Optional[str] = None):
+        self.filename = filename
+        self.speeds: Dict[Tuple[int, int, int, int, str], Tuple[int, int, int]] = {}
+
+        if filename is not None:
+            self.load(filename)
+
+    def load(self, filename: str):
+        """
+        Loads the fixed speeds from the file, if the file exists, with the file used for saving
+
+        :param filename: The cache filename
+        """
+        self.filename = filename
+        if os.path.exists(filename):
+            with open(filename) as file:
+                for storage, computation, results_data, deadline, name, loading, compute, sending in json.load(file):
+                    self.speeds[(storage, computation, results_data, deadline, name)] = (loading, compute, sending)
+
+    def save(self):
+        """
+        Saves the fixed speeds to the cache file, merging with the speeds of the file in case of other runs
+        """
+        if self.filename is not None:
+            self.load(self.filename)
+            temp_filename = f'{self.filename}.{os.getpid()}.tmp'
+            with open(temp_filename, 'w') as file:
+                json.dump([list(key) + list(speeds) for key, speeds in self.speeds.items()], file)
+            os.replace(temp_filename, self.filename)
+
+
+# The fixed speeds cache used by the fixed tasks
+fixed_speeds_cache = FixedSpeedsCache()
+
+
 def generate_fixed_tasks(tasks: List[Task], fixed_allocation_priority: FixedAllocationPriority,
                          resource_foreknowledge: bool = False, max_tries: int = 5) -> List[FixedTask]:
     """
@@ -185,4 +336,6 @@ def generate_fixed_tasks(tasks: List[Task], fixed_allocation_priority: FixedAllo
         if tries == max_tries:
             raise Exception(f'Unable to create the fixed task (foreknowledge: {resource_foreknowledge}: '
                             f'{task.__str__()}')
+
+    fixed_speeds_cache.save()
     return fixed_tasks
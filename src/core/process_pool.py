@@ -0,0 +1,55 @@
+"""
+Process pool of workers with a shared state, the state is sent to each worker once when the worker is initialised
+    such that only the arguments of each call are sent to the workers
+"""
+
+from __future__ import annotations
+
+import pickle
+import random as rnd
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from typing import Any
+
+# The shared state of the worker process, set once by the process initialiser
+_shared_state: Any = None
+
+
+def _init_shared_state(state: bytes):
+    """
+    Initialises the worker process with the shared state, the random number generators are reseeded as forked workers
+        inherit the same random state
+
+    :param state: The pickled shared state
+    """
+    global _shared_state
+    _shared_state = pickle.loads(state)
+    rnd.seed()
+    np.random.seed()
+
+
+def shared_process_pool(state: Any, workers: int) -> ProcessPoolExecutor:
+    """
+    Process pool with the shared state sent to each worker once. The state is pickled when the pool is created such
+        that the workers have a copy of the state at the pool creation even if the state changes before the worker
+        processes are started.
+
+    :param state: The shared state that the workers get with shared_state
+    :param workers: The number of worker processes
+    :return: The process pool
+    """
+    return ProcessPoolExecutor(workers, initializer=_init_shared_state, initargs=(pickle.dumps(state),))
+
+
+def shared_state() -> Any:
+    """
+    The shared state of the worker process
+
+    :return: The shared state of the process pool
+    """
+    assert _shared_state is not None, 'The shared state is only set in the shared process pool workers'
+    return _shared_state
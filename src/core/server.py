@@ -2,23 +2,133 @@
 
 from __future__ import annotations
 
+from functools import partial
+from math import ceil, floor, sqrt
 from random import gauss
-from typing import Dict, Any
-from typing import List
+from typing import TYPE_CHECKING, Dict, Any, Sequence
+from typing import List, Optional
+
+import numpy as np
 
 from src.core.task import Task
+from src.core.transaction import journal, journaled
+
+if TYPE_CHECKING:
+    from typing import Iterable, Iterator, Union
+
+    from src.core.compatibility import CompatibilityMatrix
+
+
+class TaskLedger(Sequence):
+    """
+    Ledger of the tasks allocated to a server as a list with an index of each task's position such that adding,
+        removing and checking if a task is in the ledger are all O(1). Removing a task swaps the last task into the
+        removed task's position.
+    """
+
+    __slots__ = ('tasks', 'positions')
+
+    def __init__(self, tasks: Iterable[Task] = ()):
+        self.tasks: List[Task] = list(tasks)
+        self.positions: Dict[Task, int] = {task: pos for pos, task in enumerate(self.tasks)}
+
+    def append(self, task: Task):
+        """
+        Adds the task to the end of the ledger
+
+        :param task: The task
+        """
+        assert task not in self.positions, f'Task {task.name} is already in the ledger'
+        if journal.depth:
+            journal.record_undo(self, self.pop)
+        self.positions[task] = len(self.tasks)
+        self.tasks.append(task)
+
+    def pop(self) -> Task:
+        """
+        Removes the last task of the ledger
+
+        :return: The last task
+        """
+        if journal.depth:
+            journal.record_undo(self, partial(self.append, self.tasks[-1]))
+        task = self.tasks.pop()
+        del self.positions[task]
+        return task
+
+    def remove(self, task: Task):
+        """
+        Removes the task from the ledger with the last task moved to the task's position
+
+        :param task: The task
+        """
+        pos = self.positions.pop(task)
+        if journal.depth:
+            journal.record_undo(self, partial(self.restore, task, pos))
+        last_task = self.tasks.pop()
+        if last_task is not task:
+            self.tasks[pos] = last_task
+            self.positions[last_task] = pos
+
+    def restore(self, task: Task, pos: int):
+        """
+        Restores a removed task to its position with the task in that position moved to the end of the ledger
+
+        :param task: The removed task
+        :param pos: The position of the removed task
+        """
+        if pos < len(self.tasks):
+            moved_task = self.tasks[pos]
+            self.positions[moved_task] = len(self.tasks)
+            self.tasks.append(moved_task)
+            self.tasks[pos] = task
+            self.positions[task] = pos
+        else:
+            self.append(task)
+
+    def copy(self) -> List[Task]:
+        """
+        Copies the tasks of the ledger
+
+        :return: List of the tasks
+        """
+        return self.tasks.copy()
+
+    def __contains__(self, task: Task) -> bool:
+        return task in self.positions
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Task, List[Task]]:
+        return self.tasks[index]
+
+    def __len__(self) -> int:
+        return len(self.tasks)
 
+    def __iter__(self) -> Iterator[Task]:
+        return iter(self.tasks)
 
+    def __add__(self, other: Iterable[Task]) -> List[Task]:
+        return self.tasks + list(other)
+
+
+@journaled
 class Server:
     """
     Server object with a name and resources allocated
+
+    While an allocation snapshot is open (see src.core.transaction), changes to the server attributes are recorded
+        such that they can be restored
+    The server can be bound to a compatibility matrix that is consulted before checking if a task can run
     """
 
-    revenue: float = 0  # This is the total price of the task's allocated
-    value: float = 0  # This is the total value of the task's allocated
+    __slots__ = ('name', 'storage_capacity', 'computation_capacity', 'bandwidth_capacity', 'price_change',
+                 'initial_price', 'allocated_tasks', 'available_storage', 'available_computation',
+                 'available_bandwidth', 'revenue', 'value', 'compatibility')
 
     def __init__(self, name: str, storage_capacity: int, computation_capacity: int, bandwidth_capacity: int,
                  price_change: int = 1, initial_price: int = 0):
+        # The task compatibility matrix that the server is bound to
+        self.compatibility: Optional[CompatibilityMatrix] = None
+
         self.name: str = name
 
         self.storage_capacity: int = storage_capacity
@@ -29,12 +139,14 @@ class Server:
         self.initial_price: int = initial_price
 
         # Allocation information
-        self.allocated_tasks: List[Task] = []
+        self.allocated_tasks: TaskLedger = TaskLedger()
         self.available_storage: int = storage_capacity
         self.available_computation: int = computation_capacity
         self.available_bandwidth: int = bandwidth_capacity
 
-    # noinspection DuplicatedCode
+        self.revenue: float = 0  # This is the total price of the task's allocated
+        self.value: float = 0  # This is the total value of the task's allocated
+
     def can_run(self, task: Task) -> bool:
         """
         Checks if a task can be run on a server if it dedicates all of it's available resources to the task
@@ -47,21 +159,18 @@ class Server:
                 2 <= self.bandwidth_capacity and 1 <= self.computation_capacity):
             return False
 
+        # Check the compatibility matrix for if the task could possibly run
+        if self.compatibility is not None and not self.compatibility.is_possible(task, self):
+            return False
+
         # Case of fixed task (the required storage is checked above)
         if (0 < task.compute_speed and 0 < task.loading_speed and 0 < task.sending_speed) \
                 and (self.available_bandwidth < task.loading_speed + task.sending_speed
                      or self.available_computation < task.compute_speed):
             return False
 
-        for s in range(1, self.available_bandwidth):
-            if task.required_storage * self.available_computation * (self.available_bandwidth - s) + \
-                    s * task.required_computation * (self.available_bandwidth - s) + \
-                    s * self.available_computation * task.required_results_data <= \
-                    task.deadline * s * self.available_computation * (self.available_bandwidth - s):
-                return True
-        return False
+        return feasible_bandwidth_split(task, self.available_computation, self.available_bandwidth)
 
-    # noinspection DuplicatedCode
     def can_run_empty(self, task: Task) -> bool:
         """
         Checks if a task can be run on a server if it dedicates all of it's possible resources to the task
@@ -69,6 +178,11 @@ class Server:
         :param task: The task to test
         :return: If it can run
         """
+        # The compatibility matrix doesnt consider the speeds of fixed tasks
+        if self.compatibility is not None and task.compute_speed == 0:
+            compatible = self.compatibility.is_compatible(task, self)
+            if compatible is not None:
+                return compatible
 
         if not (task.required_storage <= self.storage_capacity and
                 2 <= self.bandwidth_capacity and 1 <= self.computation_capacity):
@@ -79,13 +193,7 @@ class Server:
                 0 < task.sending_speed and task.loading_speed + task.sending_speed < self.bandwidth_capacity:
             return False
 
-        for s in range(1, self.bandwidth_capacity):
-            if task.required_storage * self.computation_capacity * (self.bandwidth_capacity - s) + \
-                    s * task.required_computation * (self.bandwidth_capacity - s) + \
-                    s * self.computation_capacity * task.required_results_data <= \
-                    task.deadline * s * self.computation_capacity * (self.bandwidth_capacity - s):
-                return True
-        return False
+        return feasible_bandwidth_split(task, self.computation_capacity, self.bandwidth_capacity)
 
     def allocate_task(self, task: Task):
         """
@@ -116,11 +224,28 @@ class Server:
 
         self.revenue += task.price
 
+    def deallocate_task(self, task: Task, refund_price: bool = True):
+        """
+        Removes the task from the server, restoring the available resources used by the task
+
+        :param task: The task being deallocated
+        :param refund_price: If to remove the task price from the server revenue
+        """
+        assert task in self.allocated_tasks, f'Job {task.name} is not allocated to the server {self.name}'
+
+        self.allocated_tasks.remove(task)
+        self.available_storage += task.required_storage
+        self.available_computation += task.compute_speed
+        self.available_bandwidth += (task.loading_speed + task.sending_speed)
+
+        if refund_price:
+            self.revenue -= task.price
+
     def reset_allocations(self):
         """
         Resets the allocation information
         """
-        self.allocated_tasks = []
+        self.allocated_tasks = TaskLedger()
 
         self.available_storage = self.storage_capacity
         self.available_computation = self.computation_capacity
@@ -141,6 +266,16 @@ class Server:
                       max(1, int(self.bandwidth_capacity - abs(gauss(0, self.bandwidth_capacity * percent)))),
                       self.price_change)
 
+    def empty_copy(self) -> Server:
+        """
+        A copy of the server without any allocated tasks that is not bound to a compatibility matrix,
+            such that allocations can be trialled on the copy without changing the server
+
+        :return: The copy of the server
+        """
+        return Server(self.name, self.storage_capacity, self.computation_capacity, self.bandwidth_capacity,
+                      self.price_change, self.initial_price)
+
     def update_capacities(self, computation_capacity: int, bandwidth_capacity: int):
         """
         Update the computational and bandwidth capacities of the server
@@ -154,6 +289,9 @@ class Server:
         self.bandwidth_capacity = bandwidth_capacity
         self.available_bandwidth = bandwidth_capacity
 
+        if self.compatibility is not None:
+            self.compatibility.update((self,))
+
     def save(self):
         """
         Saves the server attributes
@@ -216,6 +354,68 @@ class Server:
         )
 
 
+def feasible_bandwidth_split(task: Task, computation: int, bandwidth: int) -> bool:
+    """
+    Checks if there is a split of the bandwidth between the loading and sending speed for the task to meet its deadline
+        using all of the computation and bandwidth.
+
+    With all of the computation, the time taken is S / s + W / C + R / (B - s) that is convex in the loading speed s,
+        with the continuous minimum at s = B * sqrt(S) / (sqrt(S) + sqrt(R)). Therefore the best integer loading speed
+        is the floor or ceiling of the continuous minimum, the neighbours of these are also checked in case of float
+        errors with the deadline constraint checked using integer arithmetic.
+
+    :param task: The task
+    :param computation: The computation to use
+    :param bandwidth: The bandwidth to split between the loading and sending speeds
+    :return: If a split of the bandwidth exists that the task can meet its deadline
+    """
+    if bandwidth < 2:
+        return False
+
+    storage_sqrt, results_sqrt = sqrt(task.required_storage), sqrt(task.required_results_data)
+    if storage_sqrt + results_sqrt == 0:
+        loading_speed = 1
+    else:
+        loading_speed = bandwidth * storage_sqrt / (storage_sqrt + results_sqrt)
+
+    for s in range(max(1, floor(loading_speed) - 1), min(bandwidth - 1, ceil(loading_speed) + 1) + 1):
+        if task.required_storage * computation * (bandwidth - s) + \
+                s * task.required_computation * (bandwidth - s) + \
+                s * computation * task.required_results_data <= \
+                task.deadline * s * computation * (bandwidth - s):
+            return True
+    return False
+
+
+def feasible_bandwidth_splits(storage: np.ndarray, computation: np.ndarray, results_data: np.ndarray,
+                              deadline: np.ndarray, compute_speed: np.ndarray, bandwidth: np.ndarray) -> np.ndarray:
+    """
+    Vectorised version of the feasible bandwidth split with the task requirements and the server resources broadcast
+        together, e.g. task columns and server rows result in a task by server array
+
+    :param storage: The task required storage
+    :param computation: The task required computation
+    :param results_data: The task required results data
+    :param deadline: The task deadline
+    :param compute_speed: The computation to use
+    :param bandwidth: The bandwidth to split between the loading and sending speeds
+    :return: Boolean array of if a split of the bandwidth exists that the task can meet its deadline
+    """
+    storage_sqrt, results_sqrt = np.sqrt(storage), np.sqrt(results_data)
+    requirement_sqrt = storage_sqrt + results_sqrt
+    split = np.divide(storage_sqrt, requirement_sqrt, out=np.zeros(np.shape(requirement_sqrt)),
+                      where=0 < requirement_sqrt)
+    loading_speed = np.floor(bandwidth * split).astype(np.int64)
+
+    # The floor of the continuous minimum with the neighbours of the floor and ceiling
+    feasible = np.zeros(np.broadcast(loading_speed, compute_speed).shape, dtype=bool)
+    for offset in (-1, 0, 1, 2):
+        s = np.clip(loading_speed + offset, 1, np.maximum(bandwidth - 1, 1))
+        feasible |= storage * compute_speed * (bandwidth - s) + s * computation * (bandwidth - s) + \
+            s * compute_speed * results_data <= deadline * s * compute_speed * (bandwidth - s)
+    return feasible & (2 <= bandwidth)
+
+
 def server_diff(normal_server: Server, mutate_server: Server) -> str:
     """
     Returns a string difference between two servers
@@ -13,6 +13,8 @@ if TYPE_CHECKING:
 class SuperServer(Server):
     """Super Server which is the power rangers megazord of servers"""
 
+    __slots__ = ()
+
     def __init__(self, servers: List[Server]):
         price_changes = [server.price_change for server in servers]
         initial_prices = [server.initial_price for server in servers]
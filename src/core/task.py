@@ -6,20 +6,30 @@ from math import ceil
 from random import gauss, randint, uniform
 from typing import TYPE_CHECKING, List
 
+from src.core.transaction import journaled
+
 if TYPE_CHECKING:
     from typing import Optional, Dict, Any
 
     from src.core.server import Server
 
 
+@journaled
 class Task:
     """
     Task object with name and required resources to use (storage, computation and models data)
     When the task is allocated to a server then the resources speed and server are set
 
     Constructor arguments are final as they dont need changing after initialisation
+
+    While an allocation snapshot is open (see src.core.transaction), changes to the task attributes are recorded
+        such that they can be restored
     """
 
+    __slots__ = ('name', 'required_storage', 'required_computation', 'required_results_data', 'value', 'price',
+                 'auction_time', 'deadline', 'loading_speed', 'compute_speed', 'sending_speed', 'running_server',
+                 'planned_computation', 'planned_storage')
+
     def __init__(self, name: str, required_storage: int, required_computation: int, required_results_data: int,
                  value: Optional[float], deadline: int, price: float = 0, auction_time: int = -1,
                  loading_speed: Optional[int] = None, compute_speed: Optional[int] = None,
@@ -99,6 +109,16 @@ class Task:
         if price is not None:
             self.price = round(price, 3)
 
+    def deallocate(self, forget_price: bool = True):
+        """
+        Deallocates the task from its running server, restoring the server's available resources and revenue
+
+        :param forget_price: If to forget the task price
+        """
+        assert self.running_server is not None, f'Task {self.name} is not allocated'
+        self.running_server.deallocate_task(self)
+        self.reset_allocation(forget_price=forget_price)
+
     def reset_allocation(self, forget_price: bool = True):
         """
         Resets the allocation data to the default
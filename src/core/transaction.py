@@ -0,0 +1,221 @@
+"""
+Allocation snapshots and transactions over the tasks and servers
+
+While a snapshot is open, every change to a task or server attribute (speeds, running server, price, available
+    resources, revenue, etc) and every task added or removed from a server's allocated tasks is recorded in the
+    allocation journal with the previous value. Restoring a snapshot undoes the recorded changes in reverse order such
+    that trial allocations are undone in O(changes) rather than resetting and re-allocating the whole model.
+
+Snapshots can be nested with the changes of a released inner snapshot kept in the journal so that they are still
+    undone by restoring an outer snapshot.
+
+The allocation journal is local to each thread, a snapshot records the changes made by its thread to any task or server
+    and the changes made by other threads are not recorded (or undone). Therefore the tasks and servers changed within
+    a snapshot should not be changed by other threads until the snapshot is released. Forked processes start without
+    open snapshots as the parent's snapshots can't be released by the child.
+
+The attribute changes are recorded by a __setattr__ that is only installed on the journaled classes (the tasks and
+    servers) while any thread has an open snapshot, such that attribute writes outside of a snapshot have no overhead.
+"""
+
+from __future__ import annotations
+
+import os
+from threading import Lock, local
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Callable, List, Tuple, Optional
+
+
+class AllocationJournal(local):
+    """
+    Journal of the previous attribute values of the tasks and servers changed while a snapshot is open, the journal
+        attributes are local to each thread
+    """
+
+    def __init__(self):
+        # The number of open snapshots in the thread, changes are only recorded if there are open snapshots
+        self.depth: int = 0
+        # List of changes as the changed object, the attribute name and the previous value, or if the name is None
+        #   then the value is a function to undo the change
+        self.changes: List[Tuple[Any, Optional[str], Any]] = []
+
+    def record(self, row: Any, name: str):
+        """
+        Records the current value of an attribute before it is changed
+
+        :param row: The task or server
+        :param name: The attribute name
+        """
+        # The attribute may not be set yet if the task or server is initialised during the snapshot
+        try:
+            self.changes.append((row, name, getattr(row, name)))
+        except AttributeError:
+            pass
+
+    def record_undo(self, row: Any, undo: Callable[[], Any]):
+        """
+        Records a change with a function to undo it
+
+        :param row: The changed object
+        :param undo: The function to undo the change
+        """
+        self.changes.append((row, None, undo))
+
+
+# The allocation journal for all of the tasks and servers
+journal = AllocationJournal()
+
+# The classes with attribute changes recorded while a snapshot is open
+journaled_classes: List[type] = []
+# The number of threads with open snapshots, the recorded __setattr__ is installed while any thread has open snapshots
+_snapshot_threads: int = 0
+_snapshot_threads_lock = Lock()
+
+
+def journaled(cls: type) -> type:
+    """
+    Class decorator for the attribute changes of the class (and subclasses) to be recorded while a snapshot is open
+
+    :param cls: The class
+    :return: The class
+    """
+    assert '__setattr__' not in cls.__dict__, f'{cls.__name__} already overrides __setattr__'
+    with _snapshot_threads_lock:
+        journaled_classes.append(cls)
+        if _snapshot_threads:
+            cls.__setattr__ = recorded_setattr
+    return cls
+
+
+def recorded_setattr(row: Any, name: str, value: Any):
+    """
+    Sets the attribute recording the previous value if the thread has an open snapshot, installed on the journaled
+        classes while any thread has an open snapshot
+
+    :param row: The task or server
+    :param name: The attribute name
+    :param value: The attribute value
+    """
+    if journal.depth:
+        journal.record(row, name)
+    object.__setattr__(row, name, value)
+
+
+def snapshot() -> int:
+    """
+    Opens a snapshot of the current allocation state, only the changes made by the current thread are recorded
+
+    :return: The snapshot, this should be released by the same thread once no longer needed
+    """
+    global _snapshot_threads
+    if journal.depth == 0:
+        with _snapshot_threads_lock:
+            if _snapshot_threads == 0:
+                for cls in journaled_classes:
+                    cls.__setattr__ = recorded_setattr
+            _snapshot_threads += 1
+    journal.depth += 1
+    return len(journal.changes)
+
+
+def checkpoint() -> int:
+    """
+    A checkpoint of the current allocation state within an open snapshot, the checkpoint can be restored while the
+        snapshot is open and doesn't need releasing. Restoring a checkpoint (or snapshot) undoes all later checkpoints.
+
+    :return: The checkpoint
+    """
+    assert 0 < journal.depth, 'Checkpoints require an open snapshot'
+    return len(journal.changes)
+
+
+def restore(allocation_snapshot: int):
+    """
+    Restores the allocation state to the snapshot, the snapshot stays open and can be restored again
+
+    :param allocation_snapshot: The snapshot
+    """
+    assert 0 < journal.depth and allocation_snapshot <= len(journal.changes), \
+        f'Snapshot {allocation_snapshot} is not open (depth: {journal.depth}, changes: {len(journal.changes)})'
+
+    # The changes of restoring the attributes must not be recorded
+    depth, journal.depth = journal.depth, 0
+    try:
+        changes = journal.changes
+        while allocation_snapshot < len(changes):
+            row, name, value = changes.pop()
+            if name is None:
+                value()
+            else:
+                setattr(row, name, value)
+    finally:
+        journal.depth = depth
+
+
+def release(allocation_snapshot: int):
+    """
+    Releases the snapshot keeping the current allocation state, once all of the thread's snapshots are released the
+        thread's journal is cleared
+
+    :param allocation_snapshot: The snapshot
+    """
+    global _snapshot_threads
+    assert 0 < journal.depth and allocation_snapshot <= len(journal.changes), \
+        f'Snapshot {allocation_snapshot} is not open (depth: {journal.depth}, changes: {len(journal.changes)})'
+    journal.depth -= 1
+    if journal.depth == 0:
+        journal.changes.clear()
+        with _snapshot_threads_lock:
+            _snapshot_threads -= 1
+            if _snapshot_threads == 0:
+                for cls in journaled_classes:
+                    del cls.__setattr__
+
+
+class Transaction:
+    """
+    Context manager for a snapshot of the allocation state, the allocation is kept at the end of the transaction
+        unless the transaction is rolled back or an exception is raised
+    """
+
+    def __init__(self, rollback: bool = False):
+        """
+        Constructor
+
+        :param rollback: If to restore the allocation state at the end of the transaction
+        """
+        self.rollback = rollback
+        self.snapshot: int = -1
+
+    def __enter__(self) -> Transaction:
+        self.snapshot = snapshot()
+        return self
+
+    def restore(self):
+        """
+        Restores the allocation state to the start of the transaction
+        """
+        restore(self.snapshot)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.rollback or exc_type is not None:
+            restore(self.snapshot)
+        release(self.snapshot)
+
+
+def _reset_after_fork():
+    """
+    Resets the journal of a forked process as the snapshots open when forking are only released by the parent
+    """
+    global _snapshot_threads, _snapshot_threads_lock
+    journal.depth, journal.changes = 0, []
+    _snapshot_threads_lock = Lock()
+    if _snapshot_threads:
+        for cls in journaled_classes:
+            del cls.__setattr__
+    _snapshot_threads = 0
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
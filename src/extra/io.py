@@ -3,13 +3,16 @@ Input/Output functions
 """
 
 import argparse
+import atexit
 import datetime as dt
 from enum import auto, Enum
 from typing import Iterable
 
 import matplotlib.pyplot as plt
 
+from src.core.fixed_task import fixed_speeds_cache
 from src.extra.model import ModelDistribution
+from src.greedy.allocation_cache import allocation_cache
 
 
 class ImageFormat(Enum):
@@ -80,6 +83,8 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument('--servers', '-s', help='Number of servers', default=None)
     parser.add_argument('--repeat', '-r', help='Number of repeats', default=0)
     parser.add_argument('--extra', '-e', help='Extra information to pass to the script', default='')
+    parser.add_argument('--fixed_cache', help='Location of the fixed speeds cache file', default='')
+    parser.add_argument('--allocation_cache', help='Location of the resource allocation cache file', default='')
 
     args = parser.parse_args()
     args.file = f'models/{args.file}.mdl'
@@ -89,5 +94,10 @@ def parse_args() -> argparse.Namespace:
 
     if args.extra == ' ':
         args.extra = ''
+    if args.fixed_cache:
+        fixed_speeds_cache.load(args.fixed_cache)
+    if args.allocation_cache:
+        allocation_cache.load(args.allocation_cache)
+        atexit.register(allocation_cache.save)
 
     return args
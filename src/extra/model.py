@@ -9,26 +9,34 @@ import random as rnd
 from math import ceil
 from typing import TYPE_CHECKING
 
+import numpy as np
 import pandas as pd
 
+from src.core.compatibility import CompatibilityMatrix
 from src.core.server import Server
 from src.core.task import Task
 
 if TYPE_CHECKING:
-    from typing import Tuple, List, Optional
+    from typing import Tuple, List, Optional, Dict, Any
 
 
 class ModelDistribution:
-    """Model distributions"""
+    """
+    Model distributions
+
+    The tasks and servers are generated in bulk with all of the random samples drawn from a seeded numpy generator
+    """
 
     storage_scaling = 500
     computational_scaling = 1
     results_data_scaling = 5
 
-    def __init__(self, filename: str, num_tasks: Optional[int] = None, num_servers: Optional[int] = None):
+    def __init__(self, filename: str, num_tasks: Optional[int] = None, num_servers: Optional[int] = None,
+                 seed: Optional[int] = None):
         self.filename = filename
         self.num_tasks = num_tasks
         self.num_servers = num_servers
+        self.random = np.random.default_rng(seed)
 
         with open(self.filename) as file:
             self.model_data = json.load(file)
@@ -40,40 +48,44 @@ class ModelDistribution:
             else:
                 self.task_model = None
 
-    def generate(self) -> Tuple[List[Task], List[Server]]:
+    def generate(self, compatibility: bool = False) -> Tuple[List[Task], List[Server]]:
         """
         Creates a list of tasks and servers from a task and server distribution
 
+        :param compatibility: If to bind the servers to a task compatibility matrix
         :return: A list of tasks and list of servers
         """
         servers = self.generate_servers()
-        return self.generate_tasks(servers), servers
+        tasks = self.generate_tasks(servers)
+        if compatibility:
+            CompatibilityMatrix(tasks, servers)
+        return tasks, servers
 
-    def generate_online(self, time_steps: int, mean_arrival_rate: int,
-                        std_arrival_rate: float) -> Tuple[List[Task], List[Server]]:
+    def generate_online(self, time_steps: int, mean_arrival_rate: int, std_arrival_rate: float,
+                        compatibility: bool = False) -> Tuple[List[Task], List[Server]]:
         """
         Create a list of tasks and servers from a task and server distribution with online distribution
 
         :param time_steps: Number of time steps
         :param mean_arrival_rate: Mean number of tasks that arrive each time steps
         :param std_arrival_rate: Standard deviation of the number of tasks that arrive each time steps
+        :param compatibility: If to bind the servers to a task compatibility matrix
         :return: A list of tasks and list of servers
         """
         servers = self.generate_servers()
 
-        tasks, task_id = [], 0
-        for time_step in range(time_steps):
-            for task in range(max(0, int(rnd.gauss(mean_arrival_rate, std_arrival_rate)))):
-                if 'task distributions' in self.model_data:
-                    task = self.generate_synthetic_task(task_id, servers)
-                elif 'task filename' in self.model_data:
-                    task = self.generate_alibaba_task(task_id, servers)
-                else:
-                    raise Exception('Unknown model type')
-
-                task.auction_time, task_id = time_step, task_id + 1
-                tasks.append(task)
+        # The number of tasks that arrive at each time step
+        arrivals = np.maximum(0, np.trunc(self.random.normal(mean_arrival_rate, std_arrival_rate, time_steps)))
+        auction_times = np.repeat(np.arange(time_steps), arrivals.astype(np.int64))
+        if 'task distributions' in self.model_data:
+            tasks = self.generate_synthetic_tasks(len(auction_times), servers, auction_times)
+        elif 'task filename' in self.model_data:
+            tasks = self.generate_alibaba_tasks(len(auction_times), servers, auction_times)
+        else:
+            raise Exception('Unknown model type')
 
+        if compatibility:
+            CompatibilityMatrix(tasks, servers)
         return tasks, servers
 
     def generate_tasks(self, servers: List[Server]) -> List[Task]:
@@ -85,13 +97,121 @@ class ModelDistribution:
         """
         if 'task distributions' in self.model_data:
             assert self.num_tasks is not None
-            return [self.generate_synthetic_task(task_id, servers) for task_id in range(self.num_tasks)]
+            return self.generate_synthetic_tasks(self.num_tasks, servers)
         elif 'task filename' in self.model_data:
             assert self.num_tasks is not None
-            return [self.generate_alibaba_task(task_id, servers) for task_id in range(self.num_tasks)]
+            return self.generate_alibaba_tasks(self.num_tasks, servers)
         else:
             return [Task.load(task_model) for task_model in self.model_data['tasks']]
 
+    def generate_synthetic_tasks(self, num_tasks: int, servers: List[Server],
+                                 auction_times: Optional[np.ndarray] = None) -> List[Task]:
+        """
+        Generate a list of synthetic tasks in bulk
+
+        :param num_tasks: The number of tasks
+        :param servers: List of servers
+        :param auction_times: The auction time of each task
+        :return: A list of new random tasks
+        """
+        task_dists = self.model_data['task distributions']
+        dist_indexes = self.sample_distributions(task_dists, num_tasks)
+        storage, computation, results_data, deadline = (
+            self.positive_gaussians(task_dists, dist_indexes, attribute)
+            for attribute in ('storage', 'computation', 'results data', 'deadline'))
+        values = self.concave_values(storage, computation, results_data, servers)
+        auction_times = np.full(num_tasks, -1) if auction_times is None else auction_times
+
+        return [Task(f'{task_dists[dist_index]["name"]} {task_id}', required_storage=task_storage,
+                     required_computation=task_computation, required_results_data=task_results_data,
+                     value=value, deadline=task_deadline, auction_time=auction_time)
+                for task_id, (dist_index, task_storage, task_computation, task_results_data, task_deadline, value,
+                              auction_time)
+                in enumerate(zip(dist_indexes.tolist(), storage.tolist(), computation.tolist(),
+                                 results_data.tolist(), deadline.tolist(), values.tolist(), auction_times.tolist()))]
+
+    def generate_alibaba_tasks(self, num_tasks: int, servers: List[Server],
+                               auction_times: Optional[np.ndarray] = None) -> List[Task]:
+        """
+        Generate a list of alibaba tasks in bulk
+
+        :param num_tasks: The number of tasks
+        :param servers: List of servers
+        :param auction_times: The auction time of each task
+        :return: A list of new random tasks
+        """
+        task_rows = self.task_model.iloc[self.random.integers(0, len(self.task_model), num_tasks)]
+        mem_max, plan_mem = task_rows['mem_max'].to_numpy(), task_rows['plan_mem'].to_numpy()
+
+        storage = np.ceil(self.storage_scaling * np.minimum(1.2 * mem_max, plan_mem)).astype(np.int64)
+        computation = np.ceil(self.computational_scaling * 1.2 * task_rows['total_cpu'].to_numpy()).astype(np.int64)
+        results_data = np.ceil(self.results_data_scaling * self.random.integers(20, 61, num_tasks) *
+                               mem_max).astype(np.int64)
+        planned_storage = np.ceil(self.storage_scaling * plan_mem).astype(np.int64)
+        planned_computation = np.ceil(self.computational_scaling * task_rows['plan_cpu'].to_numpy()).astype(np.int64)
+        values = self.concave_values(storage, computation, results_data, servers)
+        auction_times = np.full(num_tasks, -1) if auction_times is None else auction_times
+
+        return [Task(f'realistic {task_id}', required_storage=task_storage, required_computation=task_computation,
+                     required_results_data=task_results_data, value=value, deadline=task_deadline,
+                     auction_time=auction_time, planned_storage=task_planned_storage,
+                     planned_computation=task_planned_computation)
+                for task_id, (task_storage, task_computation, task_results_data, task_deadline, value, auction_time,
+                              task_planned_storage, task_planned_computation)
+                in enumerate(zip(storage.tolist(), computation.tolist(), results_data.tolist(),
+                                 task_rows['time_taken'].tolist(), values.tolist(), auction_times.tolist(),
+                                 planned_storage.tolist(), planned_computation.tolist()))]
+
+    def sample_distributions(self, distributions: List[Dict[str, Any]], num_samples: int) -> np.ndarray:
+        """
+        Samples the index of the distributions using the distribution probabilities
+
+        :param distributions: List of the distributions with probabilities
+        :param num_samples: The number of samples
+        :return: Array of the distribution indexes
+        """
+        cumulative_probabilities = np.cumsum([distribution['probability'] for distribution in distributions])
+        indexes = np.searchsorted(cumulative_probabilities, self.random.random(num_samples), side='left')
+        return np.minimum(indexes, len(distributions) - 1)
+
+    def positive_gaussians(self, distributions: List[Dict[str, Any]], indexes: np.ndarray,
+                           attribute: str) -> np.ndarray:
+        """
+        Samples a positive integer gaussian for the attribute of each distribution index
+
+        :param distributions: List of the distributions
+        :param indexes: The distribution index of each sample
+        :param attribute: The attribute name with the mean and standard deviation
+        :return: Array of integer samples of at least 1
+        """
+        means = np.array([distribution[f'{attribute} mean'] for distribution in distributions])[indexes]
+        stds = np.array([distribution[f'{attribute} std'] for distribution in distributions])[indexes]
+        return np.maximum(1, np.trunc(self.random.normal(means, stds))).astype(np.int64)
+
+    def concave_values(self, storage: np.ndarray, computation: np.ndarray, results_data: np.ndarray,
+                       servers: List[Server]) -> np.ndarray:
+        """
+        Generates the concave utility of the tasks in accordance with Araldo et al, 2020 (see Task.concave_value)
+
+        :param storage: The task required storage
+        :param computation: The task required computation
+        :param results_data: The task required results data
+        :param servers: List of servers to get the maximum resources
+        :return: Array of the task values
+        """
+        num_tasks = len(storage)
+        alpha, alpha_prime = np.sort(self.random.uniform(0, 1, (2, num_tasks)), axis=0)
+        beta_storage, beta_comp, beta_results_data = self.random.uniform(1, 5, (3, num_tasks))
+
+        storage_total = sum(server.storage_capacity for server in servers)
+        comp_total = sum(server.computation_capacity for server in servers)
+        results_total = sum(server.bandwidth_capacity for server in servers)
+
+        storage_value = alpha * np.power(storage / storage_total, 1 / beta_storage)
+        computation_value = (alpha_prime - alpha) * np.power(computation / comp_total, 1 / beta_comp)
+        results_data_value = (1 - alpha_prime) * np.power(results_data / results_total, 1 / beta_results_data)
+        return np.round(storage_value + computation_value + results_data_value * 100, 2)
+
     def generate_synthetic_task(self, task_id: int, servers: List[Server]) -> Task:
         """
         Generate a new synthetic task
@@ -132,7 +252,15 @@ class ModelDistribution:
         """
         if 'server distributions' in self.model_data:
             assert self.num_servers is not None
-            return [self.generate_synthetic_server(server_id) for server_id in range(self.num_servers)]
+            server_dists = self.model_data['server distributions']
+            dist_indexes = self.sample_distributions(server_dists, self.num_servers)
+            storage, computation, bandwidth = (self.positive_gaussians(server_dists, dist_indexes, attribute)
+                                               for attribute in ('storage', 'computation', 'bandwidth'))
+            return [Server(f'{server_dists[dist_index]["name"]} {server_id}', storage_capacity=server_storage,
+                           computation_capacity=server_computation, bandwidth_capacity=server_bandwidth)
+                    for server_id, (dist_index, server_storage, server_computation, server_bandwidth)
+                    in enumerate(zip(dist_indexes.tolist(), storage.tolist(), computation.tolist(),
+                                     bandwidth.tolist()))]
         else:
             return [Server.load(server_model) for server_model in self.model_data['servers']]
 
@@ -1,7 +1,6 @@
 """
 For online resource allocation using any resource allocation mechanism (optimal, greedy, fixed, etc)
 """
-from math import ceil
 from time import time
 from typing import List
 
@@ -35,9 +34,13 @@ def online_batch_solver(batched_tasks: List[List[Task]], servers: List[Server],
     for batch_num, batch_tasks in enumerate(batched_tasks):
         solver(batch_tasks, servers, **solver_args)
 
+        # Save the social welfare of the batch tasks for each server with a single pass over the tasks
+        for task in batch_tasks:
+            if task.running_server in server_social_welfare:
+                server_social_welfare[task.running_server] += task.value
+
         for server in servers:
             # Save the current information for the server
-            server_social_welfare[server] += sum(task.value for task in batch_tasks if task.running_server is server)
             server_storage_usage[server].append(resource_usage(server, 'storage'))
             server_computation_usage[server].append(resource_usage(server, 'computation'))
             server_bandwidth_usage[server].append(resource_usage(server, 'bandwidth'))
@@ -46,27 +49,19 @@ def online_batch_solver(batched_tasks: List[List[Task]], servers: List[Server],
             # Get the current batch time step and the next batch time step
             current_time_step, next_time_step = batch_length * batch_num, batch_length * (batch_num + 1)
 
-            # Update the server allocation task to only tasks within the next batch step time
-            server.allocated_tasks = [task for task in server.allocated_tasks
-                                      if next_time_step <= task.auction_time + task.deadline]
+            # Deallocate the tasks that are not within the next batch step time, the server keeps the task revenue
+            for task in [task for task in server.allocated_tasks
+                         if task.auction_time + task.deadline < next_time_step]:
+                server.deallocate_task(task, refund_price=False)
             # Calculate how much of the batch, the task will be allocate for
             # batch_multiplier = {task: batch_length if next_time_step <= task.auction_time + task.deadline else
             #                  (task.auction_time + task.deadline - next_time_step) for task in server.allocated_tasks}
             # assert all(0 < multiplier <= batch_length for multiplier in batch_multiplier.values()), \
             #     list(batch_multiplier.values())
 
-            # Update the server available resources
-            server.available_storage = server.storage_capacity - \
-                sum(task.required_storage for task in server.allocated_tasks)
+            # Check the server available resources
             assert 0 <= server.available_storage <= server.storage_capacity, server.available_storage
-
-            server.available_computation = server.computation_capacity - \
-                ceil(sum(task.compute_speed for task in server.allocated_tasks))
             assert 0 <= server.available_computation <= server.computation_capacity, server.available_computation
-
-            server.available_bandwidth = server.bandwidth_capacity - \
-                ceil(sum((task.loading_speed + task.sending_speed)
-                         for task in server.allocated_tasks))
             assert 0 <= server.available_bandwidth <= server.bandwidth_capacity, server.available_bandwidth
 
     flatten_tasks = [task for tasks in batched_tasks for task in tasks]
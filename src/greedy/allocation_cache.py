@@ -0,0 +1,134 @@
+"""
+Least recently used cache of the resource allocation results
+
+The resource allocation of a task on a server only depends on the task requirements, the server resources and the
+    policy, so the same allocation is often solved many times, e.g. by the critical value auction replaying the greedy
+    algorithm and the server selection policies that allocate the task on every server. The results are cached by these
+    values with the least recently used result evicted once the cache is full.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class AllocationCache:
+    """
+    Thread safe bounded least recently used cache of the resource allocation results with hit, miss and eviction
+        statistics that can be saved to a file to persist across runs
+    """
+
+    def __init__(self, max_size: int = 2 ** 16, filename: Optional[str] = None):
+        """
+        Constructor
+
+        :param max_size: The maximum number of cached results, if 0 then no results are cached
+        :param filename: The cache filename
+        """
+        self.max_size = max_size
+        self.filename = filename
+        self.results: OrderedDict[Hashable, Any] = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+        if filename is not None:
+            self.load(filename)
+
+    def get(self, key: Hashable, solve: Callable[[], Any]) -> Any:
+        """
+        Gets the cached result of the key otherwise solves and caches the result, the solve is run outside of the lock
+            such that the cache is not blocked by the solver
+
+        :param key: The cache key
+        :param solve: Function to solve the result if the key is not cached
+        :return: The result
+        """
+        with self.lock:
+            if key in self.results:
+                self.hits += 1
+                self.results.move_to_end(key)
+                return self.results[key]
+            self.misses += 1
+
+        result = solve()
+        with self.lock:
+            self._add(key, result)
+        return result
+
+    def _add(self, key: Hashable, result: Any):
+        """
+        Adds the result to the cache evicting the least recently used results if the cache is full, the lock must be
+            held
+
+        :param key: The cache key
+        :param result: The result
+        """
+        if 0 < self.max_size:
+            self.results[key] = result
+            self.results.move_to_end(key)
+            while self.max_size < len(self.results):
+                self.results.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        The cache statistics
+
+        :return: Dictionary of the hits, misses, evictions and size of the cache
+        """
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'size': len(self.results)}
+
+    def clear(self):
+        """
+        Clears the cached results and statistics
+        """
+        with self.lock:
+            self.results.clear()
+            self.hits, self.misses, self.evictions = 0, 0, 0
+
+    def load(self, filename: str):
+        """
+        Loads the results from the file, if the file exists, with the file used for saving. The loaded results are
+            added as the least recently used results and only while the cache is not full.
+
+        :param filename: The cache filename
+        """
+        self.filename = filename
+        if os.path.exists(filename):
+            with open(filename) as file:
+                saved_results = json.load(file)
+            # The saved results are ordered from least to most recently used
+            with self.lock:
+                for key, result in reversed(saved_results):
+                    key = tuple(key)
+                    if key not in self.results and len(self.results) < self.max_size:
+                        self.results[key] = tuple(result)
+                        self.results.move_to_end(key, last=False)
+
+    def save(self):
+        """
+        Saves the results to the cache file, merging with the results of the file in case of other runs
+        """
+        if self.filename is not None:
+            self.load(self.filename)
+            with self.lock:
+                saved_results = [[list(key), list(result)] for key, result in self.results.items()]
+            temp_filename = f'{self.filename}.{os.getpid()}.tmp'
+            with open(temp_filename, 'w') as file:
+                json.dump(saved_results, file)
+            os.replace(temp_filename, self.filename)
+
+
+# The allocation cache used by the resource allocation policies and the matrix greedy algorithm
+allocation_cache = AllocationCache()
@@ -0,0 +1,251 @@
+"""
+Analytic resource allocation solver that uses the KKT conditions of the continuous resource allocation problem and
+    then searches the integer speeds outwards from the continuous solution
+
+The continuous problem is to minimise a policy objective f(s, w, r) such that
+    S / s + W / w + R / r <= D, s + r <= B and w <= C
+The KKT conditions of the problem with a separable power objective a_i * x_i^p has the closed form solution
+    x_i = (c_i / a_i)^(1 / (p + 1)) * lambda where lambda is found such that the deadline constraint is tight
+"""
+
+from __future__ import annotations
+
+from math import ceil, floor, inf, sqrt
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Callable, Iterable, Optional, Tuple
+
+    from src.core.server import Server
+    from src.core.task import Task
+
+
+def minimum_speed(deadline: int, requirement: int, speed_1: int, requirement_1: int, speed_2: int,
+                  requirement_2: int) -> Optional[int]:
+    """
+    Calculates the minimum speed for a requirement such that the task meets its deadline given the other two speeds,
+        integer arithmetic is used so that the result is exact
+
+    :param deadline: The task deadline
+    :param requirement: The requirement for the speed to find
+    :param speed_1: The first known speed
+    :param requirement_1: The requirement of the first known speed
+    :param speed_2: The second known speed
+    :param requirement_2: The requirement of the second known speed
+    :return: The minimum speed or None if the deadline can not be met for any speed
+    """
+    remaining_time = deadline * speed_1 * speed_2 - requirement_1 * speed_2 - speed_1 * requirement_2
+    if remaining_time <= 0:
+        return None
+    # Integer ceiling division to avoid python float errors
+    return max(1, -(-speed_1 * speed_2 * requirement // remaining_time))
+
+
+def minimum_sending_speed(task: Task, loading_speed: int, compute_speed: int) -> Optional[int]:
+    """
+    Calculates the minimum sending speed for the task to meet its deadline given the loading and compute speeds
+
+    :param task: The task
+    :param loading_speed: The loading speed
+    :param compute_speed: The compute speed
+    :return: The minimum sending speed or None if the deadline can not be met for any sending speed
+    """
+    return minimum_speed(task.deadline, task.required_results_data,
+                         loading_speed, task.required_storage, compute_speed, task.required_computation)
+
+
+def kkt_linear_speeds(task: Task, loading_weight: float, compute_weight: float,
+                      sending_weight: float) -> Tuple[float, float, float]:
+    """
+    The continuous solution of minimising a_s * s + a_w * w + a_r * r with a tight deadline constraint
+
+    :param task: The task
+    :param loading_weight: The loading speed weighting (must be positive)
+    :param compute_weight: The compute speed weighting (must be positive)
+    :param sending_weight: The sending speed weighting (must be positive)
+    :return: The continuous loading, compute and sending speeds
+    """
+    assert 0 < loading_weight and 0 < compute_weight and 0 < sending_weight, \
+        f'Weights must be positive - loading: {loading_weight}, compute: {compute_weight}, sending: {sending_weight}'
+    multiplier = (sqrt(task.required_storage * loading_weight) + sqrt(task.required_computation * compute_weight) +
+                  sqrt(task.required_results_data * sending_weight)) / task.deadline
+    return sqrt(task.required_storage / loading_weight) * multiplier, \
+        sqrt(task.required_computation / compute_weight) * multiplier, \
+        sqrt(task.required_results_data / sending_weight) * multiplier
+
+
+def kkt_power_speeds(task: Task, compute_weight: float, bandwidth_weight: float,
+                     power: float) -> Tuple[float, float, float]:
+    """
+    The continuous solution of minimising a_w * w^p + a_b * (s + r)^p with a tight deadline constraint.
+        For a fixed bandwidth, s + r = t, the time taken is minimised by s = t * sqrt(S) / (sqrt(S) + sqrt(R))
+        resulting in the time S / s + R / r = (sqrt(S) + sqrt(R))^2 / t
+
+    :param task: The task
+    :param compute_weight: The compute speed weighting (must be positive)
+    :param bandwidth_weight: The bandwidth weighting (must be positive)
+    :param power: The objective power (must be positive)
+    :return: The continuous loading, compute and sending speeds
+    """
+    assert 0 < compute_weight and 0 < bandwidth_weight and 0 < power, \
+        f'Weights must be positive - compute: {compute_weight}, bandwidth: {bandwidth_weight}, power: {power}'
+    storage_sqrt, results_sqrt = sqrt(task.required_storage), sqrt(task.required_results_data)
+    bandwidth_requirement = (storage_sqrt + results_sqrt) ** 2
+
+    compute_ratio = (task.required_computation / compute_weight) ** (1 / (power + 1))
+    bandwidth_ratio = (bandwidth_requirement / bandwidth_weight) ** (1 / (power + 1))
+    multiplier = (task.required_computation / compute_ratio + bandwidth_requirement / bandwidth_ratio) / task.deadline
+
+    bandwidth = bandwidth_ratio * multiplier
+    loading = bandwidth * storage_sqrt / (storage_sqrt + results_sqrt)
+    return loading, compute_ratio * multiplier, bandwidth - loading
+
+
+def max_speeds(task: Task, server: Server) -> Tuple[float, float, float]:
+    """
+    The continuous solution using all of the server's available resources with the bandwidth split to minimise the
+        time taken, this is the optimal solution for objectives that decrease with the speeds
+
+    :param task: The task
+    :param server: The server
+    :return: The continuous loading, compute and sending speeds
+    """
+    storage_sqrt, results_sqrt = sqrt(task.required_storage), sqrt(task.required_results_data)
+    loading = server.available_bandwidth * storage_sqrt / (storage_sqrt + results_sqrt)
+    return loading, server.available_computation, server.available_bandwidth - loading
+
+
+def loading_speed_range(task: Task, compute_speed: int, bandwidth: int) -> Optional[Tuple[int, int]]:
+    """
+    The range of loading speeds such that the task meets its deadline with the compute speed and the rest of the
+        bandwidth used for the sending speed. Multiplying the deadline constraint by w * s * (B - s) results in the
+        quadratic a * s^2 - b * s + S * w * B <= 0 with a = D * w - W and b = a * B + (S - R) * w, so the range is
+        between the roots with the float errors of the roots corrected using the exact integer constraint.
+
+    :param task: The task
+    :param compute_speed: The compute speed
+    :param bandwidth: The bandwidth split between the loading and sending speeds
+    :return: The minimum and maximum loading speeds or None if the task can't meet its deadline for any loading speed
+    """
+    storage, computation, results_data, deadline = \
+        task.required_storage, task.required_computation, task.required_results_data, task.deadline
+    quadratic = deadline * compute_speed - computation
+    if quadratic <= 0 or bandwidth < 2:
+        return None
+    linear, constant = quadratic * bandwidth + (storage - results_data) * compute_speed, \
+        storage * compute_speed * bandwidth
+    discriminant = linear * linear - 4 * quadratic * constant
+    if discriminant < 0:
+        return None
+
+    def feasible(loading_speed: int) -> bool:
+        """If the task meets its deadline with the loading speed"""
+        return quadratic * loading_speed * loading_speed - linear * loading_speed + constant <= 0
+
+    root = sqrt(discriminant)
+    lower = max(1, ceil((linear - root) / (2 * quadratic)))
+    upper = min(bandwidth - 1, floor((linear + root) / (2 * quadratic)))
+    while 1 < lower and feasible(lower - 1):
+        lower -= 1
+    while lower <= upper and not feasible(lower):
+        lower += 1
+    while upper < bandwidth - 1 and feasible(upper + 1):
+        upper += 1
+    while lower <= upper and not feasible(upper):
+        upper -= 1
+    return (lower, upper) if lower <= upper else None
+
+
+def convex_minimum(function: Callable[[int], float], lower: int, upper: int, start: int) -> int:
+    """
+    Finds the integer minimum of a convex function within a range by moving from the start in the decreasing
+        direction of the function until the function stops decreasing
+
+    :param function: The convex function
+    :param lower: The lower bound of the range
+    :param upper: The upper bound of the range
+    :param start: The starting point within the range
+    :return: The integer that minimises the function
+    """
+    value = function(start)
+    for step in (1, -1):
+        point, moved = start, False
+        while lower <= point + step <= upper:
+            next_value = function(point + step)
+            if value <= next_value:
+                break
+            point, value, moved = point + step, next_value, True
+        if moved:
+            return point
+    return start
+
+
+def analytic_allocation(task: Task, server: Server, evaluator: Callable[[int, int, int], float],
+                        continuous_speeds: Tuple[float, float, float]) -> Optional[Tuple[int, int, int]]:
+    """
+    Finds the integer resource speeds that minimise the evaluator, the speeds are exact for evaluators that are convex
+        and monotonic in each speed (all of the resource allocation policies) otherwise the speeds are a local minimum.
+
+    For each compute speed, the loading speeds are limited to the range where the task meets its deadline with the
+        rest of the bandwidth used for the sending speed. As the evaluator is monotonic in the sending speed, the
+        sending speed is either the rest of the bandwidth or the minimum sending speed. With the rest of the bandwidth,
+        the evaluator is convex in the loading speed so its integer minimum is found directly. With the minimum sending
+        speed, the evaluator using the continuous minimum sending speed is a convex lower bound so the loading speeds
+        are searched outwards from the minimum of the lower bound, each search direction stops once the lower bound is
+        not less than the best speeds found. The compute speeds are searched outwards from the continuous compute speed
+        with the loading speeds starting from the minimum of the previous compute speed.
+
+    :param task: The task
+    :param server: The server
+    :param evaluator: The resource evaluator to minimise taking the loading, compute and sending speed
+    :param continuous_speeds: The continuous loading, compute and sending speeds
+    :return: The resource speeds that minimise the evaluator or None if no speeds are found
+    """
+    max_bandwidth, max_computation = server.available_bandwidth, server.available_computation
+    if max_bandwidth < 2 or max_computation < 1:
+        return None
+    storage, computation, results_data, deadline = \
+        task.required_storage, task.required_computation, task.required_results_data, task.deadline
+    best_value, best_speeds = inf, None
+
+    def search_compute_speeds(compute_speeds: Iterable[int], loading_start: int):
+        """Searches the compute speeds in order starting the loading speeds from the previous minimum"""
+        nonlocal best_value, best_speeds
+        for compute_speed in compute_speeds:
+            loading_range = loading_speed_range(task, compute_speed, max_bandwidth)
+            if loading_range is None:
+                continue
+            lower, upper = loading_range
+            loading_start = min(max(lower, loading_start), upper)
+
+            # The sending speed as the rest of the bandwidth
+            loading_speed = convex_minimum(
+                lambda loading: evaluator(loading, compute_speed, max_bandwidth - loading), lower, upper, loading_start)
+            value = evaluator(loading_speed, compute_speed, max_bandwidth - loading_speed)
+            if value < best_value:
+                best_value, best_speeds = value, (loading_speed, compute_speed, max_bandwidth - loading_speed)
+
+            # The minimum sending speed with the continuous minimum sending speed as the lower bound
+            def lower_bound(loading: int) -> float:
+                """The evaluator with the continuous minimum sending speed"""
+                remaining_time = deadline * loading * compute_speed - storage * compute_speed - loading * computation
+                return evaluator(loading, compute_speed,
+                                 results_data * loading * compute_speed / remaining_time if 0 < remaining_time else 0)
+
+            loading_start = convex_minimum(lower_bound, lower, upper, loading_start)
+            for loading_speeds in (range(loading_start, upper + 1), range(loading_start - 1, lower - 1, -1)):
+                for loading in loading_speeds:
+                    if best_value <= lower_bound(loading):
+                        break
+                    sending_speed = minimum_sending_speed(task, loading, compute_speed)
+                    if sending_speed is not None:
+                        value = evaluator(loading, compute_speed, sending_speed)
+                        if value < best_value:
+                            best_value, best_speeds = value, (loading, compute_speed, sending_speed)
+
+    continuous_loading, continuous_compute, _ = continuous_speeds
+    compute_start = min(max(1, round(continuous_compute)), max_computation)
+    loading_start = min(max(1, round(continuous_loading)), max_bandwidth - 1)
+    search_compute_speeds(range(compute_start, max_computation + 1), loading_start)
+    search_compute_speeds(range(compute_start - 1, 0, -1), loading_start)
+    return best_speeds
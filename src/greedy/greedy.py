@@ -2,24 +2,56 @@
 
 from __future__ import annotations
 
+import os
+from itertools import product
 from time import time
 from typing import TYPE_CHECKING
 
-from src.core.core import server_task_allocation
+from src.core.core import server_task_allocation, reset_model
+from src.core.process_pool import shared_process_pool, shared_state
 from src.extra.pprint import print_task_values, print_task_allocation
 from src.extra.result import Result
 
 if TYPE_CHECKING:
-    from typing import List
+    from typing import List, Optional, Tuple, Sequence
 
     from src.core.server import Server
     from src.core.task import Task
 
     from src.greedy.resource_allocation_policy import ResourceAllocationPolicy
-    from src.greedy.server_selection_policy import ServerSelectionPolicy
+    from src.greedy.server_selection_policy import ServerSelectionPolicy, ServerIndex
     from src.greedy.task_prioritisation import TaskPriority
 
 
+def allocate_task(task: Task, servers: List[Server], server_selection_policy: ServerSelectionPolicy,
+                  resource_allocation_policy: ResourceAllocationPolicy,
+                  server_index: Optional[ServerIndex] = None) -> Optional[Server]:
+    """
+    Allocate the task to a server based on the server selection policy and resource allocation policies
+
+    :param task: The task
+    :param servers: The list of servers
+    :param server_selection_policy: The server selection policy
+    :param resource_allocation_policy: The resource allocation policy
+    :param server_index: The server index of the server selection policy that is updated with the allocated server
+    :return: The allocated server or None if no server is selected
+    """
+    # Select the server using the server selection policy with the resources allocated by the allocation policy
+    if server_index is None:
+        selection = server_selection_policy.select_allocate(task, servers, resource_allocation_policy)
+    else:
+        selection = server_index.select_allocate(task, resource_allocation_policy)
+
+    # If an optimal server is found then allocate the task
+    if selection:
+        allocated_server, (s, w, r) = selection
+        server_task_allocation(allocated_server, task, s, w, r)
+        if server_index is not None:
+            server_index.update(allocated_server)
+        return allocated_server
+    return None
+
+
 def allocate_tasks(tasks: List[Task], servers: List[Server], server_selection_policy: ServerSelectionPolicy,
                    resource_allocation_policy: ResourceAllocationPolicy, debug_allocation: bool = False):
     """
@@ -32,15 +64,12 @@ def allocate_tasks(tasks: List[Task], servers: List[Server], server_selection_po
     :param debug_allocation: The task allocation debug
     """
 
+    # If the server selection policy only depends on the server state then the servers are indexed by the policy value
+    server_index = server_selection_policy.server_index(servers)
+
     # Loop through all of the task in order of values
     for task in tasks:
-        # Allocate the server using the allocation policy function
-        allocated_server = server_selection_policy.select(task, servers)
-
-        # If an optimal server is found then calculate the bid allocation function
-        if allocated_server:
-            s, w, r = resource_allocation_policy.allocate(task, allocated_server)
-            server_task_allocation(allocated_server, task, s, w, r)
+        allocate_task(task, servers, server_selection_policy, resource_allocation_policy, server_index)
 
     if debug_allocation:
         print_task_allocation(tasks)
@@ -64,11 +93,10 @@ def greedy_algorithm(tasks: List[Task], servers: List[Server], task_priority: Ta
     """
     start_time = time()
 
-    # Sorted list of task and task priority
-    task_values = sorted((task for task in tasks), key=lambda task: task_priority.evaluate(task), reverse=True)
+    # Sorted list of task by the task priority
+    task_values = task_priority.rank(tasks)
     if debug_task_values:
-        print_task_values(sorted(((task, task_priority.evaluate(task)) for task in tasks),
-                                 key=lambda jv: jv[1], reverse=True))
+        print_task_values([(task, task_priority.evaluate(task)) for task in task_values])
 
     # Run the allocation of the task with the sorted task by value
     allocate_tasks(task_values, servers, server_selection_policy, resource_allocation_policy,
@@ -79,3 +107,49 @@ def greedy_algorithm(tasks: List[Task], servers: List[Server], task_priority: Ta
     return Result(algorithm_name, tasks, servers, time() - start_time,
                   **{'task priority': task_priority.name, 'server selection policy': server_selection_policy.name,
                      'resource allocation policy': resource_allocation_policy.name})
+
+
+def _run_grid_policies(policies: Tuple[TaskPriority, ServerSelectionPolicy, ResourceAllocationPolicy]) -> Result:
+    """
+    Runs the greedy algorithm with the policies on the worker process tasks and servers then resets the model
+
+    :param policies: Tuple of the task priority, server selection policy and resource allocation policy
+    :return: The greedy results
+    """
+    tasks, servers = shared_state()
+    result = greedy_algorithm(tasks, servers, *policies)
+    reset_model(tasks, servers)
+    return result
+
+
+def greedy_grid(tasks: List[Task], servers: List[Server], task_priorities: Sequence[TaskPriority],
+                server_selection_policies: Sequence[ServerSelectionPolicy],
+                resource_allocation_policies: Sequence[ResourceAllocationPolicy],
+                workers: Optional[int] = None) -> List[Result]:
+    """
+    Runs the greedy algorithm for every combination of the task priorities, server selection policies and resource
+        allocation policies over a pool of worker processes. The tasks and servers are sent to each worker once when
+        the worker is initialised with only the policies sent for each combination. The tasks and servers are not
+        allocated after the grid is run.
+
+    :param tasks: List of tasks
+    :param servers: List of servers
+    :param task_priorities: List of task priority functions
+    :param server_selection_policies: List of server selection policies
+    :param resource_allocation_policies: List of resource allocation policies
+    :param workers: The number of worker processes, defaults to the number of cpus, if 1 then the grid is run serially
+    :return: List of the greedy results in the order of the policy combinations
+    """
+    policy_combinations = list(product(task_priorities, server_selection_policies, resource_allocation_policies))
+    workers = min(workers or os.cpu_count() or 1, len(policy_combinations))
+
+    if workers <= 1:
+        results = []
+        for policies in policy_combinations:
+            results.append(greedy_algorithm(tasks, servers, *policies))
+            reset_model(tasks, servers)
+        return results
+    else:
+        with shared_process_pool((tasks, servers), workers) as executor:
+            return list(executor.map(_run_grid_policies, policy_combinations,
+                                     chunksize=max(1, len(policy_combinations) // (4 * workers))))
@@ -6,7 +6,11 @@ from abc import abstractmethod
 from math import exp
 from typing import TYPE_CHECKING
 
+from src.greedy.analytic_allocation import kkt_power_speeds
+
 if TYPE_CHECKING:
+    from typing import Tuple
+
     from src.core.task import Task
     from src.core.server import Server
 
@@ -19,6 +23,36 @@ class AllocationValuePolicy:
     def __init__(self, name: str):
         self.name: str = name
 
+    @property
+    def cache_key(self) -> str:
+        """
+        The key of the policy in the allocation cache
+
+        :return: The cache key
+        """
+        return type(self).__name__
+
+    def resource_weights(self, task: Task, server: Server) -> Tuple[float, float]:
+        """
+        The linear weights of the compute speed and bandwidth (loading and sending speed) in the evaluation, for the
+            policies that are not linear then the weights are of the usage percentage of the available resources
+
+        :param task: A task
+        :param server: A server
+        :return: The compute and bandwidth weights
+        """
+        return 1 / server.available_computation, 1 / server.available_bandwidth
+
+    def continuous_allocation(self, task: Task, server: Server) -> Tuple[float, float, float]:
+        """
+        The continuous resource speeds that minimise the weighted resource usage found using the KKT conditions
+
+        :param task: A task
+        :param server: A server
+        :return: The continuous loading, compute and sending speeds
+        """
+        return kkt_power_speeds(task, *self.resource_weights(task, server), 1)
+
     @abstractmethod
     def evaluate(self, task: Task, server: Server, loading_speed: int, compute_speed: int, sending_speed: int) -> float:
         """
@@ -42,6 +76,10 @@ class SumServerUsage(AllocationValuePolicy):
     def __init__(self):
         AllocationValuePolicy.__init__(self, 'Sum Usage')
 
+    def resource_weights(self, task: Task, server: Server) -> Tuple[float, float]:
+        """Resource weights"""
+        return 1, 1
+
     def evaluate(self, task: Task, server: Server, loading_speed: int, compute_speed: int, sending_speed: int) -> float:
         """Evaluates"""
         return task.value * \
@@ -74,6 +112,10 @@ class SumServerMaxPercentage(AllocationValuePolicy):
     def __init__(self):
         AllocationValuePolicy.__init__(self, 'Sum Percentage')
 
+    def resource_weights(self, task: Task, server: Server) -> Tuple[float, float]:
+        """Resource weights"""
+        return 1 / server.computation_capacity, 1 / server.bandwidth_capacity
+
     def evaluate(self, task: Task, server: Server, loading_speed: int, compute_speed: int, sending_speed: int) -> float:
         """Evaluates"""
         return task.value * \
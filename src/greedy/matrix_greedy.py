@@ -1,9 +1,16 @@
 """
 Greedy algorithm using a matrix of task and server resource allocation values
+
+The allocation values are kept in a max heap with each entry stamped with the version of its server, the server version
+    is incremented when a task is allocated to the server such that the stale entries of the server are discarded when
+    popped rather than removed from the heap. After an allocation, only the allocated server's column of the matrix is
+    re-scored for the unallocated tasks.
 """
 
 from __future__ import annotations
 
+import heapq
+from itertools import count
 from time import time
 from typing import TYPE_CHECKING
 
@@ -11,9 +18,11 @@ from docplex.cp.model import CpoModel
 
 from src.core.core import server_task_allocation, debug
 from src.extra.result import Result
+from src.greedy.allocation_cache import allocation_cache
+from src.greedy.analytic_allocation import analytic_allocation
 
 if TYPE_CHECKING:
-    from typing import List, Tuple
+    from typing import Dict, Iterable, Iterator, List, Tuple
 
     from src.core.server import Server
     from src.core.task import Task
@@ -22,7 +31,42 @@ if TYPE_CHECKING:
 
 def allocate_resources(task: Task, server: Server, value: AllocationValuePolicy) -> Tuple[float, int, int, int]:
     """
-    Calculates the value of a server task allocation with the resources allocated
+    Calculates the value of a server task allocation with the resources allocated, cached by the task and server
+        attributes of the value policies in the allocation cache
+
+    :param task: A task
+    :param server: A server
+    :param value: The value policy
+    :return: The tuple of values and resource allocations
+    """
+    return allocation_cache.get((value.cache_key, task.required_storage, task.required_computation,
+                                 task.required_results_data, task.deadline, task.value,
+                                 server.storage_capacity, server.computation_capacity, server.bandwidth_capacity,
+                                 server.available_storage, server.available_computation, server.available_bandwidth),
+                                lambda: solve_resources(task, server, value))
+
+
+def solve_resources(task: Task, server: Server, value: AllocationValuePolicy) -> Tuple[float, int, int, int]:
+    """
+    Calculates the value of a server task allocation with the resources allocated, using the analytic solver from
+        the continuous allocation of the policy otherwise the cplex solver
+
+    :param task: A task
+    :param server: A server
+    :param value: The value policy
+    :return: The tuple of values and resource allocations
+    """
+    speeds = analytic_allocation(task, server, lambda loading, compute, sending: -value.evaluate(
+        task, server, loading, compute, sending), value.continuous_allocation(task, server))
+    if speeds is not None:
+        return (value.evaluate(task, server, *speeds), *speeds)
+
+    return cp_allocate_resources(task, server, value)
+
+
+def cp_allocate_resources(task: Task, server: Server, value: AllocationValuePolicy) -> Tuple[float, int, int, int]:
+    """
+    Calculates the value of a server task allocation with the resources allocated using cplex
 
     :param task: A task
     :param server: A server
@@ -48,6 +92,21 @@ def allocate_resources(task: Task, server: Server, value: AllocationValuePolicy)
         model_solution.get_value(compute_speed), model_solution.get_value(sending_speed)
 
 
+def allocate_server_resources(tasks: Iterable[Task], server: Server,
+                              value: AllocationValuePolicy) -> Iterator[Tuple[Task, Tuple[float, int, int, int]]]:
+    """
+    Calculates the allocation values of a server's column of the matrix for the tasks that can run on the server
+
+    :param tasks: The tasks
+    :param server: The server
+    :param value: The value policy
+    :return: Iterator of the tasks and the tuple of values and resource allocations
+    """
+    for task in tasks:
+        if server.can_run(task):
+            yield task, allocate_resources(task, server, value)
+
+
 def greedy_matrix_algorithm(tasks: List[Task], servers: List[Server], allocation_value_policy: AllocationValuePolicy,
                             debug_allocation: bool = False, debug_pop: bool = False) -> Result:
     """
@@ -62,34 +121,37 @@ def greedy_matrix_algorithm(tasks: List[Task], servers: List[Server], allocation
     """
     start_time = time()
 
+    # The max heap of the allocation values with the server version of the value, the counter breaks ties in the order
+    #   that the values are pushed such that the tasks and servers are never compared
+    allocation_heap: List[Tuple[float, int, int, Task, Server, int, int, int]] = []
+    server_versions: Dict[Server, int] = {server: 0 for server in servers}
+    counter = count()
+
+    def push_server_column(column_tasks: Iterable[Task], server: Server):
+        """Pushes the allocation values of the tasks on the server with the current server version"""
+        for task, (v, s, w, r) in allocate_server_resources(column_tasks, server, allocation_value_policy):
+            heapq.heappush(allocation_heap, (-v, next(counter), server_versions[server], task, server, s, w, r))
+
     # Generate the full allocation value matrix
-    allocation_value_matrix = {(task, server): allocate_resources(task, server, allocation_value_policy)
-                               for task in tasks for server in servers if server.can_run(task)}
-    unallocated_tasks = tasks.copy()
-
-    # Loop over the allocation matrix till there are no values left
-    while len(allocation_value_matrix):
-        (allocated_task, allocated_server), (v, s, w, r) = max(allocation_value_matrix.items(), key=lambda x: x[1][0])
-        server_task_allocation(allocated_task, s, w, r, allocated_server)
-        debug(f'Job {allocated_task.name} on Server {allocated_server.name} with value {v:.3f}, '
+    for server in servers:
+        push_server_column(tasks, server)
+    unallocated_tasks = set(tasks)
+
+    # Loop over the allocation heap till there are no values left
+    while allocation_heap:
+        neg_v, _, version, allocated_task, allocated_server, s, w, r = heapq.heappop(allocation_heap)
+        # Discard the values of allocated tasks or of servers that have changed since the value was calculated
+        if allocated_task not in unallocated_tasks or version != server_versions[allocated_server]:
+            debug(f'Pop task {allocated_task.name} and server {allocated_server.name}', debug_pop)
+            continue
+
+        server_task_allocation(allocated_server, allocated_task, s, w, r)
+        debug(f'Job {allocated_task.name} on Server {allocated_server.name} with value {-neg_v:.3f}, '
               f'loading {s} compute {w} sending {r}', debug_allocation)
 
-        # Remove the task from the allocation matrix
-        for server in servers:
-            if (allocated_task, server) in allocation_value_matrix:
-                debug(f'Pop task {allocated_task.name} and server {server.name}', debug_pop)
-                allocation_value_matrix.pop((allocated_task, server))
-
-        # Remove the task from the unallocated tasks and check if the allocated server can now not run any of the tasks
+        # Remove the task from the unallocated tasks and re-score the allocated server's column
         unallocated_tasks.remove(allocated_task)
-        for task in unallocated_tasks:
-            # Update the allocation when the server is updated
-            if allocated_server.can_run(task):
-                allocation_value_matrix[(task, allocated_server)] = allocate_resources(task, allocated_server,
-                                                                                       allocation_value_policy)
-            # If task cant be run then remove the task
-            elif (task, allocated_server) in allocation_value_matrix:
-                debug(f'Pop task {task.name} and server {allocated_server.name}', debug_pop)
-                allocation_value_matrix.pop((task, allocated_server))
+        server_versions[allocated_server] += 1
+        push_server_column((task for task in tasks if task in unallocated_tasks), allocated_server)
 
     return Result(f'Matrix Greedy {allocation_value_policy.name}', tasks, servers, solve_time=time() - start_time)
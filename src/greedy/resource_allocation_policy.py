@@ -8,6 +8,9 @@ from typing import TYPE_CHECKING, Optional
 
 from docplex.cp.model import CpoModel, SOLVE_STATUS_FEASIBLE, SOLVE_STATUS_OPTIMAL
 
+from src.greedy.allocation_cache import allocation_cache
+from src.greedy.analytic_allocation import analytic_allocation, kkt_linear_speeds, kkt_power_speeds, max_speeds
+
 if TYPE_CHECKING:
     from typing import Tuple
 
@@ -21,9 +24,50 @@ class ResourceAllocationPolicy(ABC):
     def __init__(self, name):
         self.name = name
 
+    @property
+    def cache_key(self) -> str:
+        """
+        The key of the policy in the allocation cache, policies with parameters must include the parameters
+
+        :return: The cache key
+        """
+        return type(self).__name__
+
     def allocate(self, task: Task, server: Server) -> Tuple[int, int, int]:
         """
-        Determines the resource speed for the task on the server but finding the smallest
+        Determines the resource speed for the task on the server, cached by the task requirements and server available
+            resources in the allocation cache
+
+        :param task: The task
+        :param server: The server
+        :return: A tuple of resource speeds
+        """
+        return allocation_cache.get((self.cache_key, task.required_storage, task.required_computation,
+                                     task.required_results_data, task.deadline,
+                                     server.available_computation, server.available_bandwidth),
+                                    lambda: self.solve_allocation(task, server))
+
+    def solve_allocation(self, task: Task, server: Server) -> Tuple[int, int, int]:
+        """
+        Determines the resource speed for the task on the server but finding the smallest, using the analytic solver
+            if the policy has a continuous solution otherwise the cplex solver
+
+        :param task: The task
+        :param server: The server
+        :return: A tuple of resource speeds
+        """
+        continuous_speeds = self.continuous_allocation(task, server)
+        if continuous_speeds is not None:
+            speeds = analytic_allocation(task, server, lambda loading, compute, sending: self.resource_evaluator(
+                task, server, loading, compute, sending), continuous_speeds)
+            if speeds is not None:
+                return speeds
+
+        return self.cp_allocate(task, server)
+
+    def cp_allocate(self, task: Task, server: Server) -> Tuple[int, int, int]:
+        """
+        Determines the resource speed for the task on the server using cplex to find the smallest
 
         :param task: The task
         :param server: The server
@@ -40,7 +84,6 @@ class ResourceAllocationPolicy(ABC):
                     if task.required_storage * w * r + s * task.required_computation * r +
                     s * w * task.required_results_data <= task.deadline * s * w * r),
                    key=lambda bid: self.resource_evaluator(task, server, bid[0], bid[1], bid[2]))"""
-        # TODO possible to use KKT
         model = CpoModel('resource allocation')
 
         loading = model.integer_var(min=1, max=server.available_bandwidth - 1)
@@ -62,6 +105,16 @@ class ResourceAllocationPolicy(ABC):
                   f'for {str(task)} and {str(server)}')
         return model_solution.get_value(loading), model_solution.get_value(compute), model_solution.get_value(sending)
 
+    def continuous_allocation(self, task: Task, server: Server) -> Optional[Tuple[float, float, float]]:
+        """
+        The continuous resource speeds that minimise the resource evaluator found using the KKT conditions
+
+        :param task: A task
+        :param server: A server
+        :return: The continuous loading, compute and sending speeds or None if no closed form solution exists
+        """
+        return None
+
     @abstractmethod
     def resource_evaluator(self, task: Task, server: Server,
                            loading_speed: int, compute_speed: int, sending_speed: int) -> float:
@@ -90,6 +143,10 @@ class SumPercentage(ResourceAllocationPolicy):
         return compute_speed / server.available_computation + \
             (loading_speed + sending_speed) / server.available_bandwidth
 
+    def continuous_allocation(self, task: Task, server: Server) -> Optional[Tuple[float, float, float]]:
+        """Continuous allocation"""
+        return kkt_power_speeds(task, 1 / server.available_computation, 1 / server.available_bandwidth, 1)
+
 
 class SumPowPercentage(ResourceAllocationPolicy):
     """The sum of exponential percentages"""
@@ -103,6 +160,10 @@ class SumPowPercentage(ResourceAllocationPolicy):
         return (compute_speed / server.available_computation) ** 3 + \
                ((loading_speed + sending_speed) / server.available_bandwidth) ** 3
 
+    def continuous_allocation(self, task: Task, server: Server) -> Optional[Tuple[float, float, float]]:
+        """Continuous allocation"""
+        return kkt_power_speeds(task, 1 / server.available_computation ** 3, 1 / server.available_bandwidth ** 3, 3)
+
 
 class SumSpeed(ResourceAllocationPolicy):
     """The sum of resource speeds"""
@@ -115,6 +176,10 @@ class SumSpeed(ResourceAllocationPolicy):
         """Resource evaluator"""
         return loading_speed + compute_speed + sending_speed
 
+    def continuous_allocation(self, task: Task, server: Server) -> Optional[Tuple[float, float, float]]:
+        """Continuous allocation"""
+        return kkt_linear_speeds(task, 1, 1, 1)
+
 
 class DeadlinePercent(ResourceAllocationPolicy):
     """Ratio of speeds divided by deadline"""
@@ -129,6 +194,10 @@ class DeadlinePercent(ResourceAllocationPolicy):
                 task.required_computation / compute_speed +
                 task.required_results_data / sending_speed) / task.deadline
 
+    def continuous_allocation(self, task: Task, server: Server) -> Optional[Tuple[float, float, float]]:
+        """Continuous allocation, as the evaluator decreases with the speeds then the maximum speeds are used"""
+        return max_speeds(task, server)
+
 
 class EvolutionStrategy(ResourceAllocationPolicy):
     """Covariance matrix adaption evolution strategy"""
@@ -141,11 +210,23 @@ class EvolutionStrategy(ResourceAllocationPolicy):
         self.compute_var = compute_var if compute_var else gauss(0, 1)
         self.sending_var = sending_var if sending_var else gauss(0, 1)
 
+    @property
+    def cache_key(self) -> str:
+        """Cache key"""
+        return f'{type(self).__name__} {self.loading_var} {self.compute_var} {self.sending_var}'
+
     def resource_evaluator(self, task: Task, server: Server, loading_speed: int, compute_speed: int,
                            sending_speed: int) -> float:
         """Resource evaluator"""
         return self.loading_var * loading_speed + self.compute_var * compute_speed + self.sending_var * sending_speed
 
+    def continuous_allocation(self, task: Task, server: Server) -> Optional[Tuple[float, float, float]]:
+        """Continuous allocation, if any of the variables are not positive then the maximum speeds are used"""
+        if 0 < self.loading_var and 0 < self.compute_var and 0 < self.sending_var:
+            return kkt_linear_speeds(task, self.loading_var, self.compute_var, self.sending_var)
+        else:
+            return max_speeds(task, server)
+
 
 policies = (
     SumPercentage(),
@@ -3,13 +3,14 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from bisect import bisect_left, insort
 from random import choice, gauss
 from typing import TYPE_CHECKING
 
 from src.greedy.resource_allocation_policy import policies as resource_allocation_policies
 
 if TYPE_CHECKING:
-    from typing import List, Optional
+    from typing import List, Optional, Dict, Tuple
 
     from src.core.server import Server
     from src.core.task import Task
@@ -19,6 +20,9 @@ if TYPE_CHECKING:
 class ServerSelectionPolicy(ABC):
     """Server Selection Policy"""
 
+    # If the value only depends on the server's state (not the task) such that a server index can be used
+    state_only: bool = False
+
     def __init__(self, name: str, maximise: bool = False, long_name: bool = False):
         if long_name:
             self.name = f"{'maximise' if maximise else 'minimise'} {name}"
@@ -41,6 +45,31 @@ class ServerSelectionPolicy(ABC):
             return min((server for server in servers if server.can_run(task)),
                        key=lambda server: self.value(task, server), default=None)
 
+    def select_allocate(self, task: Task, servers: List[Server], resource_allocation_policy: ResourceAllocationPolicy
+                        ) -> Optional[Tuple[Server, Tuple[int, int, int]]]:
+        """
+        Select the server for the task and allocates the task's resource speeds on the server, policies that allocate
+            the task to value the servers can reuse the allocation of the selected server
+
+        :param task: The task
+        :param servers: The list of servers
+        :param resource_allocation_policy: The resource allocation policy
+        :return: The selected server with the loading, compute and sending speeds or None if no server is selected
+        """
+        server = self.select(task, servers)
+        if server is None:
+            return None
+        return server, resource_allocation_policy.allocate(task, server)
+
+    def server_index(self, servers: List[Server]) -> Optional[ServerIndex]:
+        """
+        Creates a server index for selecting servers if the policy value only depends on the server's state
+
+        :param servers: The list of servers
+        :return: The server index or None if the policy value depends on the task
+        """
+        return ServerIndex(self, servers) if self.state_only else None
+
     @abstractmethod
     def value(self, task: Task, server: Server) -> float:
         """
@@ -53,9 +82,78 @@ class ServerSelectionPolicy(ABC):
         pass
 
 
+class ServerIndex:
+    """
+    Index of the servers sorted by a state only server selection policy value (with ties broken by the server's list
+        position like the policy select) such that the selected server is the first server in the index that can run
+        the task. The index must be updated for a server after its available resources are changed.
+    """
+
+    def __init__(self, policy: ServerSelectionPolicy, servers: List[Server]):
+        assert policy.state_only, f'{policy.name} server selection policy is not state only'
+        self.policy = policy
+        self.servers = list(servers)
+
+        self.keys: Dict[Server, Tuple[float, int]] = {server: self.key(server, pos)
+                                                      for pos, server in enumerate(self.servers)}
+        self.index: List[Tuple[float, int]] = sorted(self.keys.values())
+
+    def key(self, server: Server, pos: int) -> Tuple[float, int]:
+        """
+        The sort key of the server
+
+        :param server: The server
+        :param pos: The server's position in the server list
+        :return: Tuple of the server value (negative if maximising) and position
+        """
+        value = self.policy.value(None, server)
+        return -value if self.policy.maximise else value, pos
+
+    def select(self, task: Task) -> Optional[Server]:
+        """
+        Select the first server in the index that can run the task
+
+        :param task: The task
+        :return: The selected server
+        """
+        for _, pos in self.index:
+            server = self.servers[pos]
+            if server.can_run(task):
+                return server
+        return None
+
+    def select_allocate(self, task: Task, resource_allocation_policy: ResourceAllocationPolicy
+                        ) -> Optional[Tuple[Server, Tuple[int, int, int]]]:
+        """
+        Select the first server in the index that can run the task and allocates the task's resource speeds
+
+        :param task: The task
+        :param resource_allocation_policy: The resource allocation policy
+        :return: The selected server with the loading, compute and sending speeds or None if no server is selected
+        """
+        server = self.select(task)
+        if server is None:
+            return None
+        return server, resource_allocation_policy.allocate(task, server)
+
+    def update(self, server: Server):
+        """
+        Updates the server's position in the index
+
+        :param server: The server with changed available resources
+        """
+        old_key = self.keys[server]
+        del self.index[bisect_left(self.index, old_key)]
+
+        new_key = self.keys[server] = self.key(server, old_key[1])
+        insort(self.index, new_key)
+
+
 class SumResources(ServerSelectionPolicy):
     """The sum of a server's available resources"""
 
+    state_only = True
+
     def __init__(self, maximise: bool = False):
         ServerSelectionPolicy.__init__(self, 'Sum', maximise)
 
@@ -67,6 +165,8 @@ class SumResources(ServerSelectionPolicy):
 class ProductResources(ServerSelectionPolicy):
     """The product of a server's available resources"""
 
+    state_only = True
+
     def __init__(self, maximise: bool = False):
         ServerSelectionPolicy.__init__(self, 'Product', maximise)
 
@@ -78,6 +178,8 @@ class ProductResources(ServerSelectionPolicy):
 class SumExpResource(ServerSelectionPolicy):
     """The sum of a server's available resources"""
 
+    state_only = True
+
     def __init__(self, maximise: bool = False):
         ServerSelectionPolicy.__init__(self, 'Exponential Sum', maximise)
 
@@ -115,15 +217,81 @@ class TaskSumResources(ServerSelectionPolicy):
 
     def value(self, task: Task, server: Server) -> float:
         """Value function"""
-        loading, compute, sending = self.resource_allocation_policy.allocate(task, server)
+        return self.allocation_value(task, server, self.resource_allocation_policy.allocate(task, server))
+
+    @staticmethod
+    def allocation_value(task: Task, server: Server, speeds: Tuple[int, int, int]) -> float:
+        """
+        The value of the task's allocation on the server
+
+        :param task: The task
+        :param server: The server
+        :param speeds: The loading, compute and sending speeds of the task
+        :return: The sum of the resource usage percentages
+        """
+        loading, compute, sending = speeds
         return task.required_storage / server.available_storage + \
             compute / server.available_computation + \
             (loading + sending) / server.available_bandwidth
 
+    def value_bound(self, task: Task, server: Server) -> float:
+        """
+        The bound of the value of any allocation of the task on the server, the lower bound if minimising uses the
+            minimum footprint of the task from the server's compatibility matrix and the upper bound if maximising
+            uses all of the server's available computation and bandwidth
+
+        :param task: The task
+        :param server: The server
+        :return: The value bound
+        """
+        if self.maximise:
+            return task.required_storage / server.available_storage + 1.0 + 1.0
+
+        footprint = None if server.compatibility is None else server.compatibility.footprint(task, server)
+        min_computation, min_bandwidth = (1, 2) if footprint is None else footprint
+        return task.required_storage / server.available_storage + \
+            min_computation / server.available_computation + \
+            min_bandwidth / server.available_bandwidth
+
+    def select_allocate(self, task: Task, servers: List[Server], resource_allocation_policy: ResourceAllocationPolicy
+                        ) -> Optional[Tuple[Server, Tuple[int, int, int]]]:
+        """
+        Select the server and allocates the task reusing the allocation used to value the selected server.
+            The servers are valued in order of their value bound such that once a server's bound can't beat the best
+            server then the remaining servers are pruned, ties are broken by the server's list position like select.
+
+        :param task: The task
+        :param servers: The list of servers
+        :param resource_allocation_policy: The resource allocation policy
+        :return: The selected server with the loading, compute and sending speeds or None if no server is selected
+        """
+        sign = -1 if self.maximise else 1
+        bounded_servers = sorted((sign * self.value_bound(task, server), pos, server)
+                                 for pos, server in enumerate(servers) if server.can_run(task))
+
+        best_key: Optional[Tuple[float, int]] = None
+        best_server: Optional[Tuple[Server, Tuple[int, int, int]]] = None
+        for bound, pos, server in bounded_servers:
+            if best_key is not None and best_key < (bound, pos):
+                break
+
+            speeds = self.resource_allocation_policy.allocate(task, server)
+            key = sign * self.allocation_value(task, server, speeds), pos
+            if best_key is None or key < best_key:
+                best_key, best_server = key, (server, speeds)
+
+        # The allocation can only be reused if the resource allocation policies are the same
+        if best_server is None or resource_allocation_policy.cache_key == self.resource_allocation_policy.cache_key:
+            return best_server
+        server, _ = best_server
+        return server, resource_allocation_policy.allocate(task, server)
+
 
 class EvolutionStrategy(ServerSelectionPolicy):
     """Covariance matrix adaption evolution strategy"""
 
+    state_only = True
+
     def __init__(self, name: int, avail_storage_var: Optional[float] = None, avail_comp_var: Optional[float] = None,
                  avail_bandwidth_var: Optional[float] = None, maximise: bool = True):
         ServerSelectionPolicy.__init__(self, f'CMS-ES {name}', maximise)
@@ -1,4 +1,9 @@
-"""task prioritisation functions"""
+"""
+task prioritisation functions
+
+Along with evaluating a single task, the task priorities evaluate the arrays of task requirements, deadlines and values
+    of a list of tasks (evaluate_batch) such that ranking the tasks is a single argsort.
+"""
 
 from __future__ import annotations
 
@@ -7,12 +12,30 @@ from math import exp, sqrt
 from random import random, gauss
 from typing import TYPE_CHECKING, Optional
 
+import numpy as np
+
 if TYPE_CHECKING:
-    from typing import List
+    from typing import List, Sequence
 
     from src.core.task import Task
 
 
+class TaskArrays:
+    """
+    The requirement, deadline and value arrays of a list of tasks, built from the current task attributes
+    """
+
+    def __init__(self, tasks: Sequence[Task]):
+        self.tasks: Sequence[Task] = tasks
+        self.required_storage, self.required_computation, self.required_results_data, self.deadline, self.value = \
+            (np.fromiter((getattr(task, attribute) for task in tasks), np.float64, len(tasks))
+             for attribute in ('required_storage', 'required_computation', 'required_results_data',
+                               'deadline', 'value'))
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+
 class TaskPriority(ABC):
     """task prioritisation function class that is inherited with each option"""
 
@@ -29,6 +52,45 @@ class TaskPriority(ABC):
         """Inverse of the task prioritisation function for the task value"""
         pass
 
+    def evaluate_batch(self, arrays: TaskArrays) -> np.ndarray:
+        """
+        Task prioritisation function of the task arrays, by default each task is evaluated individually
+
+        :param arrays: The task arrays
+        :return: Array of the task priorities
+        """
+        return np.fromiter((self.evaluate(task) for task in arrays.tasks), np.float64, len(arrays))
+
+    def inverse_batch(self, arrays: TaskArrays, densities: np.ndarray) -> np.ndarray:
+        """
+        Inverse of the task prioritisation function of the task arrays, by default each task is inverted individually
+
+        :param arrays: The task arrays
+        :param densities: Array of the densities
+        :return: Array of the task values
+        """
+        return np.fromiter((self.inverse(task, density) for task, density in zip(arrays.tasks, densities.tolist())),
+                           np.float64, len(arrays))
+
+    def rank(self, tasks: Sequence[Task]) -> List[Task]:
+        """
+        Ranks the tasks by priority in descending order, tasks with equal priority keep their order
+
+        :param tasks: The tasks
+        :return: List of the ranked tasks
+        """
+        return list(map(tasks.__getitem__, self.rank_indexes(self.evaluate_batch(TaskArrays(tasks))).tolist()))
+
+    @staticmethod
+    def rank_indexes(priorities: np.ndarray) -> np.ndarray:
+        """
+        The indexes of the priorities in descending order, equal priorities keep their order
+
+        :param priorities: Array of the priorities
+        :return: Array of the ranked indexes
+        """
+        return np.argsort(-priorities, kind='stable')
+
 
 class ResourceSum(TaskPriority):
     """The sum of a task's required resources"""
@@ -44,6 +106,14 @@ class ResourceSum(TaskPriority):
         """Inverse evaluation function"""
         raise Exception('Not supported function of inverse')
 
+    def evaluate_batch(self, arrays: TaskArrays) -> np.ndarray:
+        """Batch task prioritisation function"""
+        return arrays.required_storage + arrays.required_computation + arrays.required_results_data
+
+    def inverse_batch(self, arrays: TaskArrays, densities: np.ndarray) -> np.ndarray:
+        """Batch inverse evaluation function"""
+        raise Exception('Not supported function of inverse')
+
 
 class ResourceProduct(TaskPriority):
     """The product of a task's required resources"""
@@ -59,6 +129,14 @@ class ResourceProduct(TaskPriority):
         """Inverse evaluation function"""
         raise Exception('Not supported function of inverse')
 
+    def evaluate_batch(self, arrays: TaskArrays) -> np.ndarray:
+        """Batch task prioritisation function"""
+        return arrays.required_storage * arrays.required_computation * arrays.required_results_data
+
+    def inverse_batch(self, arrays: TaskArrays, densities: np.ndarray) -> np.ndarray:
+        """Batch inverse evaluation function"""
+        raise Exception('Not supported function of inverse')
+
 
 class ResourceExpSum(TaskPriority):
     """The sum of exponential of a task's required resources"""
@@ -74,6 +152,20 @@ class ResourceExpSum(TaskPriority):
         """Inverse evaluation function"""
         raise Exception('Not supported function of inverse')
 
+    def evaluate_batch(self, arrays: TaskArrays) -> np.ndarray:
+        """Batch task prioritisation function"""
+        with np.errstate(over='ignore'):
+            priorities = np.exp(arrays.required_storage) + np.exp(arrays.required_computation) + \
+                np.exp(arrays.required_results_data)
+        # Raise an overflow error, the same as the task prioritisation function, rather than ranking with infinities
+        if not np.isfinite(priorities).all():
+            raise OverflowError('math range error')
+        return priorities
+
+    def inverse_batch(self, arrays: TaskArrays, densities: np.ndarray) -> np.ndarray:
+        """Batch inverse evaluation function"""
+        raise Exception('Not supported function of inverse')
+
 
 class ResourceSqrt(TaskPriority):
     """The sum of square root of a task's required resources"""
@@ -90,6 +182,14 @@ class ResourceSqrt(TaskPriority):
         """Inverse evaluation function"""
         raise Exception('Not supported function of inverse')
 
+    def evaluate_batch(self, arrays: TaskArrays) -> np.ndarray:
+        """Batch task prioritisation"""
+        return np.sqrt(self.resource_func.evaluate_batch(arrays))
+
+    def inverse_batch(self, arrays: TaskArrays, densities: np.ndarray) -> np.ndarray:
+        """Batch inverse evaluation function"""
+        raise Exception('Not supported function of inverse')
+
 
 class UtilityPerResources(TaskPriority):
     """The utility divided by required resources"""
@@ -106,6 +206,14 @@ class UtilityPerResources(TaskPriority):
         """Inverse evaluation function"""
         return density * self.resource_func.evaluate(task)
 
+    def evaluate_batch(self, arrays: TaskArrays) -> np.ndarray:
+        """Batch task prioritisation function"""
+        return arrays.value / self.resource_func.evaluate_batch(arrays)
+
+    def inverse_batch(self, arrays: TaskArrays, densities: np.ndarray) -> np.ndarray:
+        """Batch inverse evaluation function"""
+        return densities * self.resource_func.evaluate_batch(arrays)
+
 
 class DeadlinePerResources(TaskPriority):
     """The deadline divided by required resources"""
@@ -122,6 +230,14 @@ class DeadlinePerResources(TaskPriority):
         """Inverse evaluation function"""
         raise Exception('Not supported function of inverse')
 
+    def evaluate_batch(self, arrays: TaskArrays) -> np.ndarray:
+        """Batch task prioritisation function"""
+        return arrays.deadline / self.resource_func.evaluate_batch(arrays)
+
+    def inverse_batch(self, arrays: TaskArrays, densities: np.ndarray) -> np.ndarray:
+        """Batch inverse evaluation function"""
+        raise Exception('Not supported function of inverse')
+
 
 class UtilityDeadlinePerResource(TaskPriority):
     """The product of utility and deadline divided by required resources"""
@@ -138,6 +254,14 @@ class UtilityDeadlinePerResource(TaskPriority):
         """Inverse evaluation function"""
         return density * self.resource_func.evaluate(task) / task.deadline
 
+    def evaluate_batch(self, arrays: TaskArrays) -> np.ndarray:
+        """Batch task prioritisation function"""
+        return arrays.value * arrays.deadline / self.resource_func.evaluate_batch(arrays)
+
+    def inverse_batch(self, arrays: TaskArrays, densities: np.ndarray) -> np.ndarray:
+        """Batch inverse evaluation function"""
+        return densities * self.resource_func.evaluate_batch(arrays) / arrays.deadline
+
 
 class UtilityResourcePerDeadline(TaskPriority):
     """The product of utility and deadline divided by required resources"""
@@ -154,6 +278,14 @@ class UtilityResourcePerDeadline(TaskPriority):
         """Inverse evaluation function"""
         return density * task.deadline / self.resource_func.evaluate(task)
 
+    def evaluate_batch(self, arrays: TaskArrays) -> np.ndarray:
+        """Batch task prioritisation function"""
+        return arrays.value * self.resource_func.evaluate_batch(arrays) / arrays.deadline
+
+    def inverse_batch(self, arrays: TaskArrays, densities: np.ndarray) -> np.ndarray:
+        """Batch inverse evaluation function"""
+        return densities * arrays.deadline / self.resource_func.evaluate_batch(arrays)
+
 
 class Random(TaskPriority):
     """Random number generator"""
@@ -169,6 +301,15 @@ class Random(TaskPriority):
         """Inverse evaluation function"""
         raise Exception('Not supported function of inverse')
 
+    def evaluate_batch(self, arrays: TaskArrays) -> np.ndarray:
+        """Batch task prioritisation function"""
+        # The random module such that seeding the random module makes the priorities reproducible
+        return np.fromiter((random() for _ in range(len(arrays))), np.float64, len(arrays))
+
+    def inverse_batch(self, arrays: TaskArrays, densities: np.ndarray) -> np.ndarray:
+        """Batch inverse evaluation function"""
+        raise Exception('Not supported function of inverse')
+
 
 class Storage(TaskPriority):
     """Sorted by Storage resource requirement"""
@@ -184,6 +325,14 @@ class Storage(TaskPriority):
         """Inverse evaluation function"""
         return density * task.required_storage
 
+    def evaluate_batch(self, arrays: TaskArrays) -> np.ndarray:
+        """Batch task prioritisation function"""
+        return arrays.value / arrays.required_storage
+
+    def inverse_batch(self, arrays: TaskArrays, densities: np.ndarray) -> np.ndarray:
+        """Batch inverse evaluation function"""
+        return densities * arrays.required_storage
+
 
 class Value(TaskPriority):
     """Ordered by the value of the tasks alone"""
@@ -199,6 +348,14 @@ class Value(TaskPriority):
         """Inverse evaluation function"""
         return density
 
+    def evaluate_batch(self, arrays: TaskArrays) -> np.ndarray:
+        """Batch task prioritisation function"""
+        return arrays.value
+
+    def inverse_batch(self, arrays: TaskArrays, densities: np.ndarray) -> np.ndarray:
+        """Batch inverse evaluation function"""
+        return densities
+
 
 class EvolutionStrategy(TaskPriority):
     """Covariance matrix adaption evolution strategy"""
@@ -223,7 +380,21 @@ class EvolutionStrategy(TaskPriority):
 
     def inverse(self, task: Task, density: float) -> float:
         """Inverse evaluation function"""
-        raise NotImplemented('Evolution Strategy for task priority is not implemented yet')
+        return (density * (self.storage_var * task.required_storage + self.comp_var * task.required_computation +
+                           self.results_var * task.required_results_data) -
+                self.deadline_var * task.deadline) / self.value_var
+
+    def evaluate_batch(self, arrays: TaskArrays) -> np.ndarray:
+        """Batch task prioritisation function"""
+        return (self.value_var * arrays.value + self.deadline_var * arrays.deadline) / \
+               (self.storage_var * arrays.required_storage + self.comp_var * arrays.required_computation +
+                self.results_var * arrays.required_results_data)
+
+    def inverse_batch(self, arrays: TaskArrays, densities: np.ndarray) -> np.ndarray:
+        """Batch inverse evaluation function"""
+        return (densities * (self.storage_var * arrays.required_storage + self.comp_var * arrays.required_computation +
+                             self.results_var * arrays.required_results_data) -
+                self.deadline_var * arrays.deadline) / self.value_var
 
 
 # Functions you actually want to use
@@ -0,0 +1,337 @@
+"""
+Exact fixed optimal algorithm as a branch and bound of the multi-dimensional multiple knapsack problem
+
+As the fixed tasks have fixed speeds, each task is an item with a value and a storage, computation and bandwidth size
+    and each server is a knapsack with the available resources as the capacities. The items are branched in order of
+    their value density with each item allocated to each server (servers with the same remaining capacities are only
+    branched once) before not being allocated. Nodes are bounded by the 0-1 knapsack of the remaining items over the
+    total usable capacity of each resource and the largest values of the number of remaining items that could fit on
+    the servers, with items not allocated if an unallocated item dominates them.
+
+The bound tables of the items from each position (the suffix tables) are built once such that the VCG auction can
+    solve the optimal allocation without each allocated task (the clarke pivot) reusing the tables after the task's
+    position, with the search started from the optimal allocation without the task, a feasible allocation so only
+    better allocations need to be searched.
+"""
+
+from __future__ import annotations
+
+import os
+from bisect import bisect_right
+from itertools import accumulate
+from time import time
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from src.core.core import server_task_allocation
+from src.core.process_pool import shared_process_pool, shared_state
+from src.extra.result import Result
+
+if TYPE_CHECKING:
+    from typing import List, Dict, Tuple, Optional
+
+    from src.core.server import Server
+    from src.core.fixed_task import FixedTask
+
+
+class _TimeLimitReached(Exception):
+    """The branch and bound time limit is reached"""
+    pass
+
+
+class _SuffixBound:
+    """The bound structures of the items from a position"""
+
+    __slots__ = ('value_sums', 'size_sums', 'knapsack_tables', 'subset_sums')
+
+    def __init__(self, values: List[float], sizes: List[Tuple[int, int, int]], total_capacities: List[int],
+                 next_bound: Optional[_SuffixBound] = None, item: Optional[int] = None):
+        """
+        Constructor
+
+        :param values: The values of the items
+        :param sizes: The sizes of the items
+        :param total_capacities: The total capacity of each resource
+        :param next_bound: The bound of the items from the next position that the knapsack tables are extended from
+        :param item: The position of the item added to the next bound items, if any
+        """
+        # The prefix sums of the values in decreasing order and the sizes of each resource in increasing order
+        self.value_sums: List[float] = [0.0] + list(accumulate(sorted(values, reverse=True)))
+        self.size_sums: List[List[int]] = [list(accumulate(sorted(size[dim] for size in sizes))) for dim in range(3)]
+
+        # The 0-1 knapsack table of the maximum value for each total capacity of each resource with the subset sums of
+        #   the item sizes of each resource (as a bitset)
+        if next_bound is None:
+            self.knapsack_tables = [np.zeros(capacity + 1) for capacity in total_capacities]
+            self.subset_sums = [1, 1, 1]
+        else:
+            self.knapsack_tables = [table.copy() for table in next_bound.knapsack_tables]
+            self.subset_sums = list(next_bound.subset_sums)
+            if item is not None:
+                value, size = values[0], sizes[0]
+                for dim, (table, next_table) in enumerate(zip(self.knapsack_tables, next_bound.knapsack_tables)):
+                    if size[dim] <= total_capacities[dim]:
+                        np.maximum(table[size[dim]:], next_table[:len(table) - size[dim]] + value,
+                                   out=table[size[dim]:])
+                        self.subset_sums[dim] |= (self.subset_sums[dim] << size[dim]) & \
+                            ((2 << total_capacities[dim]) - 1)
+
+
+class FixedKnapsack:
+    """
+    Branch and bound solver of the fixed task allocation with the solver structure shared between solves that exclude
+        a task
+    """
+
+    # The number of nodes searched between checking the time limit
+    time_check_nodes: int = 4096
+
+    def __init__(self, tasks: List[FixedTask], servers: List[Server], time_limit: Optional[float] = None):
+        """
+        Constructor
+
+        :param tasks: List of fixed tasks
+        :param servers: List of servers
+        :param time_limit: The time limit of each solve, if None then the solves are exact
+        """
+        assert time_limit is None or 0 < time_limit, f'Time limit: {time_limit}'
+        self.tasks = tasks
+        self.servers = servers
+        self.time_limit = time_limit
+
+        self.capacities: List[Tuple[int, int, int]] = [
+            (server.available_storage, server.available_computation, server.available_bandwidth) for server in servers
+        ]
+        total_capacities = [max(sum(capacity[dim] for capacity in self.capacities), 1) for dim in range(3)]
+
+        # The items that fit on at least one server ordered by the value over the normalised sum of sizes
+        sizes = [(task.required_storage, task.compute_speed, task.loading_speed + task.sending_speed) for task in tasks]
+        items = [pos for pos, size in enumerate(sizes)
+                 if any(all(size[dim] <= capacity[dim] for dim in range(3)) for capacity in self.capacities)]
+        items.sort(key=lambda pos: -tasks[pos].value / sum(sizes[pos][dim] / total_capacities[dim]
+                                                         for dim in range(3)))
+        self.items: List[int] = items
+        self.values: List[float] = [tasks[pos].value for pos in items]
+        self.sizes: List[Tuple[int, int, int]] = [sizes[pos] for pos in items]
+
+        # The items that each item dominates, later items with no smaller sizes and no larger value, such that if the
+        #   item is not allocated then the dominated items don't need to be allocated as the item could be swapped in
+        self.dominated: List[List[int]] = [
+            [other for other in range(item + 1, len(items))
+             if self.values[other] <= self.values[item] and
+             all(self.sizes[item][dim] <= self.sizes[other][dim] for dim in range(3))]
+            for item in range(len(items))
+        ]
+
+        # The bounds of the items from each position
+        self.suffix_bounds: List[_SuffixBound] = self.build_suffix_bounds()
+
+        self.optimal: bool = True
+        self.nodes: int = 0
+
+    def build_suffix_bounds(self, excluded: Optional[int] = None,
+                            suffix_bounds: Optional[List[_SuffixBound]] = None) -> List[_SuffixBound]:
+        """
+        Builds the bounds of the items from each position without the excluded item
+
+        :param excluded: The excluded item position
+        :param suffix_bounds: The bounds without an excluded item such that the bounds after the excluded item are
+            reused
+        :return: List of the bounds of the items from each position
+        """
+        total_capacities = [sum(capacity[dim] for capacity in self.capacities) for dim in range(3)]
+        if suffix_bounds is None:
+            bounds = [_SuffixBound([], [], total_capacities)]
+            first_item = len(self.items) - 1
+        else:
+            bounds = suffix_bounds[excluded + 1:]
+            first_item = excluded
+
+        for item in range(first_item, -1, -1):
+            bound_items = [other for other in range(item, len(self.items)) if other != excluded]
+            bounds.insert(0, _SuffixBound([self.values[other] for other in bound_items],
+                                          [self.sizes[other] for other in bound_items], total_capacities,
+                                          bounds[0], None if item == excluded else item))
+        return bounds
+
+    @staticmethod
+    def bound(suffix_bound: _SuffixBound, remaining: List[List[int]]) -> float:
+        """
+        The upper bound of the value of the items from a position as the minimum of the knapsack over the total
+            usable capacity of each resource and the maximum value of the number of items that could fit on the
+            servers. The usable capacity of a server is the largest subset sum of the item sizes within its capacity.
+
+        :param suffix_bound: The bound of the items from the position
+        :param remaining: The remaining capacities of the servers
+        :return: The upper bound of the value of the items from the position
+        """
+        size_sums = suffix_bound.size_sums
+        # The capacity of a server is only usable if it could fit the smallest items
+        usable = [capacity for capacity in remaining
+                  if size_sums[0] and all(size_sums[dim][0] <= capacity[dim] for dim in range(3))]
+        if not usable:
+            return 0.0
+
+        max_items = sum(min(bisect_right(size_sums[dim], capacity[dim]) for dim in range(3)) for capacity in usable)
+        bound = suffix_bound.value_sums[min(max_items, len(suffix_bound.value_sums) - 1)]
+        for dim in range(3):
+            subset_sums = suffix_bound.subset_sums[dim]
+            usable_capacity = sum((subset_sums & ((2 << capacity[dim]) - 1)).bit_length() - 1 for capacity in usable)
+            bound = min(bound, suffix_bound.knapsack_tables[dim][usable_capacity])
+        return bound
+
+    def solve(self, excluded: Optional[FixedTask] = None,
+              warm_start: Optional[Dict[FixedTask, Server]] = None) -> Tuple[float, Dict[FixedTask, Server]]:
+        """
+        Solves the optimal allocation of the tasks without the excluded task
+
+        :param excluded: The task excluded from the allocation
+        :param warm_start: A feasible allocation of the tasks to start the search from
+        :return: The social welfare and the servers of the allocated tasks
+        """
+        task_items = {self.tasks[pos]: item for item, pos in enumerate(self.items)}
+        server_positions = {server: pos for pos, server in enumerate(self.servers)}
+        excluded_item = task_items.get(excluded) if excluded is not None else None
+        suffix_bounds = self.suffix_bounds if excluded_item is None else \
+            self.build_suffix_bounds(excluded_item, self.suffix_bounds)
+        start_time = time()
+
+        # The incumbent allocation (item position to server position) starting from the warm start
+        best_value: float = 0.0
+        best_allocation: Dict[int, int] = {}
+        if warm_start:
+            best_allocation = {task_items[task]: server_positions[server]
+                               for task, server in warm_start.items()}
+            assert excluded_item not in best_allocation
+            best_value = sum(self.values[item] for item in best_allocation.keys())
+
+        remaining = [list(capacity) for capacity in self.capacities]
+        allocation: Dict[int, int] = {}
+        # The number of unallocated items that dominate each item
+        dominating_skips = [0] * len(self.items)
+        self.nodes, self.optimal = 0, True
+
+        def search(item: int, value: float):
+            """Depth first search of the allocation of the item"""
+            nonlocal best_value, best_allocation
+            self.nodes += 1
+            if self.time_limit is not None and self.nodes % self.time_check_nodes == 0 and \
+                    self.time_limit < time() - start_time:
+                raise _TimeLimitReached()
+
+            if best_value + 1e-9 < value:
+                best_value, best_allocation = value, allocation.copy()
+            if item == len(self.items) or value + self.bound(suffix_bounds[item], remaining) <= best_value + 1e-9:
+                return
+            if item == excluded_item:
+                search(item + 1, value)
+                return
+
+            # Allocate the item to each server that can run it, servers with the same remaining capacities are
+            #   equivalent so only the first is searched. If an unallocated item dominates the item then the item isn't
+            #   allocated.
+            storage, computation, bandwidth = self.sizes[item]
+            searched_capacities = set()
+            for server_pos, capacity in enumerate(remaining):
+                if dominating_skips[item] == 0 and storage <= capacity[0] and computation <= capacity[1] and \
+                        bandwidth <= capacity[2] and tuple(capacity) not in searched_capacities:
+                    searched_capacities.add(tuple(capacity))
+                    capacity[0] -= storage
+                    capacity[1] -= computation
+                    capacity[2] -= bandwidth
+                    allocation[item] = server_pos
+                    search(item + 1, value + self.values[item])
+                    del allocation[item]
+                    capacity[0] += storage
+                    capacity[1] += computation
+                    capacity[2] += bandwidth
+
+            # Don't allocate the item
+            for dominated in self.dominated[item]:
+                dominating_skips[dominated] += 1
+            search(item + 1, value)
+            for dominated in self.dominated[item]:
+                dominating_skips[dominated] -= 1
+
+        try:
+            search(0, 0.0)
+        except _TimeLimitReached:
+            self.optimal = False
+
+        return best_value, {self.tasks[self.items[item]]: self.servers[server_pos]
+                            for item, server_pos in best_allocation.items()}
+
+    def pivot(self, task: FixedTask, allocation: Dict[FixedTask, Server]) -> Tuple[float, bool]:
+        """
+        Solves the optimal social welfare without the task (the clarke pivot) starting from the optimal allocation
+            without the task
+
+        :param task: The allocated task
+        :param allocation: The optimal allocation
+        :return: The social welfare without the task and if the solve is optimal
+        """
+        warm_start = {other: server for other, server in allocation.items() if other is not task}
+        social_welfare, _ = self.solve(task, warm_start)
+        return social_welfare, self.optimal
+
+    def pivots(self, allocation: Dict[FixedTask, Server], workers: Optional[int] = None) -> Dict[FixedTask, float]:
+        """
+        Solves the optimal social welfare without each allocated task over a pool of worker processes, each worker is
+            initialised with the solver such that the solver structure is only built once
+
+        :param allocation: The optimal allocation
+        :param workers: The number of worker processes, defaults to the number of cpus, if 1 then solved serially
+        :return: Dictionary of the optimal social welfare without each allocated task
+        """
+        allocated_tasks = list(allocation.keys())
+        workers = min(workers or os.cpu_count() or 1, len(allocated_tasks))
+        if workers <= 1:
+            pivot_results = [self.pivot(task, allocation) for task in allocated_tasks]
+        else:
+            task_positions = {task: pos for pos, task in enumerate(self.tasks)}
+            with shared_process_pool((self, allocation), workers) as executor:
+                pivot_results = list(executor.map(_pivot_worker, [task_positions[task] for task in allocated_tasks]))
+
+        self.optimal = all(optimal for _, optimal in pivot_results)
+        return {task: social_welfare for task, (social_welfare, _) in zip(allocated_tasks, pivot_results)}
+
+    def allocate(self, allocation: Dict[FixedTask, Server], prices: Optional[Dict[FixedTask, float]] = None):
+        """
+        Allocates the tasks to the servers
+
+        :param allocation: The servers of the allocated tasks
+        :param prices: The task prices
+        """
+        for task, server in allocation.items():
+            server_task_allocation(server, task, task.loading_speed, task.compute_speed, task.sending_speed,
+                                   price=prices[task] if prices is not None else None)
+
+
+def _pivot_worker(task_pos: int) -> Tuple[float, bool]:
+    """
+    Solves the optimal social welfare without the task on the worker process solver
+
+    :param task_pos: The position of the allocated task in the solver tasks
+    :return: The social welfare without the task and if the solve is optimal
+    """
+    knapsack, allocation = shared_state()
+    return knapsack.pivot(knapsack.tasks[task_pos], allocation)
+
+
+def fixed_knapsack_optimal(tasks: List[FixedTask], servers: List[Server],
+                           time_limit: Optional[float] = None) -> Result:
+    """
+    Runs the fixed optimal branch and bound solver
+
+    :param tasks: List of fixed tasks
+    :param servers: List of servers
+    :param time_limit: The solver time limit
+    :return: The results
+    """
+    start_time = time()
+    knapsack = FixedKnapsack(tasks, servers, time_limit)
+    _, allocation = knapsack.solve()
+    knapsack.allocate(allocation)
+    return Result('Fixed Optimal', tasks, servers, time() - start_time,
+                  **{'solve status': 'Optimal' if knapsack.optimal else 'Feasible', 'nodes': knapsack.nodes})
@@ -8,7 +8,7 @@ import sys
 from typing import TYPE_CHECKING
 
 from docplex.cp.model import CpoModel
-from docplex.cp.solution import SOLVE_STATUS_FEASIBLE, SOLVE_STATUS_OPTIMAL
+from docplex.cp.solution import SOLVE_STATUS_FEASIBLE, SOLVE_STATUS_OPTIMAL, CpoSolveResult, CpoModelSolution
 
 from src.core.core import server_task_allocation
 from src.core.fixed_task import FixedTask
@@ -16,19 +16,24 @@ from src.extra.pprint import print_model_solution
 from src.extra.result import Result
 
 if TYPE_CHECKING:
-    from typing import List, Optional
+    from typing import List, Optional, Dict, Tuple
 
     from src.core.server import Server
 
 
-def fixed_optimal_solver(tasks: List[FixedTask], servers: List[Server], time_limit: Optional[int]):
+def fixed_optimal_model(tasks: List[FixedTask], servers: List[Server], time_limit: Optional[int],
+                        warm_start: Optional[Dict[FixedTask, Tuple[int, int, int, Server]]] = None,
+                        threads: Optional[int] = None
+                        ) -> Optional[Tuple[CpoSolveResult, Dict[FixedTask, Tuple[int, int, int, Server]]]]:
     """
-    Finds the optimal solution
+    Solves the fixed optimal model without allocating the tasks
 
     :param tasks: A list of tasks
     :param servers: A list of servers
     :param time_limit: The time limit to solve with
-    :return: The results
+    :param warm_start: Starting point of the task allocation, the tasks not in the warm start are not allocated
+    :param threads: The number of cplex worker threads, if None then cplex uses all of the cpus
+    :return: The model solution and the task loading, compute and sending speeds with the server of allocated tasks
     """
     assert time_limit is None or 0 < time_limit, f'Time limit: {time_limit}'
 
@@ -54,8 +59,16 @@ def fixed_optimal_solver(tasks: List[FixedTask], servers: List[Server], time_lim
     # Optimisation problem
     model.maximize(sum(task.value * allocations[(task, server)] for task in tasks for server in servers))
 
+    # The starting point of the search from a known (feasible) allocation
+    if warm_start is not None:
+        starting_point = CpoModelSolution()
+        for (task, server), allocation in allocations.items():
+            starting_point.add_integer_var_solution(allocation,
+                                                    int(task in warm_start and warm_start[task][3] is server))
+        model.set_starting_point(starting_point)
+
     # Solve the cplex model with time limit
-    model_solution = model.solve(log_output=None, TimeLimit=time_limit)
+    model_solution = model.solve(log_output=None, TimeLimit=time_limit, Workers=threads)
 
     # Check that the model is solved
     if model_solution.get_solve_status() != SOLVE_STATUS_FEASIBLE and \
@@ -64,13 +77,38 @@ def fixed_optimal_solver(tasks: List[FixedTask], servers: List[Server], time_lim
         print_model_solution(model_solution)
         return None
 
+    # The allocation of the tasks to the servers
+    allocation: Dict[FixedTask, Tuple[int, int, int, Server]] = {}
+    for task in tasks:
+        for server in servers:
+            if model_solution.get_value(allocations[(task, server)]):
+                allocation[task] = (task.loading_speed, task.compute_speed, task.sending_speed, server)
+                break
+    return model_solution, allocation
+
+
+def fixed_optimal_solver(tasks: List[FixedTask], servers: List[Server], time_limit: Optional[int],
+                         warm_start: Optional[Dict[FixedTask, Tuple[int, int, int, Server]]] = None,
+                         threads: Optional[int] = None):
+    """
+    Finds the optimal solution
+
+    :param tasks: A list of tasks
+    :param servers: A list of servers
+    :param time_limit: The time limit to solve with
+    :param warm_start: Starting point of the task allocation, the tasks not in the warm start are not allocated
+    :param threads: The number of cplex worker threads, if None then cplex uses all of the cpus
+    :return: The results
+    """
+    model_result = fixed_optimal_model(tasks, servers, time_limit, warm_start, threads)
+    if model_result is None:
+        return None
+    model_solution, allocation = model_result
+
     # Allocate all of the tasks to the servers
     try:
-        for task in tasks:
-            for server in servers:
-                if model_solution.get_value(allocations[(task, server)]):
-                    server_task_allocation(server, task, task.loading_speed, task.compute_speed, task.sending_speed)
-                    break
+        for task, (loading_speed, compute_speed, sending_speed, server) in allocation.items():
+            server_task_allocation(server, task, loading_speed, compute_speed, sending_speed)
 
         if abs(model_solution.get_objective_values()[0] - sum(task.value for task in tasks if task.running_server)) < 0.1:
             print('Fixed optimal different objective values - '
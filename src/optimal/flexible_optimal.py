@@ -8,7 +8,7 @@ import sys
 from typing import TYPE_CHECKING
 
 from docplex.cp.model import CpoModel
-from docplex.cp.solution import SOLVE_STATUS_FEASIBLE, SOLVE_STATUS_OPTIMAL, CpoSolveResult
+from docplex.cp.solution import SOLVE_STATUS_FEASIBLE, SOLVE_STATUS_OPTIMAL, CpoSolveResult, CpoModelSolution
 
 from core.super_server import SuperServer
 from src.core.core import server_task_allocation
@@ -16,20 +16,25 @@ from src.extra.pprint import print_model_solution, print_model
 from src.extra.result import Result
 
 if TYPE_CHECKING:
-    from typing import List, Optional
+    from typing import List, Optional, Dict, Tuple
 
     from src.core.server import Server
     from src.core.task import Task
 
 
-def flexible_optimal_solver(tasks: List[Task], servers: List[Server], time_limit: Optional[int]):
+def flexible_optimal_model(tasks: List[Task], servers: List[Server], time_limit: Optional[int],
+                           warm_start: Optional[Dict[Task, Tuple[int, int, int, Server]]] = None,
+                           threads: Optional[int] = None
+                           ) -> Optional[Tuple[CpoSolveResult, Dict[Task, Tuple[int, int, int, Server]]]]:
     """
-    Flexible Optimal algorithm solver using cplex
+    Solves the flexible optimal model using cplex without allocating the tasks
 
     :param tasks: List of tasks
     :param servers: List of servers
     :param time_limit: Time limit for cplex
-    :return: the results of the algorithm
+    :param warm_start: Starting point of the task allocation, the tasks not in the warm start are not allocated
+    :param threads: The number of cplex worker threads, if None then cplex uses all of the cpus
+    :return: The model solution and the task loading, compute and sending speeds with the server of allocated tasks
     """
     assert time_limit is None or 0 < time_limit, f'Time limit: {time_limit}'
 
@@ -65,8 +70,22 @@ def flexible_optimal_solver(tasks: List[Task], servers: List[Server], time_limit
     # The optimisation statement
     model.maximize(sum(task.value * task_allocation[(task, server)] for task in tasks for server in servers))
 
+    # The starting point of the search from a known (feasible) allocation
+    if warm_start is not None:
+        starting_point = CpoModelSolution()
+        for task in tasks:
+            for server in servers:
+                starting_point.add_integer_var_solution(task_allocation[(task, server)],
+                                                        int(task in warm_start and warm_start[task][3] is server))
+            if task in warm_start:
+                loading_speed, compute_speed, sending_speed, _ = warm_start[task]
+                starting_point.add_integer_var_solution(loading_speeds[task], loading_speed)
+                starting_point.add_integer_var_solution(compute_speeds[task], compute_speed)
+                starting_point.add_integer_var_solution(sending_speeds[task], sending_speed)
+        model.set_starting_point(starting_point)
+
     # Solve the cplex model with time limit
-    model_solution: CpoSolveResult = model.solve(log_output=None, TimeLimit=time_limit)
+    model_solution: CpoSolveResult = model.solve(log_output=None, TimeLimit=time_limit, Workers=threads)
 
     # Check that it is solved
     if model_solution.get_solve_status() != SOLVE_STATUS_FEASIBLE and \
@@ -76,16 +95,40 @@ def flexible_optimal_solver(tasks: List[Task], servers: List[Server], time_limit
         print_model(tasks, servers)
         return None
 
+    # The allocation of the tasks and servers
+    allocation: Dict[Task, Tuple[int, int, int, Server]] = {}
+    for task in tasks:
+        for server in servers:
+            if model_solution.get_value(task_allocation[(task, server)]):
+                allocation[task] = (model_solution.get_value(loading_speeds[task]),
+                                    model_solution.get_value(compute_speeds[task]),
+                                    model_solution.get_value(sending_speeds[task]), server)
+                break
+    return model_solution, allocation
+
+
+def flexible_optimal_solver(tasks: List[Task], servers: List[Server], time_limit: Optional[int],
+                            warm_start: Optional[Dict[Task, Tuple[int, int, int, Server]]] = None,
+                            threads: Optional[int] = None):
+    """
+    Flexible Optimal algorithm solver using cplex
+
+    :param tasks: List of tasks
+    :param servers: List of servers
+    :param time_limit: Time limit for cplex
+    :param warm_start: Starting point of the task allocation, the tasks not in the warm start are not allocated
+    :param threads: The number of cplex worker threads, if None then cplex uses all of the cpus
+    :return: the results of the algorithm
+    """
+    model_result = flexible_optimal_model(tasks, servers, time_limit, warm_start, threads)
+    if model_result is None:
+        return None
+    model_solution, allocation = model_result
+
     # Generate the allocation of the tasks and servers
     try:
-        for task in tasks:
-            for server in servers:
-                if model_solution.get_value(task_allocation[(task, server)]):
-                    server_task_allocation(server, task,
-                                           model_solution.get_value(loading_speeds[task]),
-                                           model_solution.get_value(compute_speeds[task]),
-                                           model_solution.get_value(sending_speeds[task]))
-                    break
+        for task, (loading_speed, compute_speed, sending_speed, server) in allocation.items():
+            server_task_allocation(server, task, loading_speed, compute_speed, sending_speed)
 
         if abs(model_solution.get_objective_values()[0] - sum(task.value for task in tasks if task.running_server)) < 0.1:
             print('Flexible optimal different objective values - '
@@ -0,0 +1,250 @@
+"""
+Tests the core task and server functions
+"""
+
+from __future__ import annotations
+
+import random as rnd
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from math import floor
+from multiprocessing import get_context
+from typing import Tuple
+
+from src.core.compatibility import CompatibilityMatrix
+from src.core.core import reset_model
+from src.core.fixed_task import FixedTask, SumSpeedPowFixedAllocationPriority, analytic_fixed_speeds, \
+    fixed_speeds_cache
+from src.core.server import Server
+from src.core.task import Task
+from src.core.transaction import Transaction, journal, snapshot, restore, release
+from src.extra.model import ModelDistribution
+from src.greedy.analytic_allocation import max_speeds, minimum_speed
+from src.greedy.greedy import greedy_algorithm
+from src.greedy.resource_allocation_policy import SumPercentage
+from src.greedy.server_selection_policy import SumResources
+from src.greedy.task_prioritisation import UtilityDeadlinePerResource
+
+
+def loop_can_run(task: Task, computation: int, bandwidth: int) -> bool:
+    """
+    The original implementation of the server can run that checks every split of the bandwidth
+
+    :param task: The task
+    :param computation: The computation
+    :param bandwidth: The bandwidth
+    :return: If the task can run
+    """
+    for s in range(1, bandwidth):
+        if task.required_storage * computation * (bandwidth - s) + \
+                s * task.required_computation * (bandwidth - s) + \
+                s * computation * task.required_results_data <= \
+                task.deadline * s * computation * (bandwidth - s):
+            return True
+    return False
+
+
+def test_can_run(repeats: int = 20000):
+    """
+    Property test that the closed form can run is equal to checking every split of the bandwidth
+    """
+    print()
+    for repeat in range(repeats):
+        task = Task(f'{repeat}', required_storage=rnd.randint(0, 500 * rnd.choice([1, 10, 100])),
+                    required_computation=rnd.randint(1, 300), required_results_data=rnd.randint(0, 500),
+                    value=1, deadline=rnd.randint(1, 30))
+        server = Server(f'{repeat}', storage_capacity=1000000, computation_capacity=rnd.randint(1, 150),
+                        bandwidth_capacity=rnd.randint(2, rnd.choice([10, 100, 1000])))
+        server.available_computation = rnd.randint(0, server.computation_capacity)
+        server.available_bandwidth = rnd.randint(0, server.bandwidth_capacity)
+
+        assert server.can_run(task) == loop_can_run(task, server.available_computation, server.available_bandwidth), \
+            f'{task} and {server}'
+        assert server.can_run_empty(task) == loop_can_run(task, server.computation_capacity,
+                                                          server.bandwidth_capacity), f'{task} and {server}'
+
+
+def journal_state() -> Tuple[int, int, bool]:
+    """
+    The journal depth, number of changes and if the attribute changes are recorded
+
+    :return: Tuple of the journal state
+    """
+    return journal.depth, len(journal.changes), '__setattr__' in Task.__dict__
+
+
+def test_transaction():
+    """
+    Tests that restoring an allocation snapshot restores the tasks and servers
+    """
+    print()
+    model = ModelDistribution('../models/synthetic.mdl', 30, 3)
+    tasks, servers = model.generate()
+
+    def allocation_state():
+        """The allocation state of the tasks and servers"""
+        return [(task.loading_speed, task.compute_speed, task.sending_speed, task.running_server, task.price)
+                for task in tasks] + \
+            [(server.available_storage, server.available_computation, server.available_bandwidth, server.revenue,
+              list(server.allocated_tasks)) for server in servers]
+
+    initial_state = allocation_state()
+    initial_allocation = snapshot()
+    greedy_algorithm(tasks[:15], servers, UtilityDeadlinePerResource(), SumResources(), SumPercentage())
+    partial_state = allocation_state()
+
+    # Nested transactions with the inner rolled back and the outer kept
+    with Transaction():
+        with Transaction(rollback=True):
+            greedy_algorithm(tasks[15:], servers, UtilityDeadlinePerResource(), SumResources(), SumPercentage())
+            for task in tasks:
+                task.price = rnd.randint(1, 10)
+        assert allocation_state() == partial_state
+        reset_model(tasks, servers)
+    assert allocation_state() == initial_state
+
+    restore(initial_allocation)
+    assert allocation_state() == initial_state
+    release(initial_allocation)
+    assert journal.depth == 0 and len(journal.changes) == 0
+    # Attribute changes are only recorded while a snapshot is open
+    assert '__setattr__' not in Task.__dict__ and '__setattr__' not in Server.__dict__
+
+    def thread_transaction():
+        """Changes a task price within a snapshot of another thread"""
+        assert journal.depth == 0
+        thread_allocation = snapshot()
+        tasks[1].price = 7
+        assert journal.depth == 1 and len(journal.changes) == 1
+        release(thread_allocation)
+
+    # The journal is local to each thread so the changes of other threads are not recorded or restored
+    task_prices = tasks[0].price, tasks[1].price
+    with Transaction(rollback=True):
+        tasks[0].price = 3
+        with ThreadPoolExecutor(1) as executor:
+            executor.submit(thread_transaction).result()
+        assert journal.depth == 1 and len(journal.changes) == 1 and '__setattr__' in Task.__dict__
+    assert tasks[0].price == task_prices[0] and tasks[1].price == 7
+    assert '__setattr__' not in Task.__dict__
+
+    # Forked processes start without the open snapshots of the parent
+    with Transaction(rollback=True):
+        tasks[0].price = 3
+        with ProcessPoolExecutor(1, mp_context=get_context('fork')) as executor:
+            assert executor.submit(journal_state).result() == (0, 0, False)
+        assert journal_state() == (1, 1, True)
+
+
+def test_compatibility_matrix():
+    """
+    Tests that the server can run with the compatibility matrix is equal to without the compatibility matrix
+    """
+    print()
+    model = ModelDistribution('../models/synthetic.mdl', 40, 4)
+    tasks, servers = model.generate(compatibility=True)
+    unbound_servers = [Server(server.name, server.storage_capacity, server.computation_capacity,
+                              server.bandwidth_capacity) for server in servers]
+    assert all(server.compatibility is not None for server in servers)
+
+    def check_servers():
+        """Checks the bound and unbound servers can run the tasks equally"""
+        for task in tasks:
+            for server, unbound_server in zip(servers, unbound_servers):
+                assert server.can_run_empty(task) == unbound_server.can_run_empty(task)
+                unbound_server.available_storage = server.available_storage
+                unbound_server.available_computation = server.available_computation
+                unbound_server.available_bandwidth = server.available_bandwidth
+                assert server.can_run(task) == unbound_server.can_run(task)
+
+    check_servers()
+    greedy_algorithm(tasks, servers, UtilityDeadlinePerResource(), SumResources(), SumPercentage())
+    check_servers()
+    reset_model(tasks, servers)
+
+    for ratio in [0.1, 0.3, 0.5, 0.7, 0.9]:
+        for server, unbound_server in zip(servers, unbound_servers):
+            total_resources = server.computation_capacity + server.bandwidth_capacity
+            server.update_capacities(int(total_resources * ratio), int(total_resources * (1 - ratio)))
+            unbound_server.update_capacities(server.computation_capacity, server.bandwidth_capacity)
+        check_servers()
+
+    # The footprints are lower bounds of the resources
+    matrix: CompatibilityMatrix = servers[0].compatibility
+    for task in tasks:
+        for server in servers:
+            if matrix.is_compatible(task, server):
+                loading, compute, sending = max_speeds(task, server)
+                min_compute = minimum_speed(task.deadline, task.required_computation,
+                                            floor(loading), task.required_storage,
+                                            server.available_bandwidth - floor(loading), task.required_results_data)
+                if min_compute is not None:
+                    assert matrix.min_computation[matrix.task_index[task], matrix.server_index[server]] <= min_compute
+
+
+def test_fixed_speeds(repeats: int = 200):
+    """
+    Tests that the analytic fixed speeds are equal to the brute force minimum speeds
+    """
+    print()
+
+    def brute_force_speeds(task: Task, power: int) -> int:
+        """The minimum sum of speeds to the power by checking every loading and compute speed"""
+        return min(loading ** power + compute ** power + sending ** power
+                   for loading in range(1, 150) for compute in range(1, 150)
+                   for sending in [minimum_speed(task.deadline, task.required_results_data, loading,
+                                                 task.required_storage, compute, task.required_computation)]
+                   if sending is not None)
+
+    for repeat in range(repeats):
+        task = Task(f'{repeat}', required_storage=rnd.randint(1, 200), required_computation=rnd.randint(1, 200),
+                    required_results_data=rnd.randint(1, 200), value=1, deadline=rnd.randint(4, 20))
+        for power in [1, 3]:
+            loading, compute, sending = analytic_fixed_speeds(task, power)
+            assert task.required_storage * compute * sending + loading * task.required_computation * sending + \
+                loading * compute * task.required_results_data <= task.deadline * loading * compute * sending
+            assert loading ** power + compute ** power + sending ** power == brute_force_speeds(task, power), \
+                f'{task} with power {power}'
+
+    # The fixed speeds cache is used for tasks with the same requirements
+    task = Task('cache', required_storage=100, required_computation=100, required_results_data=50, value=1, deadline=10)
+    speeds = FixedTask.minimum_fixed_prioritisation(task, SumSpeedPowFixedAllocationPriority())
+    key = (task.required_storage, task.required_computation, task.required_results_data, task.deadline,
+           SumSpeedPowFixedAllocationPriority().name)
+    assert fixed_speeds_cache.speeds[key] == speeds
+
+
+def test_deallocate_task():
+    """
+    Tests that deallocating tasks restores the server available resources and revenue
+    """
+    print()
+    model = ModelDistribution('../models/synthetic.mdl', 30, 3)
+    tasks, servers = model.generate()
+    greedy_algorithm(tasks, servers, UtilityDeadlinePerResource(), SumResources(), SumPercentage())
+    for task in tasks:
+        if task.running_server:
+            task.running_server.revenue += 5
+            task.price = 5
+
+    allocated_tasks = [task for task in tasks if task.running_server]
+    server_tasks = [list(server.allocated_tasks) for server in servers]
+    with Transaction(rollback=True):
+        for task in allocated_tasks[::2]:
+            server = task.running_server
+            task.deallocate()
+            assert task not in server.allocated_tasks and task.running_server is None and task.price == 0
+
+        for server in servers:
+            assert server.available_storage == server.storage_capacity - \
+                sum(task.required_storage for task in server.allocated_tasks)
+            assert server.available_computation == server.computation_capacity - \
+                sum(task.compute_speed for task in server.allocated_tasks)
+            assert server.available_bandwidth == server.bandwidth_capacity - \
+                sum(task.loading_speed + task.sending_speed for task in server.allocated_tasks)
+            assert server.revenue == 5 * len(server.allocated_tasks)
+            assert all(server.allocated_tasks[server.allocated_tasks.positions[task]] is task
+                       for task in server.allocated_tasks)
+
+    # The deallocated tasks are restored in their original positions
+    assert all(task.running_server and task in task.running_server.allocated_tasks for task in allocated_tasks)
+    assert [list(server.allocated_tasks) for server in servers] == server_tasks
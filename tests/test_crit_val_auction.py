@@ -8,10 +8,10 @@ from __future__ import annotations
 from src.auctions.critical_value_auction import critical_value_auction
 from src.core.core import reset_model
 from src.extra.model import ModelDistribution
-from src.greedy.greedy import greedy_algorithm
-from src.greedy.resource_allocation_policy import SumPercentage
-from src.greedy.server_selection_policy import SumResources
-from src.greedy.task_prioritisation import UtilityPerResources
+from src.greedy.greedy import greedy_algorithm, allocate_tasks
+from src.greedy.resource_allocation_policy import SumPercentage, SumSpeed
+from src.greedy.server_selection_policy import SumResources, ProductResources, TaskSumResources
+from src.greedy.task_prioritisation import UtilityPerResources, UtilityDeadlinePerResource
 
 
 def test_critical_value(error: float = 0.05):
@@ -50,3 +50,69 @@ def test_critical_value(error: float = 0.05):
             assert greedy_result.social_welfare < auction_result.social_welfare and task.running_server is None
 
         task.value = original_value
+
+
+def test_prefix_snapshot_critical_value(repeats: int = 5):
+    """
+    Tests that the critical values of the critical value auction that resumes from the prefix snapshots are equal to
+        the critical values found by replaying the greedy algorithm from the start for each task
+    """
+    print()
+    model = ModelDistribution('../models/synthetic.mdl', 30, 3)
+    for repeat in range(repeats):
+        tasks, servers = model.generate()
+        for value_density, server_selection_policy, resource_allocation_policy in [
+                (UtilityPerResources(), SumResources(), SumPercentage()),
+                (UtilityDeadlinePerResource(), ProductResources(True), SumSpeed()),
+                (UtilityPerResources(), TaskSumResources(SumPercentage()), SumPercentage())]:
+            # Replay the greedy algorithm from the start without each allocated task
+            ranked_tasks = sorted(tasks, key=value_density.evaluate, reverse=True)
+            allocate_tasks(ranked_tasks, servers, server_selection_policy, resource_allocation_policy)
+            allocated_tasks = [task for task in ranked_tasks if task.running_server]
+            reset_model(tasks, servers)
+
+            replay_prices = {}
+            for critical_task in allocated_tasks:
+                replay_prices[critical_task] = 0
+                other_tasks = [task for task in ranked_tasks if task is not critical_task]
+                for task_pos, task in enumerate(other_tasks):
+                    if any(server.can_run(critical_task) for server in servers):
+                        allocate_tasks([task], servers, server_selection_policy, resource_allocation_policy)
+                    else:
+                        replay_prices[critical_task] = round(value_density.inverse(
+                            critical_task, value_density.evaluate(other_tasks[task_pos - 1])), 3)
+                        break
+                reset_model(tasks, servers)
+
+            for checkpoint_interval in [1, 4]:
+                critical_value_auction(tasks, servers, value_density, server_selection_policy,
+                                       resource_allocation_policy, checkpoint_interval=checkpoint_interval)
+                assert [task for task in ranked_tasks if task.running_server] == allocated_tasks
+                assert {task: task.price for task in allocated_tasks} == replay_prices
+                reset_model(tasks, servers)
+
+
+def test_parallel_critical_value(repeats: int = 3):
+    """
+    Tests that the critical values found over the worker processes are equal to the critical values found serially
+    """
+    print()
+    model = ModelDistribution('../models/synthetic.mdl', 40, 4)
+    for repeat in range(repeats):
+        tasks, servers = model.generate()
+        for value_density, server_selection_policy, resource_allocation_policy in [
+                (UtilityPerResources(), SumResources(), SumPercentage()),
+                (UtilityDeadlinePerResource(), TaskSumResources(SumPercentage()), SumSpeed())]:
+            serial_result = critical_value_auction(tasks, servers, value_density, server_selection_policy,
+                                                   resource_allocation_policy)
+            serial_allocation = {task: (task.price, task.running_server) for task in tasks}
+            reset_model(tasks, servers)
+
+            parallel_result = critical_value_auction(tasks, servers, value_density, server_selection_policy,
+                                                     resource_allocation_policy, checkpoint_interval=4, workers=2)
+            parallel_allocation = {task: (task.price, task.running_server) for task in tasks}
+            reset_model(tasks, servers)
+
+            print(f'Serial: {serial_result.social_welfare}, {serial_result.solve_time:.3f}s, '
+                  f'Parallel: {parallel_result.social_welfare}, {parallel_result.solve_time:.3f}s')
+            assert serial_allocation == parallel_allocation
@@ -4,13 +4,22 @@ Tests the decentralised iterative auction
 
 from __future__ import annotations
 
+import functools
 import json
+import math
 import random as rnd
 from copy import copy
+from itertools import product
 
+import pytest
+from docplex.cp.solver.solver import get_solver_version
+
+from src.auctions.decentralised_iterative_agents import greedy_agent_decentralised_iterative_auction, agent_results
 from src.auctions.decentralised_iterative_auction import optimal_decentralised_iterative_auction, \
-    greedy_decentralised_iterative_auction, PriceResourcePerDeadline, greedy_task_price, allocate_task
+    greedy_decentralised_iterative_auction, PriceResourcePerDeadline, greedy_task_price, allocate_task, exact_task_price, \
+    decentralised_iterative_solver
 from src.core.core import reset_model, server_task_allocation, set_server_heuristics
+from src.core.transaction import Transaction, snapshot, restore, release
 from src.extra.io import results_filename, parse_args
 from src.extra.model import ModelDistribution
 from src.greedy.resource_allocation_policy import SumPercentage
@@ -91,6 +100,230 @@ def test_optimal_vs_greedy_dia(repeats: int = 5):
               f'{greedy_result.solve_time} | {greedy_result.social_welfare}')
 
 
+def test_exact_task_price(repeats: int = 3):
+    print()
+    model = ModelDistribution('../models/synthetic.mdl', 24, 3)
+
+    def brute_force_revenue(new_task, server):
+        # The maximum revenue over every subset of the allocated tasks with a dictionary of the minimum bandwidth for
+        #   each total compute speed using every loading, compute and sending speed of the tasks
+        def minimum_bandwidths(task):
+            bandwidths = {}
+            for s, w, r in product(range(1, task.loading_ub() + 1), range(1, task.compute_ub() + 1),
+                                   range(1, task.sending_ub() + 1)):
+                if task.required_storage * w * r + s * task.required_computation * r + \
+                        s * w * task.required_results_data <= task.deadline * s * w * r:
+                    bandwidths[w] = min(bandwidths.get(w, s + r), s + r)
+            return bandwidths
+
+        task_bandwidths = {task: minimum_bandwidths(task) for task in server.allocated_tasks + [new_task]}
+        max_revenue = -1
+        for allocated in product((False, True), repeat=len(server.allocated_tasks)):
+            tasks = [task for task, alloc in zip(server.allocated_tasks, allocated) if alloc] + [new_task]
+            if server.storage_capacity < sum(task.required_storage for task in tasks):
+                continue
+            totals = {0: 0}
+            for task in tasks:
+                task_totals = {}
+                for compute, bandwidth in totals.items():
+                    for w, b in task_bandwidths[task].items():
+                        if compute + w <= server.computation_capacity:
+                            task_totals[compute + w] = min(task_totals.get(compute + w, bandwidth + b), bandwidth + b)
+                totals = task_totals
+            if any(bandwidth <= server.bandwidth_capacity for bandwidth in totals.values()):
+                max_revenue = max(max_revenue, sum(task.price for task in tasks if task is not new_task))
+        return max(server.revenue - max_revenue + server.price_change, server.initial_price) \
+            if 0 <= max_revenue else math.inf
+
+    for repeat in range(repeats):
+        tasks, servers = model.generate()
+        set_server_heuristics(servers, price_change=5)
+        greedy_decentralised_iterative_auction(tasks[:-4], servers, PriceResourcePerDeadline(), SumPercentage())
+
+        for new_task in tasks[-4:]:
+            for server in servers:
+                if server.can_run_empty(new_task):
+                    price, speeds = exact_task_price(new_task, server)
+                    print(f'{new_task.name} Task on {server.name} Server: {price} price with '
+                          f'{len(server.allocated_tasks)} allocated tasks')
+                    assert price == brute_force_revenue(new_task, server)
+
+                    # The new task can be allocated with the speeds if the task can meet its deadline on the server
+                    if speeds:
+                        with Transaction(rollback=True):
+                            allocate_task(new_task, price, server, [], speeds)
+                            assert new_task.running_server is server
+
+
+def test_warm_start_dia(repeats: int = 3):
+    print()
+    model = ModelDistribution('../models/synthetic.mdl', 30, 4)
+
+    print(f' Cold start      | Warm start')
+    print(f'Rounds | SW     | Rounds | SW')
+    for repeat in range(repeats):
+        tasks, servers = model.generate()
+        set_server_heuristics(servers, price_change=3)
+        optimal_decentralised_iterative_auction(tasks, servers)
+
+        equilibrium = {task: (task.price, task.running_server, task.loading_speed, task.compute_speed,
+                              task.sending_speed) for task in tasks}
+        equilibrium_snapshot = snapshot()
+
+        # Decrease the value of an allocated task and rebid the task with the unallocated tasks
+        task = next(task for task in tasks if task.running_server is not None)
+        task.value -= 5
+        task.deallocate()
+        warm_result = optimal_decentralised_iterative_auction(
+            tasks, servers, queued_tasks=[task for task in tasks if task.running_server is None])
+        assert all(task.price < task.value for task in tasks if task.running_server is not None)
+
+        restore(equilibrium_snapshot)
+        release(equilibrium_snapshot)
+        assert equilibrium == {task: (task.price, task.running_server, task.loading_speed, task.compute_speed,
+                                      task.sending_speed) for task in tasks}
+
+        # The auction from an empty allocation with the mutated task
+        reset_model(tasks, servers)
+        task.value -= 5
+        cold_result = optimal_decentralised_iterative_auction(tasks, servers)
+        task.value += 5
+        reset_model(tasks, servers)
+
+        print(f'{cold_result.data["rounds"]:6} | {cold_result.social_welfare:6.2f} | '
+              f'{warm_result.data["rounds"]:6} | {warm_result.social_welfare:6.2f}')
+
+
+def test_budgeted_dia(repeats: int = 3):
+    print()
+    model = ModelDistribution('../models/synthetic.mdl', 30, 4)
+
+    for repeat in range(repeats):
+        tasks, servers = model.generate()
+        set_server_heuristics(servers, price_change=3)
+
+        # The round trace of the auction run to convergence
+        result = optimal_decentralised_iterative_auction(tasks, servers)
+        trace = result.data['round trace']
+        assert result.data['converged']
+        assert all(len(column) == result.data['rounds'] for column in trace.values())
+        # The rounds without a feasible quote have no price such that the trace is valid json
+        json.dumps(trace, allow_nan=False)
+        assert abs(trace['social welfare'][-1] - result.social_welfare) < 1e-6
+        print(f'Rounds: {result.data["rounds"]}, evictions: {sum(trace["evictions"])}, '
+              f'mean quote time: {sum(trace["quote time"]) / len(trace["quote time"]):.6f}')
+        reset_model(tasks, servers)
+
+        # The auction is stopped after the round budget with the allocation at the last round
+        budget_result = greedy_decentralised_iterative_auction(tasks, servers, PriceResourcePerDeadline(),
+                                                               SumPercentage(), max_rounds=10)
+        assert budget_result.data['rounds'] == 10 and not budget_result.data['converged']
+        assert abs(budget_result.data['round trace']['social welfare'][-1] - budget_result.social_welfare) < 1e-6
+        assert all(task.price < task.value for task in tasks if task.running_server is not None)
+        reset_model(tasks, servers)
+
+        time_result = optimal_decentralised_iterative_auction(tasks, servers, max_time=0)
+        assert time_result.data['rounds'] == 0 and time_result.social_welfare == 0
+        reset_model(tasks, servers)
+
+
+def test_concurrent_dia_quotes(repeats: int = 3):
+    """
+    Tests that gathering the price quotes concurrently allocates the same as gathering the quotes serially
+    """
+    print()
+    model = ModelDistribution('../models/synthetic.mdl', 20, 4)
+
+    # The greedy price quotes don't change the servers so can be gathered concurrently
+    solver = functools.partial(greedy_task_price, price_density=PriceResourcePerDeadline(),
+                               resource_allocation_policy=SumPercentage())
+    for repeat in range(repeats):
+        tasks, servers = model.generate()
+        set_server_heuristics(servers, price_change=5)
+
+        rnd.seed(repeat)
+        decentralised_iterative_solver(tasks, servers, solver, workers=1)
+        serial_allocation = {task: (task.price, task.running_server) for task in tasks}
+        reset_model(tasks, servers)
+
+        rnd.seed(repeat)
+        decentralised_iterative_solver(tasks, servers, solver, workers=4)
+        assert serial_allocation == {task: (task.price, task.running_server) for task in tasks}
+        reset_model(tasks, servers)
+
+    if get_solver_version() is None:
+        pytest.skip('CP Optimizer is not available')
+
+    print(f' Serial     | Concurrent')
+    print(f'Time  | SW  | Time   | SW')
+    for repeat in range(repeats):
+        tasks, servers = model.generate()
+        set_server_heuristics(servers, price_change=5)
+
+        rnd.seed(repeat)
+        serial_result = optimal_decentralised_iterative_auction(tasks, servers, time_limit=1, workers=1, threads=4,
+                                                                exact_solver=False)
+        serial_allocation = {task: (task.price, task.running_server) for task in tasks}
+        reset_model(tasks, servers)
+
+        # The minimum price quote is selected deterministically so the concurrent quotes allocate the same
+        rnd.seed(repeat)
+        concurrent_result = optimal_decentralised_iterative_auction(tasks, servers, time_limit=1, workers=4, threads=4,
+                                                                    exact_solver=False)
+        assert serial_allocation == {task: (task.price, task.running_server) for task in tasks}
+        reset_model(tasks, servers)
+
+        print(f'{serial_result.solve_time} | {serial_result.social_welfare} | '
+              f'{concurrent_result.solve_time} | {concurrent_result.social_welfare}')
+
+
+def test_agent_dia(repeats: int = 3):
+    print()
+    model = ModelDistribution('../models/synthetic.mdl', 30, 4)
+
+    for repeat in range(repeats):
+        tasks, servers = model.generate()
+        set_server_heuristics(servers, price_change=5)
+
+        # With a single outstanding bid, the agents allocate the same as the sequential auction
+        rnd.seed(repeat)
+        greedy_result = greedy_decentralised_iterative_auction(tasks, servers, PriceResourcePerDeadline(),
+                                                               SumPercentage())
+        greedy_allocation = {task: (task.price, task.running_server) for task in tasks}
+        reset_model(tasks, servers)
+
+        rnd.seed(repeat)
+        agent_result = greedy_agent_decentralised_iterative_auction(tasks, servers, PriceResourcePerDeadline(),
+                                                                    SumPercentage())
+        assert greedy_allocation == {task: (task.price, task.running_server) for task in tasks}
+        assert greedy_result.data['rounds'] == agent_result.data['rounds']
+        reset_model(tasks, servers)
+
+        # With concurrent bids and network latency, the stale quotes are rejected
+        concurrent_result = greedy_agent_decentralised_iterative_auction(tasks, servers, PriceResourcePerDeadline(),
+                                                                         SumPercentage(), latency=0.001,
+                                                                         outstanding_bids=4)
+        assert all(task.running_server is None or 0 < task.price < task.value for task in tasks)
+        reset_model(tasks, servers)
+
+        print(f'Sequential: {greedy_result.social_welfare}, {greedy_result.solve_time}s, '
+              f'{greedy_result.data["rounds"]} rounds - '
+              f'Concurrent: {concurrent_result.social_welfare}, {concurrent_result.solve_time}s, '
+              f'{concurrent_result.data["rounds"]} rounds, '
+              f'{concurrent_result.data["mean bid latency"]:.4f}s mean bid latency')
+
+    # Errors of the server agents' quotes are raised by the auction rather than the auction waiting forever
+    def failing_task_price(task, server):
+        """Task price solver that always fails"""
+        raise ValueError(f'Failed to quote {task.name} on {server.name}')
+
+    tasks, servers = model.generate()
+    for outstanding_bids in [1, 4]:
+        with pytest.raises(ValueError):
+            agent_results('Failing DIA', tasks, servers, failing_task_price, 0.0, outstanding_bids, False, False)
+        assert all(task.running_server is None for task in tasks)
+
+
 def dia_social_welfare_test(model_dist: ModelDistribution, repeat: int, repeats: int = 20):
     """
     Evaluates the results using the optimality
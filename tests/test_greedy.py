@@ -5,16 +5,29 @@ Todo add greedy testing for greedy and matrix greedy optimisations
 
 from __future__ import annotations
 
+import os
+import random as rnd
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
+import pytest
+from docplex.cp.solver.solver import get_solver_version
 
-from src.core.core import reset_model
+from src.core.core import reset_model, server_task_allocation
+from src.core.server import Server
+from src.core.task import Task
 from src.extra.model import ModelDistribution
-from src.greedy.matrix_allocation_policy import SumServerMaxPercentage
-from src.greedy.greedy import greedy_algorithm
-from src.greedy.matrix_greedy import greedy_matrix_algorithm
-from src.greedy.resource_allocation_policy import SumPercentage, policies as resource_allocation_policies
-from src.greedy.server_selection_policy import SumResources, all_policies as server_selection_policies
-from src.greedy.task_prioritisation import UtilityDeadlinePerResource, all_policies as value_density_policies
+from src.greedy.allocation_cache import AllocationCache, allocation_cache
+from src.greedy.matrix_allocation_policy import SumServerMaxPercentage, policies as matrix_policies
+from src.greedy.greedy import greedy_algorithm, greedy_grid
+from src.greedy.matrix_greedy import greedy_matrix_algorithm, allocate_resources
+from src.greedy.resource_allocation_policy import SumPercentage, SumPowPercentage, SumSpeed, DeadlinePercent, \
+    EvolutionStrategy, policies as resource_allocation_policies
+from src.greedy.server_selection_policy import SumResources, ProductResources, SumExpResource, TaskSumResources, \
+    EvolutionStrategy as ServerEvolutionStrategy, all_policies as server_selection_policies
+from src.greedy.task_prioritisation import UtilityDeadlinePerResource, Random, ResourceExpSum, Value, TaskArrays, \
+    EvolutionStrategy as TaskEvolutionStrategy, all_policies as value_density_policies
 
 
 def test_greedy_policies():
@@ -72,5 +85,247 @@ def test_optimisation(repeats: int = 10):
               f'{str(greedy_matrix_results.data["solve time"]):5} | {greedy_matrix_results.social_welfare:3}')
 
 
+def test_analytic_resource_allocation(repeats: int = 50):
+    """
+    Compares the analytic resource allocation to the brute force resource allocation for small servers
+    """
+    print()
+    # A task where the server bandwidth limits the continuous speeds
+    task = Task('sending', required_storage=121, required_computation=49, required_results_data=51, value=1, deadline=12)
+    server = Server('sending', storage_capacity=200, computation_capacity=26, bandwidth_capacity=35)
+    assert SumSpeed().allocate(task, server) == (21, 19, 14)
+
+    policies = [SumPercentage(), SumPowPercentage(), SumSpeed(), DeadlinePercent(),
+                EvolutionStrategy(0, 1.2, 0.5, 2.0), EvolutionStrategy(1, -0.4, 0.7, 1.1)]
+    for repeat in range(repeats):
+        task = Task(f'{repeat}', required_storage=rnd.randint(5, 120), required_computation=rnd.randint(5, 120),
+                    required_results_data=rnd.randint(5, 80), value=1, deadline=rnd.randint(4, 14))
+        server = Server(f'{repeat}', storage_capacity=200, computation_capacity=rnd.randint(3, 40),
+                        bandwidth_capacity=rnd.randint(3, 50))
+        if not server.can_run(task):
+            continue
+
+        for policy in policies:
+            loading, compute, sending = policy.allocate(task, server)
+            assert task.required_storage * compute * sending + loading * task.required_computation * sending + \
+                loading * compute * task.required_results_data <= task.deadline * loading * compute * sending
+            assert loading + sending <= server.available_bandwidth and compute <= server.available_computation
+
+            brute_force = min((policy.resource_evaluator(task, server, s, w, r)
+                               for s in range(1, server.available_bandwidth)
+                               for w in range(1, server.available_computation + 1)
+                               for r in range(1, server.available_bandwidth - s + 1)
+                               if task.required_storage * w * r + s * task.required_computation * r +
+                               s * w * task.required_results_data <= task.deadline * s * w * r))
+            analytic = policy.resource_evaluator(task, server, loading, compute, sending)
+            assert analytic == pytest.approx(brute_force), \
+                f'{policy.name} - analytic: {analytic}, brute force: {brute_force}'
+
+
+def test_analytic_vs_cp_resource_allocation():
+    """
+    Compares the analytic resource allocation to the cplex resource allocation
+    """
+    if get_solver_version() is None:
+        pytest.skip('CP Optimizer is not available')
+    print()
+    model = ModelDistribution('../models/synthetic.mdl', 20, 3)
+    tasks, servers = model.generate()
+
+    print(f'Policy | Analytic | Cplex')
+    for policy in [SumPercentage(), SumPowPercentage(), SumSpeed(), DeadlinePercent()]:
+        for task in tasks:
+            for server in servers:
+                if server.can_run(task):
+                    analytic = policy.resource_evaluator(task, server, *policy.allocate(task, server))
+                    cplex = policy.resource_evaluator(task, server, *policy.cp_allocate(task, server))
+                    print(f'{policy.name} | {analytic:.3f} | {cplex:.3f}')
+                    assert analytic <= cplex + 0.01 * abs(cplex)
+
+
+def test_server_index(repeats: int = 20):
+    """
+    Tests that the server index selects the same servers as the server selection policy
+    """
+    print()
+    model = ModelDistribution('../models/synthetic.mdl', 60, 8)
+    for repeat in range(repeats):
+        tasks, servers = model.generate()
+        for policy in [SumResources(), SumResources(True), ProductResources(), ProductResources(True),
+                       SumExpResource(), ServerEvolutionStrategy(0), ServerEvolutionStrategy(0, -1, 1, -1, False)]:
+            server_index = policy.server_index(servers)
+            for task in tasks:
+                selected_server = policy.select(task, servers)
+                assert server_index.select(task) is selected_server, policy.name
+                if selected_server:
+                    s, w, r = SumPercentage().allocate(task, selected_server)
+                    server_task_allocation(selected_server, task, s, w, r)
+                    server_index.update(selected_server)
+            reset_model(tasks, servers)
+
+
+def test_greedy_grid():
+    """
+    Tests that the parallel greedy grid finds the same results as the serial greedy algorithm
+    """
+    print()
+    model = ModelDistribution('../models/synthetic.mdl', 30, 4)
+    tasks, servers = model.generate()
+
+    task_priorities = value_density_policies[:3]
+    server_policies = [SumResources(), ProductResources(), SumExpResource()]
+    resource_policies = [SumPercentage(), SumSpeed()]
+
+    serial_results = []
+    for task_priority in task_priorities:
+        for server_selection_policy in server_policies:
+            for resource_allocation_policy in resource_policies:
+                serial_results.append(greedy_algorithm(tasks, servers, task_priority, server_selection_policy,
+                                                       resource_allocation_policy))
+                reset_model(tasks, servers)
+
+    grid_results = greedy_grid(tasks, servers, task_priorities, server_policies, resource_policies, workers=2)
+    assert len(grid_results) == len(serial_results)
+    for serial_result, grid_result in zip(serial_results, grid_results):
+        print(f'{grid_result.algorithm} - serial: {serial_result.social_welfare}, grid: {grid_result.social_welfare}')
+        assert serial_result.algorithm == grid_result.algorithm
+        assert serial_result.social_welfare == grid_result.social_welfare
+    assert all(task.running_server is None for task in tasks)
+
+
+def test_matrix_heap(repeats: int = 5):
+    """
+    Tests that the heap matrix greedy algorithm allocates the same as re-scoring the full allocation matrix
+    """
+    print()
+    model = ModelDistribution('../models/synthetic.mdl', 20, 3)
+    for repeat in range(repeats):
+        tasks, servers = model.generate()
+        for policy in matrix_policies:
+            # Full matrix algorithm that finds the maximum of the whole matrix each iteration, if there are equal
+            #   maximum values then the algorithms can break the tie differently
+            unallocated_tasks, full_allocation, tied = tasks.copy(), {}, False
+            while True:
+                allocation_values = [(allocate_resources(task, server, policy), task, server)
+                                     for task in unallocated_tasks for server in servers if server.can_run(task)]
+                if not allocation_values:
+                    break
+                (v, s, w, r), task, server = max(allocation_values, key=lambda value: value[0][0])
+                tied |= 1 < sum(value[0][0] == v for value in allocation_values)
+                server_task_allocation(server, task, s, w, r)
+                unallocated_tasks.remove(task)
+                full_allocation[task] = server
+            reset_model(tasks, servers)
+
+            result = greedy_matrix_algorithm(tasks, servers, policy)
+            print(f'{result.algorithm} - {result.social_welfare}, {result.solve_time:.3f} secs')
+            assert tied or {task: task.running_server for task in tasks if task.running_server} == full_allocation
+            reset_model(tasks, servers)
+
+
+def test_allocation_cache():
+    """
+    Tests the allocation cache eviction, statistics, persistence and that the cached allocations are the solved
+        allocations
+    """
+    print()
+    cache = AllocationCache(max_size=2)
+    assert cache.get(('a', 1), lambda: (1, 2, 3)) == (1, 2, 3)
+    assert cache.get(('b', 1), lambda: (4, 5, 6)) == (4, 5, 6)
+    assert cache.get(('a', 1), lambda: (0, 0, 0)) == (1, 2, 3)
+    assert cache.get(('c', 1), lambda: (7, 8, 9)) == (7, 8, 9)
+    assert cache.stats() == {'hits': 1, 'misses': 3, 'evictions': 1, 'size': 2}
+    assert ('b', 1) not in cache.results and ('a', 1) in cache.results
+
+    with ThreadPoolExecutor(4) as executor:
+        assert list(executor.map(lambda key: cache.get(('a', 1), lambda: (0, 0, 0)), range(100))) == [(1, 2, 3)] * 100
+    assert cache.stats()['hits'] == 101
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'allocation.cache')
+        cache.filename = filename
+        cache.save()
+        loaded_cache = AllocationCache(filename=filename)
+        assert loaded_cache.results == cache.results
+
+    allocation_cache.clear()
+    model = ModelDistribution('../models/synthetic.mdl', 20, 3)
+    tasks, servers = model.generate()
+    for repeat in range(2):
+        for policy in [SumPercentage(), SumPowPercentage(), SumSpeed(), DeadlinePercent(),
+                       EvolutionStrategy(0, 1.2, 0.5, 2.0), EvolutionStrategy(0, 0.4, 0.7, 1.1)]:
+            for task in tasks:
+                for server in servers:
+                    if server.can_run(task):
+                        assert policy.allocate(task, server) == policy.solve_allocation(task, server)
+    print(allocation_cache.stats())
+    assert allocation_cache.stats()['hits'] == allocation_cache.stats()['misses']
+
+
+def test_task_priority_batch():
+    """
+    Tests that the batch task priority evaluation and inverse are equal to the task evaluation and inverse
+    """
+    print()
+    model = ModelDistribution('../models/synthetic.mdl', 50, 3)
+    tasks, servers = model.generate()
+
+    for policy in [policy for policy in value_density_policies if not isinstance(policy, Random)] + \
+            [TaskEvolutionStrategy(0, 1.1, 0.4, 2.0, 0.5, 1.5)]:
+        priorities = np.array([policy.evaluate(task) for task in tasks])
+        assert np.allclose(policy.evaluate_batch(TaskArrays(tasks)), priorities), policy.name
+        assert policy.rank(tasks) == sorted(tasks, key=policy.evaluate, reverse=True), policy.name
+
+        try:
+            values = np.array([policy.inverse(task, priority) for task, priority in zip(tasks, priorities)])
+        except Exception:
+            continue
+        print(f'{policy.name} inverse')
+        assert np.allclose(policy.inverse_batch(TaskArrays(tasks), priorities), values), policy.name
+        assert np.allclose(values, [task.value for task in tasks]), policy.name
+
+    # The ranking uses the current task attributes after the tasks are changed
+    tasks[4].value = 1000
+    assert Value().rank(tasks)[0] is tasks[4]
+
+    # The random priorities are reproducible by seeding the random module
+    rnd.seed(1)
+    random_ranking = Random().rank(tasks)
+    rnd.seed(1)
+    assert Random().rank(tasks) == random_ranking
+
+    # The exponential sum overflows for large resource requirements, the same as the task prioritisation function
+    large_task = Task('large', required_storage=1000, required_computation=10, required_results_data=10, value=1,
+                      deadline=10)
+    with pytest.raises(OverflowError):
+        ResourceExpSum().evaluate(large_task)
+    with pytest.raises(OverflowError):
+        ResourceExpSum().evaluate_batch(TaskArrays([large_task]))
+
+
+def test_select_allocate(repeats: int = 10):
+    """
+    Tests that the task sum resources select and allocate with pruning selects the same server as select
+    """
+    print()
+    model = ModelDistribution('../models/synthetic.mdl', 40, 6)
+    for repeat in range(repeats):
+        tasks, servers = model.generate(compatibility=repeat % 2 == 0)
+        for policy in [TaskSumResources(SumPercentage()), TaskSumResources(SumPercentage(), True),
+                       TaskSumResources(SumSpeed()), TaskSumResources(DeadlinePercent(), True)]:
+            for resource_allocation_policy in [SumPercentage(), SumSpeed()]:
+                for task in tasks:
+                    selection = policy.select_allocate(task, servers, resource_allocation_policy)
+                    selected_server = policy.select(task, servers)
+                    if selected_server is None:
+                        assert selection is None
+                    else:
+                        server, speeds = selection
+                        assert server is selected_server, policy.name
+                        assert speeds == resource_allocation_policy.allocate(task, server)
+                        server_task_allocation(server, task, *speeds)
+                reset_model(tasks, servers)
+
+
 if __name__ == "__main__":
     test_greedy_policies()
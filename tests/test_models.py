@@ -182,5 +182,26 @@ def test_iridis_model():
         print('failure')
 
 
+def test_seeded_generation():
+    """
+    Tests that the seeded model generation generates the same tasks and servers
+    """
+    print()
+    for model_file in ['synthetic', 'alibaba']:
+        tasks, servers = ModelDistribution(f'../models/{model_file}.mdl', num_tasks=20, num_servers=4, seed=1).generate()
+        seeded_tasks, seeded_servers = ModelDistribution(f'../models/{model_file}.mdl', num_tasks=20, num_servers=4,
+                                                         seed=1).generate()
+        assert [task.save() for task in tasks] == [task.save() for task in seeded_tasks]
+        assert [server.save() for server in servers] == [server.save() for server in seeded_servers]
+        assert all(0 < task.required_storage and 0 < task.required_computation and 0 < task.required_results_data
+                   and 4 <= task.deadline and 0 < task.value for task in tasks)
+
+        online_tasks, _ = ModelDistribution(f'../models/{model_file}.mdl', num_servers=4, seed=1) \
+            .generate_online(100, 4, 2)
+        auction_times = [task.auction_time for task in online_tasks]
+        assert auction_times == sorted(auction_times) and all(0 <= time_step < 100 for time_step in auction_times)
+        print(f'{model_file} - tasks: {len(tasks)}, online tasks: {len(online_tasks)}')
+
+
 if __name__ == "__main__":
     alibaba_task_generation()
@@ -4,14 +4,19 @@ Tests the effectiveness of the optimality time limit for the social welfare of t
 
 from __future__ import annotations
 
+from itertools import product
 from typing import Sequence
 
 import matplotlib.pyplot as plt
+import pytest
+from docplex.cp.solver.solver import get_solver_version
 
-from core.fixed_task import FixedTask, SumSpeedsFixedAllocationPriority
+from core.fixed_task import FixedTask, SumSpeedsFixedAllocationPriority, SumSpeedPowFixedAllocationPriority, \
+    generate_fixed_tasks
 from extra.io import parse_args
 from extra.visualise import minimise_resource_allocation, plot_allocation_results
 from optimal.fixed_optimal import fixed_optimal
+from src.auctions.vcg_auction import fixed_vcg_auction
 from src.core.core import reset_model
 from src.extra.model import ModelDistribution
 from src.extra.pprint import print_model
@@ -19,6 +24,7 @@ from src.greedy.greedy import greedy_algorithm
 from src.greedy.resource_allocation_policy import SumPercentage
 from src.greedy.server_selection_policy import SumResources
 from src.greedy.task_prioritisation import UtilityDeadlinePerResource
+from src.optimal.fixed_knapsack import FixedKnapsack
 from src.optimal.flexible_optimal import flexible_optimal_solver, flexible_optimal, server_relaxed_flexible_optimal
 
 
@@ -80,6 +86,67 @@ def test_minimise_resource_allocation():
     plt.show()
 
 
+def test_fixed_knapsack(repeats: int = 5):
+    """
+    Tests that the fixed knapsack solver finds the optimal social welfare, with and without each allocated task,
+        compared to all of the allocations of the tasks
+    """
+
+    def exhaustive_social_welfare(tasks, servers) -> float:
+        """The maximum social welfare of all allocations of the tasks"""
+        best_social_welfare = 0
+        for allocation in product([None] + servers, repeat=len(tasks)):
+            if all(sum(task.required_storage for task, s in zip(tasks, allocation) if s is server) <=
+                   server.available_storage and
+                   sum(task.compute_speed for task, s in zip(tasks, allocation) if s is server) <=
+                   server.available_computation and
+                   sum(task.loading_speed + task.sending_speed for task, s in zip(tasks, allocation) if s is server) <=
+                   server.available_bandwidth for server in servers):
+                best_social_welfare = max(best_social_welfare,
+                                          sum(task.value for task, server in zip(tasks, allocation) if server))
+        return best_social_welfare
+
+    print()
+    model_dist = ModelDistribution('../models/synthetic.mdl', num_tasks=7, num_servers=2)
+    for repeat in range(repeats):
+        tasks, servers = model_dist.generate()
+        fixed_tasks = generate_fixed_tasks(tasks, SumSpeedPowFixedAllocationPriority(), True)
+
+        knapsack = FixedKnapsack(fixed_tasks, servers)
+        social_welfare, allocation = knapsack.solve()
+        print(f'Knapsack social welfare: {social_welfare}, nodes: {knapsack.nodes}')
+        assert abs(social_welfare - exhaustive_social_welfare(fixed_tasks, servers)) < 1e-6
+        assert abs(social_welfare - sum(task.value for task in allocation.keys())) < 1e-6
+
+        for task, prime_social_welfare in knapsack.pivots(allocation, workers=1).items():
+            other_tasks = [other for other in fixed_tasks if other is not task]
+            assert abs(prime_social_welfare - exhaustive_social_welfare(other_tasks, servers)) < 1e-6
+
+
+def test_vcg_pivots(repeats: int = 3):
+    """
+    Tests that the warm started VCG pivot solves find the same task prices when run serially and concurrently
+    """
+    if get_solver_version() is None:
+        pytest.skip('CP Optimizer is not available')
+    print()
+    model_dist = ModelDistribution('../models/synthetic.mdl', num_tasks=8, num_servers=2)
+    for repeat in range(repeats):
+        tasks, servers = model_dist.generate()
+        fixed_tasks = generate_fixed_tasks(tasks, SumSpeedPowFixedAllocationPriority(), True)
+
+        serial_result = fixed_vcg_auction(fixed_tasks, servers, workers=1, threads=4)
+        reset_model(fixed_tasks, servers)
+        concurrent_result = fixed_vcg_auction(fixed_tasks, servers, workers=4, threads=4)
+        reset_model(fixed_tasks, servers)
+
+        print(f'Serial prices: {serial_result.data["task prices"]}, '
+              f'concurrent prices: {concurrent_result.data["task prices"]}')
+        assert serial_result.data['task prices'].keys() == concurrent_result.data['task prices'].keys()
+        assert all(abs(price - concurrent_result.data['task prices'][name]) < 1e-6
+                   for name, price in serial_result.data['task prices'].items())
+
+
 if __name__ == "__main__":
     args = parse_args()
     test_optimal_time_limit(ModelDistribution(args.file, args.tasks, args.servers), args.repeat)